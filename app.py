@@ -1,7 +1,110 @@
-from flask import Flask, render_template, request
-from src.Predictive_Maintenance_RULPrediction.pipelines.prediction_pipeline import PredictPipeline, CustomData
+import os
+import json
+import time
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+from src.Predictive_Maintenance_RULPrediction.pipelines.prediction_pipeline import (
+    PredictPipeline, CustomData, prepare_batch_features
+)
+from src.Predictive_Maintenance_RULPrediction.pipelines.model_registry import HistoryRequired
+from src.Predictive_Maintenance_RULPrediction.pipelines.unit_state import (
+    StreamingUnavailable, get_streaming_predictor
+)
+from src.Predictive_Maintenance_RULPrediction.pipelines.serving import ServerBusy, get_scoring_pool
+from src.Predictive_Maintenance_RULPrediction.logger import logging
+from src.Predictive_Maintenance_RULPrediction.metrics import CONTENT_TYPE, SIZE_BUCKETS, get_metrics
 
 app = Flask(__name__)
+# Largest number of rows accepted by /predict/batch in one request
+app.config['MAX_BATCH_SIZE'] = int(os.environ.get('RUL_MAX_BATCH_SIZE', '100000'))
+# Rows scored per vectorized call; responses with more rows are streamed
+app.config['BATCH_CHUNK_SIZE'] = int(os.environ.get('RUL_BATCH_CHUNK_SIZE', '5000'))
+
+# One pipeline per process; the model registry behind it loads artifacts once
+predict_pipeline = PredictPipeline()
+# Request threads hand model calls to this bounded pool and answer 503 when it is full or too slow
+scoring_pool = get_scoring_pool()
+
+metrics = get_metrics()
+stage_seconds = metrics.histogram(
+    "rul_request_stage_seconds", "Time spent in each stage of a prediction request", ("stage",)
+)
+request_seconds = metrics.histogram("rul_request_seconds", "Request latency by endpoint", ("endpoint",))
+requests_total = metrics.counter("rul_requests_total", "Requests by endpoint and status", ("endpoint", "status"))
+errors_total = metrics.counter("rul_errors_total", "Responses with a 4xx/5xx status", ("endpoint", "status"))
+batch_rows = metrics.histogram("rul_batch_rows", "Rows per scored batch", ("path",), buckets=SIZE_BUCKETS)
+
+def load_model():
+    """Load the model now; True once it is being served"""
+    try:
+        predict_pipeline.registry.get()
+        return True
+    except Exception as e:
+        logging.error(f"Model not loaded yet: {str(e)}")
+        return False
+
+# {pid: model version warmed up in that process}; pre-forked workers warm up again
+_warmed_up = {}
+
+def warm_up():
+    """Load the model and score synthetic rows through the scoring pool (RUL_WARMUP_ROWS); True once done"""
+    if not load_model():
+        return False
+    rows = scoring_pool.config.warmup_rows
+    if rows and _warmed_up.get(os.getpid()) != predict_pipeline.registry.active_version:
+        try:
+            _warmed_up[os.getpid()] = scoring_pool.run(predict_pipeline.warm_up, rows, block=True)
+        except Exception as e:
+            logging.error(f"Model warm-up failed: {str(e)}")
+            return False
+    return True
+
+# Load at import, so a pre-forking server (gunicorn --preload) shares the pages with its workers
+warm_up()
+
+@app.before_request
+def start_timer():
+    g.start_time = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    if metrics.enabled:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request_seconds.observe(time.perf_counter() - g.get('start_time', time.perf_counter()), endpoint=endpoint)
+        requests_total.inc(endpoint=endpoint, status=response.status_code)
+        if response.status_code >= 400:
+            errors_total.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+# Also answers ScoringTimeout, a ServerBusy subclass
+@app.errorhandler(ServerBusy)
+def server_busy(e):
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@app.errorhandler(HistoryRequired)
+def history_required(e):
+    # Single cycles of a model with trajectory features would silently score differently than in training
+    return jsonify({'error': str(e)}), 422
+
+@app.errorhandler(StreamingUnavailable)
+def streaming_unavailable(e):
+    # A deployment setting, not load: no Retry-After
+    return jsonify({'error': str(e)}), 503
+
+@app.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    if scoring_pool.draining:
+        return jsonify({'ready': False, 'reason': 'draining'}), 503
+    if predict_pipeline.registry.active_version is None and not load_model():
+        return jsonify({'ready': False, 'reason': 'model not loaded'}), 503
+    if not warm_up():
+        return jsonify({'ready': False, 'reason': 'warm-up failed'}), 503
+    return jsonify({'ready': True, 'model_version': predict_pipeline.registry.active_version})
 
 @app.route('/')
 def home():
@@ -9,41 +112,202 @@ def home():
 
 @app.route('/predict', methods=['GET', 'POST'])
 def predict():
+    """
+    One cycle from the form. A model with trajectory features can only score a
+    unit's first cycle this way (422 otherwise); later cycles go to /predict/stream.
+    """
     if request.method == 'GET':
         return render_template('form.html')
     else:
-        data = CustomData(
-            unit=float(request.form['unit']),
-            time=float(request.form['time']),
-            operational_setting_1=float(request.form['op_setting_1']),
-            operational_setting_2=float(request.form['op_setting_2']),
-            sensor_2=float(request.form['sensor_2']),
-            sensor_3=float(request.form['sensor_3']),
-            sensor_4=float(request.form['sensor_4']),
-            sensor_7=float(request.form['sensor_7']),
-            sensor_8=float(request.form['sensor_8']),
-            sensor_9=float(request.form['sensor_9']),
-            sensor_11=float(request.form['sensor_11']),
-            sensor_12=float(request.form['sensor_12']),
-            sensor_13=float(request.form['sensor_13']),
-            sensor_14=float(request.form['sensor_14']),
-            sensor_15=float(request.form['sensor_15']),
-            sensor_17=float(request.form['sensor_17']),
-            sensor_20=float(request.form['sensor_20']),
-            sensor_21=float(request.form['sensor_21'])
-        )
+        with metrics.timer(stage_seconds, stage="parse"):
+            form = request.form
+        with metrics.timer(stage_seconds, stage="convert"):
+            data = CustomData(
+                unit=float(form['unit']),
+                time=float(form['time']),
+                operational_setting_1=float(form['op_setting_1']),
+                operational_setting_2=float(form['op_setting_2']),
+                sensor_2=float(form['sensor_2']),
+                sensor_3=float(form['sensor_3']),
+                sensor_4=float(form['sensor_4']),
+                sensor_7=float(form['sensor_7']),
+                sensor_8=float(form['sensor_8']),
+                sensor_9=float(form['sensor_9']),
+                sensor_11=float(form['sensor_11']),
+                sensor_12=float(form['sensor_12']),
+                sensor_13=float(form['sensor_13']),
+                sensor_14=float(form['sensor_14']),
+                sensor_15=float(form['sensor_15']),
+                sensor_17=float(form['sensor_17']),
+                sensor_20=float(form['sensor_20']),
+                sensor_21=float(form['sensor_21'])
+            )
         
-        df = data.get_data_as_dataframe()
-        pipeline = PredictPipeline()
-        prediction = pipeline.predict(df)[0]
+        model = _model_selection()
+        if model is not None:
+            try:
+                predict_pipeline.resolve_model(model)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+        batch_rows.observe(1, path="single")
+        preds, model_version = scoring_pool.run(predict_pipeline.predict_with_version, data.to_array(), model)
+        prediction = preds[0]
         
-        return render_template('results.html', 
-                            unit=data.unit,
-                            time=data.time,
-                            rul=round(prediction, 2))
+        with metrics.timer(stage_seconds, stage="render"):
+            return render_template('results.html', 
+                                unit=data.unit,
+                                time=data.time,
+                                rul=round(prediction, 2),
+                                model_version=model_version)
+
+def _model_selection():
+    """
+    Model a request asks for: a candidate name, "ensemble" or a {name: weight}
+    mapping under 'model' in the JSON body, or a name in the form or query
+    string. None scores with the default (best) model.
+    """
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict) and payload.get('model') is not None:
+        return payload['model']
+    return request.values.get('model') or None
+
+def _read_batch_request():
+    """Parse the rows of a /predict/batch request into a DataFrame"""
+    upload = request.files.get('file')
+    if upload is not None:
+        import pandas as pd
+        filename = (upload.filename or '').lower()
+        if filename.endswith('.parquet'):
+            try:
+                return pd.read_parquet(upload)
+            except ImportError:
+                raise ValueError("Parquet uploads require pyarrow or fastparquet to be installed")
+        if filename.endswith('.csv') or not filename:
+            return pd.read_csv(upload)
+        raise ValueError("Uploaded file must be .csv or .parquet")
+
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get('rows')
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array of rows or an uploaded CSV/Parquet file")
+    return payload
+
+def _batch_rows(features, start, preds):
+    units = features[start:start + len(preds), 0]
+    times = features[start:start + len(preds), 1]
+    return [
+        {'unit': float(unit), 'time': float(time), 'rul': round(float(rul), 2)}
+        for unit, time, rul in zip(units, times, preds)
+    ]
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Rows as a JSON array or a CSV/Parquet upload. A model with trajectory features
+    needs each unit's cycles from 1 onwards in the batch (422 otherwise).
+    """
+    try:
+        with metrics.timer(stage_seconds, stage="parse"):
+            rows = _read_batch_request()
+        with metrics.timer(stage_seconds, stage="convert"):
+            features = prepare_batch_features(rows)
+        model = _model_selection()
+        if model is not None:
+            predict_pipeline.resolve_model(model)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    max_batch_size = app.config['MAX_BATCH_SIZE']
+    if len(features) > max_batch_size:
+        return jsonify({'error': f"Batch of {len(features)} rows exceeds the limit of {max_batch_size}"}), 413
+
+    batch_rows.observe(len(features), path="batch")
+    chunk_size = app.config['BATCH_CHUNK_SIZE']
+    model_version, chunks = predict_pipeline.predict_batch(features, chunk_size=chunk_size, model=model)
+    # Only responses from a selected model or ensemble name it
+    selected = {} if model is None else {'model': model}
+
+    if len(features) <= chunk_size:
+        predictions = []
+        for start, preds in scoring_pool.run(list, chunks):
+            predictions.extend(_batch_rows(features, start, preds))
+        return jsonify({'model_version': model_version, **selected, 'count': len(predictions),
+                        'predictions': predictions})
+
+    # Large uploads: emit each scored chunk as soon as it is ready. Only the first
+    # chunk can still be turned away with a 503; later ones wait for a slot.
+    first = scoring_pool.run(next, chunks, None)
+
+    def generate():
+        header = json.dumps({'model_version': model_version, **selected, 'count': len(features)})
+        yield header[:-1] + ', "predictions": ['
+        separator = ''
+        chunk = first
+        while chunk is not None:
+            start, preds = chunk
+            for row in _batch_rows(features, start, preds):
+                yield separator + json.dumps(row)
+                separator = ', '
+            chunk = scoring_pool.run(next, chunks, None, block=True)
+        yield ']}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """Newest cycle of one or more units; the service keeps each unit's history"""
+    with metrics.timer(stage_seconds, stage="parse"):
+        payload = request.get_json(silent=True)
+    rows = [payload] if isinstance(payload, dict) else payload
+    if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+        return jsonify({'error': "Expected a JSON object or array of objects with one cycle each"}), 400
+    try:
+        with metrics.timer(stage_seconds, stage="convert"):
+            features = prepare_batch_features(rows)
+        batch_rows.observe(len(features), path="stream")
+        fleets = [row.get('fleet', '') for row in rows]
+        preds, model_version = scoring_pool.run(predict_pipeline.predict_stream, features, fleets)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'model_version': model_version, 'predictions': _batch_rows(features, 0, preds)})
+
+@app.route('/model/version', methods=['GET'])
+def model_version():
+    return jsonify(predict_pipeline.registry.get().describe())
+
+@app.route('/model/candidates', methods=['GET'])
+def model_candidates():
+    """Models a request can select, with their test R2, latency and the default ensemble weights"""
+    try:
+        return jsonify(scoring_pool.run(predict_pipeline.candidates))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/model/batching', methods=['GET'])
+def model_batching():
+    if predict_pipeline.micro_batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **predict_pipeline.micro_batcher.stats()})
+
+@app.route('/model/streaming', methods=['GET'])
+def model_streaming():
+    return jsonify(get_streaming_predictor(predict_pipeline.registry).stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled (RUL_METRICS=0)'}), 404
+    return Response(metrics.render(), mimetype=CONTENT_TYPE)
+
+@app.route('/server/stats', methods=['GET'])
+def server_stats():
+    return jsonify(scoring_pool.stats())
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    # Development server; in production run `gunicorn -c gunicorn.conf.py`
+    app.run(host='0.0.0.0', port=5001, debug=os.environ.get('FLASK_DEBUG') == '1')
 
 
 # use this command to run and see results page
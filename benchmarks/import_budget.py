@@ -0,0 +1,91 @@
+"""
+Import-time budget for the prediction service.
+
+    python -m benchmarks.import_budget --workdir /path/with/artifacts
+
+Imports the serving modules in fresh interpreters and fails (exit status 1)
+when the median import time exceeds its budget, or when a training-only
+module gets imported on the way. Two phases are checked:
+
+  pipeline  importing prediction_pipeline, no model loaded
+  app       importing app.py in --workdir, which loads and warms up the model
+
+Unpickling a scikit-learn model imports sklearn (and through it pandas and
+scipy), so in the app phase the module check only applies when the compiled
+model is served; for the pickled model the modules are reported, not failed.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules serving must not need; each is either training-only or slow to import
+FORBIDDEN_MODULES = ("mlflow", "xgboost", "sklearn", "scipy", "pandas")
+
+_PHASES = {
+    "pipeline": "import src.Predictive_Maintenance_RULPrediction.pipelines.prediction_pipeline",
+    "app": "import app",
+}
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+backend = None
+if "app" in sys.modules and sys.modules["app"].predict_pipeline.registry.active_version is not None:
+    backend = sys.modules["app"].predict_pipeline.registry.get().describe()["backend"]
+loaded = sorted({{name.split(".")[0] for name in sys.modules}} & set({forbidden!r}))
+print(json.dumps({{"seconds": elapsed, "backend": backend, "loaded": loaded}}))
+"""
+
+
+def measure(phase, workdir, repeats):
+    """Median import time of a phase over `repeats` fresh interpreters, with what the last one loaded"""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    code = _PROBE.format(statement=_PHASES[phase], forbidden=FORBIDDEN_MODULES)
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    result = dict(runs[-1])
+    result["seconds"] = float(np.median([run["seconds"] for run in runs]))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the prediction service's import-time budget")
+    parser.add_argument("--workdir", default=os.getcwd(), help="directory holding artifacts/ for the app phase")
+    parser.add_argument("--pipeline-budget-s", type=float, default=0.5)
+    parser.add_argument("--app-budget-s", type=float, default=1.0,
+                        help="budget for importing app.py, including model load and warm-up")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    budgets = {"pipeline": args.pipeline_budget_s, "app": args.app_budget_s}
+    failures = []
+    for phase, budget in budgets.items():
+        result = measure(phase, args.workdir, args.repeats)
+        enforce_modules = phase == "pipeline" or result["backend"] == "compiled"
+        status = "ok"
+        if result["seconds"] > budget:
+            status = "over budget"
+            failures.append(f"{phase}: {result['seconds']:.3f}s > {budget:.3f}s")
+        if result["loaded"] and enforce_modules:
+            status = "imports training modules"
+            failures.append(f"{phase}: imported {', '.join(result['loaded'])}")
+        print(f"{phase:<9} {result['seconds']:.3f}s (budget {budget:.3f}s) backend={result['backend']} "
+              f"loaded={','.join(result['loaded']) or '-'} {status}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,377 @@
+"""
+End-to-end training and inference benchmarks.
+
+    python -m benchmarks.run --scales 1,10 --output benchmarks/results.json
+    python -m benchmarks.run --scales 1,10 --compare benchmarks/baseline.json
+
+Runs offline against notebooks/data/*_FD001.txt, scaled up to larger fleets
+by replicating units with a little sensor noise. Every run happens in a
+scratch directory, so the repo's artifacts/ are never touched. Results are
+one flat JSON object of metrics; --compare flags metrics that got worse
+than a stored baseline by more than --tolerance and exits with status 1.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+DEFAULT_DATA_DIR = os.path.join(REPO_ROOT, "notebooks", "data")
+BATCH_SIZES = (1, 10, 100, 1000, 10000)
+
+# Metrics where larger is better; every other metric is a time or a size
+_HIGHER_IS_BETTER = ("rows_per_s",)
+
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence the components' progress banners so only the report is printed"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+@contextlib.contextmanager
+def _workdir(path, **env):
+    """Run in `path` with extra environment variables; configs read both when they are created"""
+    previous_dir, previous_env = os.getcwd(), {key: os.environ.get(key) for key in env}
+    os.chdir(path)
+    os.environ.update({key: str(value) for key, value in env.items()})
+    try:
+        yield
+    finally:
+        os.chdir(previous_dir)
+        for key, value in previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def make_scaled_fleet(data_dir, output_dir, factor, subset="FD001", seed=0):
+    """
+    Write train/test/RUL files for a fleet `factor` times the size of `subset`.
+    Copy k of every unit gets unit number unit + k * n_units and Gaussian noise
+    of 1% of each column's standard deviation on its settings and sensors.
+    """
+    from src.Predictive_Maintenance_RULPrediction.components.data_ingestion import (
+        CMAPSS_COLUMNS, CMAPSS_DTYPES, RUL_COLUMNS, RUL_DTYPES, read_cmapss_file
+    )
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.RandomState(seed)
+    for prefix in ("train", "test"):
+        frame = read_cmapss_file(os.path.join(data_dir, f"{prefix}_{subset}.txt"), CMAPSS_COLUMNS, CMAPSS_DTYPES)
+        n_units = int(frame["unit"].max())
+        values = frame[CMAPSS_COLUMNS[2:]].to_numpy(np.float64)
+        noise_scale = values.std(axis=0) * 0.01
+        with open(os.path.join(output_dir, f"{prefix}_{subset}.txt"), "w") as file_obj:
+            for copy in range(factor):
+                replica = frame.copy()
+                replica["unit"] += copy * n_units
+                if copy:
+                    replica[CMAPSS_COLUMNS[2:]] = values + rng.normal(size=values.shape) * noise_scale
+                replica.to_csv(file_obj, sep=" ", header=False, index=False, float_format="%.6g")
+    rul = read_cmapss_file(os.path.join(data_dir, f"RUL_{subset}.txt"), RUL_COLUMNS, RUL_DTYPES)
+    with open(os.path.join(output_dir, f"RUL_{subset}.txt"), "w") as file_obj:
+        for _ in range(factor):
+            rul.to_csv(file_obj, sep=" ", header=False, index=False)
+
+
+def _peak_rss_mb():
+    from src.Predictive_Maintenance_RULPrediction.streaming_stats import peak_rss_mb
+    return peak_rss_mb(include_children=True)
+
+
+def bench_data_stages(raw_dir, workdir, repeats=3):
+    """Ingestion and transformation rows/s on the raw files in raw_dir, best of `repeats` runs each"""
+    from src.Predictive_Maintenance_RULPrediction.components.data_ingestion import DataIngestion
+    from src.Predictive_Maintenance_RULPrediction.components.data_transformation import DataTransformation
+    from src.Predictive_Maintenance_RULPrediction.artifact_store import ColumnarArtifactStore
+
+    ingestion, transformation = [], []
+    with _workdir(workdir, RUL_RAW_DATA_DIR=raw_dir), _quiet():
+        for _ in range(repeats):
+            # Both stages skip work whose outputs are already up to date
+            shutil.rmtree("artifacts", ignore_errors=True)
+            start = time.perf_counter()
+            train_path, test_path, rul_path = DataIngestion().initiate_data_ingestion()
+            ingestion.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            DataTransformation().initiate_data_transformation(train_path, test_path, rul_path)
+            transformation.append(time.perf_counter() - start)
+        store = ColumnarArtifactStore()
+        rows = sum(store.read_manifest(path)["n_rows"] for path in (train_path, test_path))
+    results = {
+        "rows": rows,
+        "ingestion_s": min(ingestion),
+        "ingestion_rows_per_s": rows / min(ingestion),
+        "transformation_s": min(transformation),
+        "transformation_rows_per_s": rows / min(transformation),
+    }
+    results["peak_rss_mb"] = _peak_rss_mb()
+    return results
+
+
+def bench_candidates(workdir, max_fit_rows, candidates=None):
+    """
+    Fit time of every model candidate with the first point of its parameter
+    grid, on at most max_fit_rows training rows. Returns (results, fitted models).
+    """
+    from src.Predictive_Maintenance_RULPrediction.components.model_trainer import ModelTrainer
+    from src.Predictive_Maintenance_RULPrediction.artifact_store import ColumnarArtifactStore
+
+    with _workdir(workdir), _quiet():
+        models, params = ModelTrainer().get_model_candidates()
+    train = ColumnarArtifactStore().load_array(os.path.join(workdir, "artifacts", "transformed_train"))
+    if len(train) > max_fit_rows:
+        train = train[np.sort(np.random.RandomState(0).choice(len(train), max_fit_rows, replace=False))]
+
+    results, fitted = {}, {}
+    for name, model in models.items():
+        if candidates and name not in candidates:
+            continue
+        model.set_params(**{key: values[0] for key, values in params.get(name, {}).items()})
+        _log(f"  fitting {name} on {len(train)} rows")
+        start = time.perf_counter()
+        model.fit(train[:, :-1], train[:, -1])
+        key = name.lower().replace(" ", "_")
+        results[f"fit_s.{key}"] = time.perf_counter() - start
+        fitted[name] = model
+    results["fit_peak_rss_mb"] = _peak_rss_mb()
+    return results, fitted
+
+
+def _percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+
+def bench_serving(workdir, n_single=2000, min_time_s=1.0):
+    """Single-row p50/p99 latency and batch throughput of PredictPipeline, per model backend"""
+    from src.Predictive_Maintenance_RULPrediction.artifact_store import ColumnarArtifactStore
+    from src.Predictive_Maintenance_RULPrediction.pipelines.model_registry import ModelRegistry
+    from src.Predictive_Maintenance_RULPrediction.pipelines.prediction_pipeline import (
+        PredictPipeline, FEATURE_COLUMNS
+    )
+
+    results = {}
+    with _workdir(workdir):
+        features = ColumnarArtifactStore().load(os.path.join("artifacts", "test"))[list(FEATURE_COLUMNS)]
+        features = np.ascontiguousarray(features.to_numpy(np.float64))
+        pipeline = PredictPipeline(micro_batching=False)
+        backends = {"pipeline": pipeline.registry}
+        # The pickled model as well, when the pipeline serves the compiled one
+        if pipeline.registry.get().compiled:
+            backends["pickle"] = ModelRegistry(pipeline.model_path, pipeline.preprocessor_path)
+
+        for backend, registry in backends.items():
+            pipeline.registry = registry
+            pipeline._validated_version = None
+            label = registry.get().describe()["backend"]
+            for i in range(50):
+                pipeline.predict(features[i:i + 1])
+            timings = np.empty(n_single)
+            for i in range(n_single):
+                row = features[i % len(features)][None, :]
+                start = time.perf_counter()
+                pipeline.predict(row)
+                timings[i] = time.perf_counter() - start
+            results[f"single_p50_ms.{label}"] = _percentile_ms(timings, 50)
+            results[f"single_p99_ms.{label}"] = _percentile_ms(timings, 99)
+
+            for batch_size in BATCH_SIZES:
+                batch = np.resize(features, (batch_size, features.shape[1]))
+                rows, start = 0, time.perf_counter()
+                while True:
+                    pipeline.predict(batch)
+                    rows += batch_size
+                    elapsed = time.perf_counter() - start
+                    if elapsed >= min_time_s:
+                        break
+                results[f"batch_rows_per_s.{label}.b{batch_size}"] = rows / elapsed
+    results["serving_peak_rss_mb"] = _peak_rss_mb()
+    return results
+
+
+_COLD_START = """
+import time
+start = time.perf_counter()
+from src.Predictive_Maintenance_RULPrediction.pipelines.prediction_pipeline import PredictPipeline, FEATURE_COLUMNS
+import numpy as np
+imported = time.perf_counter()
+pipeline = PredictPipeline(micro_batching=False)
+pipeline.predict(np.ones((1, len(FEATURE_COLUMNS))))
+done = time.perf_counter()
+# VmHWM starts over at exec, unlike ru_maxrss, which keeps the parent's peak
+with open("/proc/self/status") as status:
+    peak_kb = next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+print(imported - start, done - start, peak_kb / 1024)
+"""
+
+
+def bench_cold_start(workdir, repeats=3):
+    """Fresh interpreter to first prediction: wall time, import time and peak RSS (medians)"""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    walls, imports, rss = [], [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", _COLD_START], cwd=workdir, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        walls.append(time.perf_counter() - start)
+        import_s, _, rss_mb = map(float, output.strip().splitlines()[-1].split())
+        imports.append(import_s)
+        rss.append(rss_mb)
+    return {
+        "cold_start_s": float(np.median(walls)),
+        "cold_start_import_s": float(np.median(imports)),
+        "cold_start_peak_rss_mb": float(np.median(rss)),
+    }
+
+
+def _save_serving_model(workdir, fitted):
+    """Persist one fitted candidate as the served model and compile it"""
+    from src.Predictive_Maintenance_RULPrediction.utils import save_object
+    from src.Predictive_Maintenance_RULPrediction.components.model_exporter import ModelExporter
+
+    name = "Random Forest" if "Random Forest" in fitted else next(iter(fitted))
+    with _workdir(workdir), _quiet():
+        artifacts = os.path.join(workdir, "artifacts")
+        save_object(os.path.join(artifacts, "model.pkl"), fitted[name])
+        ModelExporter().initiate_model_export(
+            os.path.join(artifacts, "model.pkl"), os.path.join(artifacts, "preprocessor.pkl"),
+            os.path.join(artifacts, "transformed_test"), os.path.join(artifacts, "transformed_train"),
+        )
+    return name
+
+
+def run(args):
+    scales = [int(scale) for scale in args.scales.split(",")]
+    results = {}
+    scratch = tempfile.mkdtemp(prefix="rul-bench-")
+    try:
+        for scale in scales:
+            _log(f"[x{scale}] data stages")
+            raw_dir = os.path.join(scratch, f"raw_x{scale}")
+            workdir = os.path.join(scratch, f"work_x{scale}")
+            os.makedirs(workdir)
+            if scale == 1:
+                raw_dir = args.data_dir
+            else:
+                make_scaled_fleet(args.data_dir, raw_dir, scale)
+            for key, value in bench_data_stages(raw_dir, workdir, args.repeats).items():
+                results[f"x{scale}.{key}"] = value
+
+            if scale != scales[0]:
+                shutil.rmtree(workdir)
+                continue
+            # Model fitting and serving are measured once, on the smallest fleet
+            _log(f"[x{scale}] model candidates")
+            candidates = args.candidates.split(",") if args.candidates else None
+            fit_results, fitted = bench_candidates(workdir, args.max_fit_rows, candidates)
+            results.update(fit_results)
+            if not args.skip_serving and fitted:
+                model_name = _save_serving_model(workdir, fitted)
+                _log(f"[x{scale}] serving ({model_name})")
+                results.update(bench_serving(workdir))
+                _log(f"[x{scale}] cold start")
+                results.update(bench_cold_start(workdir))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        "meta": _environment(),
+        "config": {"scales": scales, "repeats": args.repeats, "max_fit_rows": args.max_fit_rows, "candidates": args.candidates},
+        "metrics": {key: round(value, 6) for key, value in results.items()},
+    }
+
+
+def _environment():
+    import sklearn
+    import pandas
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "cpu_count": os.cpu_count(),
+        "machine": platform.machine(),
+    }
+
+
+def higher_is_better(metric):
+    return any(token in metric for token in _HIGHER_IS_BETTER)
+
+
+def compare(current, baseline, tolerance):
+    """
+    One row per metric present in both runs with the relative change, and
+    whether it is a regression: worse than the baseline by more than tolerance.
+    """
+    rows = []
+    for metric in sorted(set(current) & set(baseline)):
+        old, new = baseline[metric], current[metric]
+        if not old:
+            continue
+        change = (new - old) / abs(old)
+        worse = -change if higher_is_better(metric) else change
+        rows.append({"metric": metric, "baseline": old, "current": new,
+                     "change": change, "regression": worse > tolerance})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark RUL training and inference")
+    parser.add_argument("--scales", default="1,10", help="fleet sizes as multiples of FD001, e.g. 1,10,100")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="directory with the *_FD001.txt files")
+    parser.add_argument("--max-fit-rows", type=int, default=5000, help="training rows used to time candidate fits")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per data stage; the fastest is reported")
+    parser.add_argument("--candidates", help="comma-separated candidate names to fit (default: all)")
+    parser.add_argument("--skip-serving", action="store_true", help="skip latency, throughput and cold start")
+    parser.add_argument("--output", help="write the results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file_obj:
+            file_obj.write(text + "\n")
+        _log(f"Results written to {args.output}")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as file_obj:
+            baseline = json.load(file_obj)["metrics"]
+        rows = compare(report["metrics"], baseline, args.tolerance)
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            _log(f"{row['metric']:<45} {row['baseline']:>14.4f} {row['current']:>14.4f} {row['change']:>+8.1%} {flag}")
+        regressions = [row["metric"] for row in rows if row["regression"]]
+        _log(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# Production server: gunicorn -c gunicorn.conf.py
+import os
+import multiprocessing
+
+wsgi_app = "app:app"
+bind = os.environ.get("RUL_BIND", "0.0.0.0:5001")
+
+# Worker processes; each runs `threads` request threads in front of its scoring pool
+workers = int(os.environ.get("RUL_WEB_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("RUL_WEB_THREADS", "8"))
+
+# Import the app, and with it the model, once in the master before forking,
+# so the workers share those pages copy-on-write instead of loading their own
+preload_app = True
+
+# On SIGTERM workers stop accepting connections and finish in-flight requests for up to this long
+graceful_timeout = int(os.environ.get("RUL_DRAIN_TIMEOUT_S", "30"))
+timeout = int(os.environ.get("RUL_WORKER_TIMEOUT_S", "60"))
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get("RUL_WORKER_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+
+# /predict/stream keeps unit history per worker process, so it answers 503 with more
+# than one worker unless the load balancer routes each unit to the same worker and
+# RUL_STREAM_STICKY_ROUTING=1 says so. For streaming alone, run RUL_WEB_WORKERS=1.
+os.environ["RUL_SERVING_PROCESSES"] = str(workers)
+
+
+def pre_fork(server, worker):
+    # Lowest worker number not in use, so a replaced worker reuses its predecessor's
+    # unit state snapshot (artifacts/stream_state_worker<id>)
+    in_use = {getattr(other, "rul_worker_id", None) for other in server.WORKERS.values()}
+    worker.rul_worker_id = next(i for i in range(len(in_use) + 1) if i not in in_use)
+
+
+def post_fork(server, worker):
+    os.environ["RUL_WORKER_ID"] = str(worker.rul_worker_id)
+
+
+def worker_int(worker):
+    # SIGINT/SIGQUIT: fail readiness first, then let admitted requests finish
+    _drain(worker)
+
+
+def worker_exit(server, worker):
+    _drain(worker)
+
+
+def _drain(worker):
+    from src.Predictive_Maintenance_RULPrediction.pipelines.serving import get_scoring_pool
+    finished = get_scoring_pool().drain()
+    worker.log.info(f"Worker {worker.pid} drained {'all' if finished else 'not all'} in-flight requests")
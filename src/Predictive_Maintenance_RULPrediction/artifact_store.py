@@ -0,0 +1,240 @@
+import os
+import json
+import pickle
+import shutil
+import hashlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+import numpy as np
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_version(source_digests):
+    """Short version id for a model built from artifacts with the given content hashes"""
+    return hashlib.sha256("".join(source_digests).encode()).hexdigest()[:12]
+
+
+def _atomic_write(file_path, write):
+    """Write through a temporary file and rename, so readers never see a partial file"""
+    tmp_path = f"{file_path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as file_obj:
+        write(file_obj)
+    os.replace(tmp_path, file_path)
+
+
+class ArtifactStore(ABC):
+    """Interface for persisting pipeline artifacts under a path"""
+    @abstractmethod
+    def save(self, path, obj):
+        """Persist `obj` at `path`"""
+
+    @abstractmethod
+    def load(self, path):
+        """Return the object persisted at `path`"""
+
+
+class PickleArtifactStore(ArtifactStore):
+    """Arbitrary Python objects as single pickle files"""
+    def save(self, path, obj):
+        dir_path = os.path.dirname(path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        _atomic_write(path, lambda file_obj: pickle.dump(obj, file_obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def load(self, path):
+        with open(path, 'rb') as file_obj:
+            return pickle.load(file_obj)
+
+
+class MmapArtifactStore(ArtifactStore):
+    """
+    Numeric artifacts as a directory of raw .npy arrays plus manifest.json.
+
+    `save` takes (arrays, manifest) and `load` returns the same pair with every
+    array memory-mapped read-only, so processes loading the same artifact share
+    one page-cached copy instead of each unpickling a private one. The manifest
+    records dtype, shape and sha256 of every array and is written last, so a
+    directory without a manifest is never treated as a complete artifact.
+    """
+    manifest_name = "manifest.json"
+    format_version = 1
+
+    def save(self, path, obj):
+        arrays, manifest = obj
+        os.makedirs(path, exist_ok=True)
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            _atomic_write(os.path.join(path, f"{name}.npy"), lambda file_obj: np.save(file_obj, array))
+        self.write_manifest(path, list(arrays), manifest)
+
+    def write_manifest(self, path, array_names, manifest):
+        """Record the <name>.npy files already written under `path`; this completes the artifact"""
+        array_entries = {}
+        for name in array_names:
+            file_name = f"{name}.npy"
+            array = np.load(os.path.join(path, file_name), mmap_mode='r')
+            array_entries[name] = {
+                "file": file_name,
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "sha256": file_sha256(os.path.join(path, file_name)),
+            }
+            del array
+
+        manifest = dict(manifest)
+        manifest["format_version"] = self.format_version
+        manifest["created_at"] = datetime.now().isoformat(timespec="seconds")
+        manifest["arrays"] = array_entries
+        payload = json.dumps(manifest, indent=2, sort_keys=True).encode()
+        _atomic_write(self.manifest_path(path), lambda file_obj: file_obj.write(payload))
+
+    def load(self, path, verify=False):
+        manifest = self.read_manifest(path)
+        if manifest.get("format_version") != self.format_version:
+            raise ValueError(f"Unsupported artifact format {manifest.get('format_version')} in {path}")
+
+        arrays = {}
+        for name, entry in manifest["arrays"].items():
+            file_path = os.path.join(path, entry["file"])
+            if verify and file_sha256(file_path) != entry["sha256"]:
+                raise ValueError(f"Checksum mismatch for {file_path}")
+            array = np.load(file_path, mmap_mode='r', allow_pickle=False)
+            if array.dtype.str != entry["dtype"] or list(array.shape) != entry["shape"]:
+                raise ValueError(f"{file_path} does not match its manifest entry")
+            arrays[name] = array
+        return arrays, manifest
+
+    def manifest_path(self, path):
+        return os.path.join(path, self.manifest_name)
+
+    def read_manifest(self, path):
+        with open(self.manifest_path(path), 'rb') as file_obj:
+            return json.loads(file_obj.read())
+
+
+class ColumnarArtifactStore(MmapArtifactStore):
+    """
+    Tabular data exchanged between pipeline stages, one typed .npy file per column
+    (numeric, or fixed-width unicode for text such as the subset tag).
+
+    The manifest doubles as the schema: column names, dtypes and the row count,
+    plus optional `metadata` such as the fingerprints of the inputs the table
+    was built from. Values are stored bit-for-bit, so floats survive the
+    round trip exactly, unlike a CSV text conversion.
+    """
+    def save(self, path, obj, metadata=None):
+        # pandas is only needed by the training stages, not by the compiled serving path
+        import pandas as pd
+        frame = obj if isinstance(obj, pd.DataFrame) else pd.DataFrame(obj)
+        columns = [str(column) for column in frame.columns]
+        arrays = {}
+        for i in range(len(columns)):
+            values = frame.iloc[:, i].to_numpy()
+            # Text columns are stored as fixed-width unicode so they load without pickle
+            arrays[f"col_{i:03d}"] = values.astype(str) if values.dtype == object else values
+        manifest = {
+            "kind": "columnar_table",
+            "columns": columns,
+            "n_rows": len(frame),
+            "metadata": metadata or {},
+        }
+        # Build next to the live table and swap it in once complete
+        staging_path = f"{path}.staging"
+        if os.path.exists(staging_path):
+            shutil.rmtree(staging_path)
+        super().save(staging_path, (arrays, manifest))
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(staging_path, path)
+
+    def open_writer(self, path, columns, dtypes, n_rows, metadata=None):
+        """ColumnarTableWriter that fills a table of known size chunk by chunk"""
+        return ColumnarTableWriter(self, path, columns, dtypes, n_rows, metadata)
+
+    def load_columns(self, path, verify=False):
+        """{column name: read-only memory-mapped array} in schema order"""
+        arrays, manifest = super().load(path, verify=verify)
+        return {name: arrays[f"col_{i:03d}"] for i, name in enumerate(manifest["columns"])}
+
+    def load(self, path, verify=False):
+        import pandas as pd
+        return pd.DataFrame(self.load_columns(path, verify=verify))
+
+    def load_array(self, path, dtype=np.float64):
+        """All columns stacked into one C-contiguous (n_rows, n_columns) matrix"""
+        columns = list(self.load_columns(path).values())
+        return np.column_stack(columns).astype(dtype, copy=False) if columns else np.empty((0, 0), dtype)
+
+    def read_metadata(self, path):
+        return self.read_manifest(path).get("metadata", {})
+
+    def matches_inputs(self, path, inputs):
+        """True if a complete table exists and was built from exactly these input fingerprints"""
+        if not os.path.exists(self.manifest_path(path)):
+            return False
+        return self.read_metadata(path).get("inputs") == inputs
+
+
+def path_fingerprint(path):
+    """Content hash of a file, or of an artifact directory via its manifest checksums"""
+    if not os.path.isdir(path):
+        return file_sha256(path)
+    manifest = MmapArtifactStore().read_manifest(path)
+    parts = [json.dumps(manifest.get("columns"))]
+    parts += [entry["sha256"] for _, entry in sorted(manifest["arrays"].items())]
+    return hashlib.sha256("".join(parts).encode()).hexdigest()
+
+
+class ColumnarTableWriter:
+    """
+    Writes a columnar table larger than memory. Every column is pre-allocated
+    as a memory-mapped .npy file of `n_rows` rows, filled with `write(start,
+    chunk)`, and the manifest is only written by `close()`, so an interrupted
+    run never leaves a table that looks complete.
+    """
+    def __init__(self, store, path, columns, dtypes, n_rows, metadata=None):
+        self.store = store
+        self.path = path
+        self.columns = [str(column) for column in columns]
+        self.n_rows = int(n_rows)
+        self.metadata = metadata or {}
+        self.staging_path = f"{path}.staging"
+        if os.path.exists(self.staging_path):
+            shutil.rmtree(self.staging_path)
+        os.makedirs(self.staging_path)
+        self._arrays = [
+            np.lib.format.open_memmap(
+                os.path.join(self.staging_path, f"col_{i:03d}.npy"), mode='w+',
+                dtype=np.dtype(dtype), shape=(self.n_rows,)
+            )
+            for i, dtype in enumerate(dtypes)
+        ]
+
+    def write(self, start, chunk):
+        """Store rows [start, start + len(chunk)); chunk is a 2-D array or a sequence of columns"""
+        columns = chunk.T if isinstance(chunk, np.ndarray) and chunk.ndim == 2 else chunk
+        for array, values in zip(self._arrays, columns):
+            array[start:start + len(values)] = values
+
+    def close(self):
+        for array in self._arrays:
+            array.flush()
+        self._arrays = []
+        manifest = {
+            "kind": "columnar_table",
+            "columns": self.columns,
+            "n_rows": self.n_rows,
+            "metadata": self.metadata,
+        }
+        self.store.write_manifest(self.staging_path, [f"col_{i:03d}" for i in range(len(self.columns))], manifest)
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.rename(self.staging_path, self.path)
@@ -0,0 +1,131 @@
+import numpy as np
+from src.Predictive_Maintenance_RULPrediction.artifact_store import MmapArtifactStore
+
+
+class CompiledPredictor:
+    """
+    Fitted RobustScaler + tree ensemble flattened into contiguous NumPy arrays.
+
+    All trees share one set of node arrays; `roots` holds the index of each
+    tree's root, `children[2 * node + went_left]` the next node and leaves
+    point back to themselves. Every (row, tree) pair
+    walks down in lockstep, one vectorized step per tree level, and pairs that
+    reached a leaf drop out of the active set. Only NumPy is needed to load and
+    evaluate it.
+
+    prediction = base_score + tree_weight * sum(leaf values over trees)
+
+    A RegimeScaler folds in as one row of center/scale per operating regime
+    plus its nearest-centroid lookup (regime_features, regime_weights,
+    regime_bias); a plain RobustScaler as a single row without the lookup.
+    """
+    # Rows traversed together; bounds the (rows x trees) working set
+    chunk_rows = 1024
+
+    def __init__(self, center, scale, feature, threshold, children, is_leaf, value,
+                 roots, max_depth, tree_weight, base_score, metadata=None,
+                 regime_features=None, regime_weights=None, regime_bias=None):
+        self.center = center
+        self.scale = scale
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.is_leaf = is_leaf
+        self.value = value
+        self.roots = roots
+        self.regime_features = regime_features
+        self.regime_weights = regime_weights
+        self.regime_bias = regime_bias
+        self.max_depth = int(max_depth)
+        self.tree_weight = float(tree_weight)
+        self.base_score = float(base_score)
+        self.metadata = metadata or {}
+        self.feature_names_in_ = self.metadata.get("feature_names")
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def touch(self, page_size=4096):
+        """Read one byte of every page of the node arrays, so memory-mapped pages are
+        faulted in now rather than during the first requests"""
+        total = 0
+        for array in (self.feature, self.threshold, self.children, self.is_leaf, self.value, self.roots):
+            total += int(np.ascontiguousarray(array).reshape(-1).view(np.uint8)[::page_size].sum())
+        return total
+
+    @property
+    def n_regimes(self):
+        return 1 if self.regime_bias is None else len(self.regime_bias)
+
+    def transform(self, X):
+        """Apply the folded scaler: (X - center) / scale, with the center and scale of each row's regime"""
+        if self.regime_bias is None:
+            return (X - self.center) / self.scale
+        regimes = np.argmin(X[:, self.regime_features] @ self.regime_weights + self.regime_bias, axis=1)
+        return (X - self.center[regimes]) / self.scale[regimes]
+
+    def predict_scaled(self, X_scaled):
+        """Evaluate the ensemble on already-scaled features"""
+        # Trees compare float32 feature values, as sklearn and XGBoost do
+        X_scaled = np.asarray(X_scaled, dtype=np.float32)
+        preds = np.empty(len(X_scaled), dtype=np.float64)
+        for start in range(0, len(X_scaled), self.chunk_rows):
+            chunk = X_scaled[start:start + self.chunk_rows]
+            preds[start:start + len(chunk)] = self._traverse(chunk)
+        return preds
+
+    def predict(self, X):
+        """Scale raw features in FEATURE_COLUMNS order and evaluate the ensemble"""
+        return self.predict_scaled(self.transform(np.asarray(X, dtype=np.float64)))
+
+    def _traverse(self, X_scaled):
+        n_rows, n_features = X_scaled.shape
+        flat_X = X_scaled.ravel()
+        # One entry per (row, tree) pair, row-major
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees)
+        active = np.flatnonzero(~self.is_leaf.take(node))
+        current = node.take(active)
+        while active.size:
+            go_left = flat_X.take(row_offset.take(active) + self.feature.take(current)) <= self.threshold.take(current)
+            current = self.children.take(2 * current + go_left)
+            node[active] = current
+            still_inside = ~self.is_leaf.take(current)
+            active = active[still_inside]
+            current = current[still_inside]
+        leaf_values = self.value.take(node).reshape(n_rows, self.n_trees)
+        return self.base_score + self.tree_weight * leaf_values.sum(axis=1)
+
+    _array_fields = ("center", "scale", "feature", "threshold", "children", "is_leaf", "value", "roots")
+    _regime_fields = ("regime_features", "regime_weights", "regime_bias")
+
+    def save(self, path):
+        """Write the arrays as a memory-mappable artifact directory with a JSON manifest"""
+        manifest = {
+            "kind": "compiled_predictor",
+            "max_depth": self.max_depth,
+            "tree_weight": self.tree_weight,
+            "base_score": self.base_score,
+            "metadata": self.metadata,
+        }
+        arrays = {name: getattr(self, name) for name in self._array_fields}
+        if self.regime_bias is not None:
+            arrays.update({name: getattr(self, name) for name in self._regime_fields})
+        MmapArtifactStore().save(path, (arrays, manifest))
+
+    @classmethod
+    def load(cls, path, verify=False):
+        """Memory-map a saved artifact; `verify` also checks every array's sha256"""
+        arrays, manifest = MmapArtifactStore().load(path, verify=verify)
+        return cls(
+            max_depth=manifest["max_depth"],
+            tree_weight=manifest["tree_weight"],
+            base_score=manifest["base_score"],
+            metadata=manifest["metadata"],
+            **arrays
+        )
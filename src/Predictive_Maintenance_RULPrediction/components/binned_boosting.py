@@ -0,0 +1,122 @@
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+
+class QuantileBinner:
+    """
+    Quantizes each feature into at most `max_bins` (<= 255) bins at its
+    quantiles, giving a uint8 matrix an eighth the size of the float64 one.
+    Features with few distinct values get one bin per value. Values and
+    edges are compared in float32, as the tree ensembles and the compiled
+    predictor compare them, so an exported model splits identically.
+
+    Deliberately not an sklearn estimator: sklearn.clone copies estimator
+    parameters unfitted, while a plain object is deep-copied with its edges,
+    so every fold bins with the same fitted edges.
+    """
+    def __init__(self, max_bins=255, subsample=200000, random_state=0):
+        if not 2 <= max_bins <= 255:
+            raise ValueError("max_bins must be between 2 and 255 to fit in uint8")
+        self.max_bins = max_bins
+        self.subsample = subsample
+        self.random_state = random_state
+        self.bin_edges_ = None
+
+    def fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        sample = X
+        if len(X) > self.subsample:
+            rows = np.random.RandomState(self.random_state).choice(len(X), self.subsample, replace=False)
+            sample = X[rows]
+        self.bin_edges_ = []
+        for column in sample.T:
+            distinct = np.unique(column[np.isfinite(column)])
+            if len(distinct) <= self.max_bins:
+                edges = (distinct[:-1] + distinct[1:]) / 2
+            else:
+                quantiles = np.linspace(0, 100, self.max_bins + 1)[1:-1]
+                edges = np.unique(np.percentile(column, quantiles, method="midpoint"))
+            self.bin_edges_.append(np.unique(edges.astype(np.float32)))
+        return self
+
+    @property
+    def n_bins_(self):
+        return [len(edges) + 1 for edges in self.bin_edges_]
+
+    def transform(self, X):
+        """uint8 bin index of every value: bin i holds edges[i - 1] < x <= edges[i]"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[1] != len(self.bin_edges_):
+            raise ValueError(f"Expected {len(self.bin_edges_)} features, got {X.shape[1]}")
+        binned = np.empty(X.shape, dtype=np.uint8)
+        for j, edges in enumerate(self.bin_edges_):
+            binned[:, j] = np.searchsorted(edges, X[:, j], side="left")
+        return binned
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+    def __repr__(self):
+        fitted = "unfitted" if self.bin_edges_ is None else f"{len(self.bin_edges_)} features"
+        return f"QuantileBinner(max_bins={self.max_bins}, {fitted})"
+
+
+class BinnedGradientBoostingRegressor(RegressorMixin, BaseEstimator):
+    """
+    Histogram gradient boosting on features quantized by a QuantileBinner.
+
+    `fit` and `predict` take raw features, or a uint8 matrix already binned
+    by `binner`: the trainer bins the training data once and every boosting
+    round and cross-validation fold reuses it. Split finding scans at most
+    255 bin histograms per feature instead of sorted raw values, and runs on
+    all the threads OpenMP is given.
+    """
+    def __init__(self, learning_rate=0.1, max_iter=100, max_leaf_nodes=31, max_depth=None,
+                 min_samples_leaf=20, l2_regularization=0.0, max_bins=255, early_stopping=False,
+                 random_state=None, binner=None):
+        self.learning_rate = learning_rate
+        self.max_iter = max_iter
+        self.max_leaf_nodes = max_leaf_nodes
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.l2_regularization = l2_regularization
+        self.max_bins = max_bins
+        self.early_stopping = early_stopping
+        self.random_state = random_state
+        self.binner = binner
+
+    @property
+    def prebinned(self):
+        """True when fit accepts the matrix binned once by the trainer (see TrainingScheduler)"""
+        return self.binner is not None
+
+    def _bin(self, X, binner):
+        X = np.asarray(X)
+        if X.dtype == np.uint8:
+            return X
+        return binner.transform(X)
+
+    def fit(self, X, y):
+        X = np.asarray(X)
+        if X.dtype == np.uint8 and self.binner is None:
+            raise ValueError("uint8 input is taken as pre-binned and needs the binner that produced it")
+        self.binner_ = self.binner if self.binner is not None else QuantileBinner(self.max_bins).fit(X)
+        self.model_ = HistGradientBoostingRegressor(
+            learning_rate=self.learning_rate,
+            max_iter=self.max_iter,
+            max_leaf_nodes=self.max_leaf_nodes,
+            max_depth=self.max_depth,
+            min_samples_leaf=self.min_samples_leaf,
+            l2_regularization=self.l2_regularization,
+            # Bins are already at most 255 distinct values, so HGB keeps them one to one
+            max_bins=255,
+            early_stopping=self.early_stopping,
+            random_state=self.random_state,
+        )
+        self.model_.fit(self._bin(X, self.binner_), y)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def predict(self, X):
+        return self.model_.predict(self._bin(X, self.binner_))
@@ -2,37 +2,66 @@ import pandas as pd
 import numpy as np
 from src.Predictive_Maintenance_RULPrediction.logger import logging
 from src.Predictive_Maintenance_RULPrediction.exception import CustomException
-import mlflow
-import mlflow.sklearn
-logging.basicConfig(filename='data_ingestion.log', level=logging.INFO, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+from src.Predictive_Maintenance_RULPrediction.artifact_store import ColumnarArtifactStore, file_sha256
+from src.Predictive_Maintenance_RULPrediction.streaming_stats import chunk_rows_for_budget, count_data_lines, peak_rss_mb
 
 
 import os
 import sys
+import glob
 from pathlib import Path
-import logging
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-# Configure logging
-logging.basicConfig(
-    filename='data_ingestion.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filemode='w'  # Overwrite existing log file
-)
+# Logging is configured once, in logger.py
 logger = logging.getLogger()
 
+# Fixed C-MAPSS schema: 26 whitespace-separated columns per cycle, one RUL value per test unit
+CMAPSS_COLUMNS = ['unit', 'time', 'operational_setting_1', 'operational_setting_2', 'operational_setting_3',
+   'sensor_1', 'sensor_2', 'sensor_3', 'sensor_4', 'sensor_5', 'sensor_6', 'sensor_7', 'sensor_8',
+   'sensor_9', 'sensor_10', 'sensor_11', 'sensor_12', 'sensor_13', 'sensor_14', 'sensor_15', 'sensor_16',
+   'sensor_17', 'sensor_18', 'sensor_19', 'sensor_20', 'sensor_21']
+CMAPSS_DTYPES = {name: (np.int64 if name in ('unit', 'time') else np.float64) for name in CMAPSS_COLUMNS}
+RUL_COLUMNS = ['RUL']
+RUL_DTYPES = {'RUL': np.int64}
+
+
+def read_cmapss_file(path, columns, dtypes, chunksize=None):
+    """
+    Parse one whitespace-separated C-MAPSS file with a fixed schema (C parser, no
+    type inference). With `chunksize` this returns an iterator of DataFrames.
+    """
+    return pd.read_csv(path, sep=r'\s+', header=None, names=columns, dtype=dtypes,
+                       usecols=range(len(columns)), engine='c', chunksize=chunksize)
+
+
 class DataIngestionConfig:
     def __init__(self):
         self.artifacts_dir = os.path.join(os.getcwd(), 'artifacts')
-        self.train_data_path = os.path.join(self.artifacts_dir, 'train.csv')
-        self.test_data_path = os.path.join(self.artifacts_dir, 'test.csv')
-        self.rul_data_path = os.path.join(self.artifacts_dir, 'rul.csv')
+        # Columnar tables (one .npy per column + manifest.json), see ColumnarArtifactStore
+        self.train_data_path = os.path.join(self.artifacts_dir, 'train')
+        self.test_data_path = os.path.join(self.artifacts_dir, 'test')
+        self.rul_data_path = os.path.join(self.artifacts_dir, 'rul')
+        # Directory holding the raw files, or a glob matching several such directories
+        self.raw_data_dir = os.environ.get("RUL_RAW_DATA_DIR", os.path.join(os.getcwd(), 'notebooks', 'data'))
+        # Subsets to ingest, e.g. "FD001,FD003"; empty means every subset found in raw_data_dir
+        subsets = os.environ.get("RUL_SUBSETS", "")
+        self.subsets = [subset.strip() for subset in subsets.split(",") if subset.strip()] or None
+        # File name prefix of each table, as in train_FD001.txt / test_FD001.txt / RUL_FD001.txt
+        self.file_prefixes = {'train': 'train', 'test': 'test', 'rul': 'RUL'}
+        self.file_extension = '.txt'
+        # Run-to-failure trajectories completed since the raw files were published, in the train
+        # file format and named train_<SUBSET>_<anything>.txt; appended to that subset's train table
+        self.new_units_dir = os.environ.get("RUL_NEW_UNITS_DIR", os.path.join(os.getcwd(), 'new_units'))
+        self.max_workers = int(os.environ.get("RUL_INGESTION_WORKERS", min(8, os.cpu_count() or 1)))
+        # Streaming mode reads the raw files in chunks sized to stay within memory_limit_mb
+        self.streaming = os.environ.get("RUL_STREAMING", "0") == "1"
+        self.memory_limit_mb = float(os.environ.get("RUL_MEMORY_LIMIT_MB", "1024"))
 
 class DataIngestion:
     def __init__(self):
         self.ingestion_config = DataIngestionConfig()
+        self.store = ColumnarArtifactStore()
         logger.info("DataIngestion initialized")
 
     def _verify_input_files(self, *paths):
@@ -42,22 +71,128 @@ class DataIngestion:
                 raise FileNotFoundError(f"Input file not found: {path}")
             logger.info(f"Verified input file exists: {path}")
 
-    def initiate_data_ingestion(self):
+    def discover_input_paths(self):
+        """
+        Find the raw files of every configured subset: {subset: {table name: path}}.
+        File names are matched case-insensitively, so RUL_FD001.txt and rul_FD001.txt both work.
+        """
+        config = self.ingestion_config
+        if glob.has_magic(config.raw_data_dir):
+            data_dirs = sorted(path for path in glob.glob(config.raw_data_dir) if os.path.isdir(path))
+        else:
+            data_dirs = [config.raw_data_dir]
+
+        # {lower-case file name: path}; the first directory wins for duplicate names
+        files = {}
+        for data_dir in data_dirs:
+            if not os.path.isdir(data_dir):
+                raise FileNotFoundError(f"Raw data directory not found: {data_dir}")
+            for file_name in sorted(os.listdir(data_dir)):
+                files.setdefault(file_name.lower(), os.path.join(data_dir, file_name))
+
+        subsets = config.subsets
+        if subsets is None:
+            prefix = f"{config.file_prefixes['train']}_".lower()
+            subsets = sorted(
+                name[len(prefix):-len(config.file_extension)].upper() for name in files
+                if name.startswith(prefix) and name.endswith(config.file_extension)
+            )
+        if not subsets:
+            raise FileNotFoundError(f"No C-MAPSS subsets found in {config.raw_data_dir}")
+
+        input_paths = {}
+        for subset in subsets:
+            input_paths[subset] = {}
+            for name, file_prefix in config.file_prefixes.items():
+                file_name = f"{file_prefix}_{subset}{config.file_extension}"
+                if file_name.lower() not in files:
+                    raise FileNotFoundError(f"Input file not found: {file_name} in {config.raw_data_dir}")
+                input_paths[subset][name] = files[file_name.lower()]
+        return input_paths
+
+    def discover_new_unit_files(self, subsets):
+        """{subset: [paths]} of the new-unit train files for each subset, in file name order"""
+        config = self.ingestion_config
+        found = {subset: [] for subset in subsets}
+        if not os.path.isdir(config.new_units_dir):
+            return found
+        for file_name in sorted(os.listdir(config.new_units_dir)):
+            stem, extension = os.path.splitext(file_name)
+            parts = stem.split('_', 2)
+            if (extension.lower() != config.file_extension or len(parts) != 3
+                    or parts[0].lower() != config.file_prefixes['train'].lower()):
+                continue
+            if parts[1].upper() in found:
+                found[parts[1].upper()].append(os.path.join(config.new_units_dir, file_name))
+        return found
+
+    def _table_files(self, input_paths, name):
+        """{subset: [paths]} making up one table: the raw file plus, for train, its new-unit files"""
+        new_units = self.discover_new_unit_files(input_paths) if name == 'train' else {}
+        return {subset: [paths[name]] + new_units.get(subset, []) for subset, paths in input_paths.items()}
+
+    def _ingest_streaming(self, input_paths, name, schema, output_path, inputs):
+        """Write one table chunk by chunk without ever holding a whole file in memory"""
+        columns, dtypes = schema
+        table_files = self._table_files(input_paths, name)
+        # First pass counts rows so every column can be pre-allocated on disk
+        counts = {subset: sum(count_data_lines(path) for path in paths) for subset, paths in table_files.items()}
+        partitions, start = {}, 0
+        for subset, count in counts.items():
+            partitions[subset] = [start, start + count]
+            start += count
+
+        subset_dtype = f"<U{max(len(subset) for subset in input_paths)}"
+        writer = self.store.open_writer(
+            output_path, ['subset'] + columns, [subset_dtype] + [dtypes[column] for column in columns],
+            n_rows=start, metadata={"inputs": inputs, "partitions": partitions}
+        )
+        chunk_rows = chunk_rows_for_budget(self.ingestion_config.memory_limit_mb, len(columns) + 1)
+        for subset, paths in table_files.items():
+            row, unit_offset = partitions[subset][0], 0
+            for path in paths:
+                max_unit = 0
+                for chunk in read_cmapss_file(path, columns, dtypes, chunksize=chunk_rows):
+                    if 'unit' in chunk:
+                        # Units of each new-unit file are numbered after those already in the subset
+                        chunk['unit'] += unit_offset
+                        max_unit = max(max_unit, int(chunk['unit'].max()))
+                    writer.write(row, [np.full(len(chunk), subset)] + [chunk[column].to_numpy() for column in columns])
+                    row += len(chunk)
+                unit_offset = max(unit_offset, max_unit)
+            if row != partitions[subset][1]:
+                raise RuntimeError(f"Row count of {', '.join(paths)} changed while it was being read")
+        writer.close()
+        logger.info(f"Streamed {name} ({start} rows) to {output_path}, peak RSS {peak_rss_mb():.0f} MB")
+        return {'output_path': output_path, 'shape': (start, len(columns) + 1)}
+
+    def flat_input_paths(self):
+        """{'<table>_<subset>': path} for every raw file, as declared to the stage cache"""
+        input_paths = self.discover_input_paths()
+        flat = {
+            f"{name}_{subset}": path
+            for subset, paths in input_paths.items()
+            for name, path in paths.items()
+        }
+        for subset, paths in self.discover_new_unit_files(input_paths).items():
+            flat.update({f"new_units_{os.path.basename(path)}": path for path in paths})
+        return flat
+
+    def initiate_data_ingestion(self, reuse=True):
+        """
+        Parse the raw files into columnar tables. With `reuse`, a table already
+        built from the same files is kept; the stage cache passes False, since it
+        reruns the stage exactly when its own key (inputs and code) changed.
+        """
         logger.info("Starting data ingestion process")
         print("=== Starting Data Ingestion ===")
 
         try:
-            # Define input paths (using raw strings for Windows paths)
-            input_paths = {
-                'train': r'C:\RULPrediction\notebooks\data\train_FD001.txt',
-                'test': r'C:\RULPrediction\notebooks\data\test_FD001.txt',
-                'rul': r'C:\RULPrediction\notebooks\data\rul_FD001.txt'
-            }
-
-            # 1. Verify input files exist
+            # 1. Discover and verify input files
             print("\n[1/4] Verifying input files...")
-            self._verify_input_files(*input_paths.values())
-            print("✓ Input files verified")
+            input_paths = self.discover_input_paths()
+            self._verify_input_files(*(path for paths in input_paths.values() for path in paths.values()))
+            print(f"✓ Input files verified for subsets: {', '.join(input_paths)}")
 
             # 2. Create artifacts directory
             print("\n[2/4] Creating artifacts directory...")
@@ -68,19 +203,64 @@ class DataIngestion:
 
             # 3. Read and save data
             print("\n[3/4] Processing data files...")
+            schemas = {'train': (CMAPSS_COLUMNS, CMAPSS_DTYPES), 'test': (CMAPSS_COLUMNS, CMAPSS_DTYPES),
+                       'rul': (RUL_COLUMNS, RUL_DTYPES)}
             results = {}
-            for name, path in input_paths.items():
-                print(f"Processing {name} data...")
-                df = pd.read_csv(path, sep='\s+', header=None)
+            pending = {}
+            for name in schemas:
                 output_path = getattr(self.ingestion_config, f"{name}_data_path")
-                df.to_csv(output_path, index=False)
+                inputs = {subset: file_sha256(paths[name]) for subset, paths in input_paths.items()}
+                if name == 'train':
+                    for subset, paths in self.discover_new_unit_files(input_paths).items():
+                        inputs.update({f"{subset}/{os.path.basename(path)}": file_sha256(path) for path in paths})
+
+                # Skip parsing when the table was already built from these exact files
+                if reuse and self.store.matches_inputs(output_path, inputs):
+                    manifest = self.store.read_manifest(output_path)
+                    shape = (manifest["n_rows"], len(manifest["columns"]))
+                    results[name] = {'output_path': output_path, 'shape': shape}
+                    print(f"✓ {name} data unchanged, reusing {output_path}")
+                    logger.info(f"Skipped ingestion of {name}: inputs unchanged")
+                    continue
+                pending[name] = (output_path, inputs)
+
+            if self.ingestion_config.streaming:
+                for name, (output_path, inputs) in pending.items():
+                    print(f"Processing {name} data in chunks...")
+                    results[name] = self._ingest_streaming(input_paths, name, schemas[name], output_path, inputs)
+                    print(f"✓ {name} data saved to {output_path}")
+                pending = {}
+                print(f"Peak RSS: {peak_rss_mb():.0f} MB (limit {self.ingestion_config.memory_limit_mb:.0f} MB)")
+
+            # Parse every (table, subset) file in parallel; the C parser releases the GIL
+            table_files = {name: self._table_files(input_paths, name) for name in pending}
+            jobs = [(name, subset, path) for name in pending for subset in input_paths
+                    for path in table_files[name][subset]]
+            with ThreadPoolExecutor(max_workers=max(1, min(self.ingestion_config.max_workers, len(jobs) or 1))) as pool:
+                frames = dict(zip(jobs, pool.map(lambda job: read_cmapss_file(job[2], *schemas[job[0]]), jobs)))
+
+            for name, (output_path, inputs) in pending.items():
+                print(f"Processing {name} data...")
+                # One table per kind, partitioned into contiguous row ranges per subset
+                parts, partitions, start = [], {}, 0
+                for subset in input_paths:
+                    subset_frames = [frames[(name, subset, path)] for path in table_files[name][subset]]
+                    # Units of each new-unit file are numbered after those already in the subset
+                    for previous, frame in zip(subset_frames, subset_frames[1:]):
+                        frame['unit'] += previous['unit'].max()
+                    frame = pd.concat(subset_frames, ignore_index=True)
+                    frame.insert(0, 'subset', subset)
+                    parts.append(frame)
+                    partitions[subset] = [start, start + len(frame)]
+                    start += len(frame)
+                df = pd.concat(parts, ignore_index=True)
+                self.store.save(output_path, df, metadata={"inputs": inputs, "partitions": partitions})
                 
                 # Verify output
-                if not os.path.exists(output_path):
+                if not os.path.exists(self.store.manifest_path(output_path)):
                     raise RuntimeError(f"Failed to create output file: {output_path}")
                 
                 results[name] = {
-                    'input_path': path,
                     'output_path': output_path,
                     'shape': df.shape
                 }
@@ -2,20 +2,21 @@ import os
 import sys
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import RobustScaler
 from src.Predictive_Maintenance_RULPrediction.logger import logging
 from src.Predictive_Maintenance_RULPrediction.exception import CustomException
 from src.Predictive_Maintenance_RULPrediction.utils import save_object
+from src.Predictive_Maintenance_RULPrediction.artifact_store import ColumnarArtifactStore, file_sha256, path_fingerprint
+from src.Predictive_Maintenance_RULPrediction.components.feature_engineering import (
+    FeatureEngineer, FeatureEngineeringConfig
+)
+from src.Predictive_Maintenance_RULPrediction.components.regime_scaler import RegimeScaler
+from src.Predictive_Maintenance_RULPrediction.streaming_stats import (
+    ReservoirQuantileSketch, chunk_rows_for_budget, peak_rss_mb
+)
 from dataclasses import dataclass
 from pathlib import Path
 
-# Configure logging
-logging.basicConfig(
-    filename='data_transformation.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filemode='w'
-)
+# Logging is configured once, in logger.py
 logger = logging.getLogger()
 
 @dataclass
@@ -23,12 +24,35 @@ class DataTransformationConfig:
     def __init__(self):
         self.artifacts_dir = os.path.join(os.getcwd(), 'artifacts')
         self.preprocessor_obj_file_path = os.path.join(self.artifacts_dir, 'preprocessor.pkl')
-        self.transformed_train_path = os.path.join(self.artifacts_dir, 'transformed_train.csv')
-        self.transformed_test_path = os.path.join(self.artifacts_dir, 'transformed_test.csv')
+        # Columnar tables: scaled feature columns followed by RUL
+        self.transformed_train_path = os.path.join(self.artifacts_dir, 'transformed_train')
+        self.transformed_test_path = os.path.join(self.artifacts_dir, 'transformed_test')
+        # Dropping columns for better model performance
+        self.columns_to_drop = ['operational_setting_3','sensor_1','sensor_5','sensor_6',
+                                'sensor_10','sensor_16','sensor_18','sensor_19']
+        self.rul_cap = 51
+        # Streaming mode: two passes over memory-mapped chunks, scaler fitted from a quantile sketch
+        self.streaming = os.environ.get("RUL_STREAMING", "0") == "1"
+        self.memory_limit_mb = float(os.environ.get("RUL_MEMORY_LIMIT_MB", "1024"))
+        self.sketch_size = int(os.environ.get("RUL_SKETCH_SIZE", "100000"))
+        self.scaler_sketch_path = os.path.join(self.artifacts_dir, 'scaler_sketch')
+        # Optional per-unit trajectory features (rolling mean/std/slope, EWMA, rate)
+        self.feature_engineering = FeatureEngineeringConfig()
+        # Operating regimes: clusters of these settings get their own sensor scaling (see RegimeScaler).
+        # operational_setting_3 is dropped above; in C-MAPSS it is fixed by the other two.
+        self.regime_columns = ['operational_setting_1', 'operational_setting_2']
+        self.max_regimes = int(os.environ.get("RUL_MAX_REGIMES", "6"))
+        # Largest share of the settings' variance left within regimes for the clusters to count as regimes
+        self.regime_tolerance = float(os.environ.get("RUL_REGIME_TOLERANCE", "0.001"))
+
+    def regime_scaler(self):
+        """Unfitted scaler with the configured regime detection"""
+        return RegimeScaler(self.regime_columns, max_regimes=self.max_regimes, tolerance=self.regime_tolerance)
 
 class DataTransformation:
     def __init__(self):
         self.data_transformation_config = DataTransformationConfig()
+        self.store = ColumnarArtifactStore()
         logger.info("DataTransformation initialized")
 
     def _verify_input_files(self, *paths):
@@ -38,7 +62,142 @@ class DataTransformation:
                 raise FileNotFoundError(f"Input file not found: {path}")
             logger.info(f"Verified input file exists: {path}")
 
-    def initiate_data_transformation(self, train_path, test_path, rul_path):
+    def _reuse_outputs(self, inputs):
+        """Load the previous outputs if they were built from the same input tables, else None"""
+        config = self.data_transformation_config
+        tables = (config.transformed_train_path, config.transformed_test_path)
+        if not all(self.store.matches_inputs(path, inputs) for path in tables):
+            return None
+        preprocessor_path = config.preprocessor_obj_file_path
+        expected = self.store.read_metadata(config.transformed_train_path).get("preprocessor_sha256")
+        if not os.path.exists(preprocessor_path) or file_sha256(preprocessor_path) != expected:
+            return None
+        return tuple(self.store.load_array(path) for path in tables)
+
+    def _chunk_bounds(self, columns, chunk_rows):
+        """
+        (start, stop) row ranges of about chunk_rows rows that never split a
+        unit, so per-unit trajectory features see whole units. Units are
+        assumed to be stored contiguously, as in the raw C-MAPSS files.
+        """
+        n_rows = len(columns['unit'])
+        unit_starts = [0]
+        for start in range(0, n_rows, chunk_rows):
+            # Include the previous row so a unit change at the chunk boundary is found
+            lo = max(start - 1, 0)
+            stop = min(start + chunk_rows, n_rows)
+            subset, unit = columns['subset'][lo:stop], columns['unit'][lo:stop]
+            changes = np.flatnonzero((subset[1:] != subset[:-1]) | (unit[1:] != unit[:-1])) + lo + 1
+            unit_starts.extend(changes[changes >= max(start, 1)].tolist())
+        unit_starts = np.asarray(unit_starts + [n_rows])
+
+        bounds, start = [], 0
+        while start < n_rows:
+            # Last unit start within reach, or the next one if a single unit is longer than a chunk
+            stop = unit_starts[np.searchsorted(unit_starts, start + chunk_rows, side='right') - 1]
+            if stop <= start:
+                stop = unit_starts[np.searchsorted(unit_starts, start, side='right')]
+            bounds.append((start, int(stop)))
+            start = int(stop)
+        return bounds
+
+    def _chunk_features(self, columns, start, stop, base_names, engineer):
+        """Model input columns of rows [start, stop), with engineered features if enabled"""
+        features = np.column_stack([columns[name][start:stop] for name in base_names]).astype(np.float64)
+        if engineer is not None:
+            features = engineer.transform(features, groups=pd.factorize(columns['subset'][start:stop])[0])
+        return features
+
+    def _unit_max_time(self, columns, bounds, sketch=None, base_names=None, engineer=None):
+        """
+        First pass: last cycle of every (subset, unit), built from per-chunk
+        maxima; optionally feeds the model input columns into a quantile sketch.
+        """
+        maxima = None
+        for start, stop in bounds:
+            keys = pd.DataFrame({name: columns[name][start:stop] for name in ('subset', 'unit', 'time')})
+            chunk_max = keys.groupby(['subset', 'unit'])['time'].max()
+            # A unit stored in more than one place may appear in several chunks; combine partial maxima
+            maxima = chunk_max if maxima is None else pd.concat([maxima, chunk_max]).groupby(level=[0, 1]).max()
+            if sketch is not None:
+                sketch.update(self._chunk_features(columns, start, stop, base_names, engineer))
+        return maxima
+
+    def _write_transformed(self, columns, bounds, maxima, rul_offset, scaler, base_names, engineer,
+                           output_path, metadata):
+        """Second pass: RUL target and scaled features, written chunk by chunk"""
+        rul_cap = self.data_transformation_config.rul_cap
+        feature_names = list(scaler.feature_names_in_)
+        writer = self.store.open_writer(
+            output_path, feature_names + ['RUL'], [np.float64] * (len(feature_names) + 1),
+            len(columns['time']), metadata
+        )
+        for start, stop in bounds:
+            keys = pd.MultiIndex.from_arrays([columns['subset'][start:stop], columns['unit'][start:stop]])
+            rul = maxima.reindex(keys).to_numpy() - columns['time'][start:stop]
+            if rul_offset is not None:
+                rul = rul + rul_offset.reindex(keys).to_numpy()
+            rul = np.minimum(rul, rul_cap)
+            features = self._chunk_features(columns, start, stop, base_names, engineer)
+            writer.write(start, np.c_[scaler.transform(features), rul])
+        writer.close()
+
+    def _transform_streaming(self, train_path, test_path, rul_path, inputs):
+        """
+        Bounded-memory variant of the transformation for inputs larger than RAM.
+        Returns (None, None, preprocessor_path); the transformed tables are on disk.
+        """
+        config = self.data_transformation_config
+        train_columns = self.store.load_columns(train_path)
+        test_columns = self.store.load_columns(test_path)
+        excluded = set(config.columns_to_drop) | {'subset'}
+        base_names = [name for name in train_columns if name not in excluded]
+        engineer = FeatureEngineer.from_config(base_names, config.feature_engineering)
+        feature_names = engineer.feature_names if engineer is not None else base_names
+        chunk_rows = chunk_rows_for_budget(config.memory_limit_mb, len(train_columns) + len(feature_names))
+        train_bounds = self._chunk_bounds(train_columns, chunk_rows)
+        test_bounds = self._chunk_bounds(test_columns, chunk_rows)
+
+        # Pass 1: per-unit last cycle, and quantile sketch of the training features
+        sketch = ReservoirQuantileSketch(len(feature_names), capacity=config.sketch_size)
+        train_max = self._unit_max_time(train_columns, train_bounds, sketch, base_names, engineer)
+        test_max = self._unit_max_time(test_columns, test_bounds)
+        scaler = config.regime_scaler().fit(sketch.sample[:sketch.n_filled], feature_names)
+        logger.info(f"Fitted RegimeScaler ({scaler.n_regimes_} regimes) from a {sketch.n_filled}-row sketch "
+                    f"of {sketch.n_seen} rows")
+
+        # The RUL file has one row per test unit, in unit order within each subset
+        rul_df = self.store.load(rul_path)
+        rul_df['unit'] = rul_df.groupby('subset').cumcount() + 1
+        rul_offset = rul_df.set_index(['subset', 'unit'])['RUL']
+
+        print("\n[4/4] Saving transformed data...")
+        save_object(file_path=config.preprocessor_obj_file_path, obj=scaler)
+        sketch.save(config.scaler_sketch_path, metadata={"feature_names": feature_names})
+        metadata = {
+            "inputs": inputs,
+            "preprocessor_sha256": file_sha256(config.preprocessor_obj_file_path),
+        }
+
+        # Pass 2: targets and scaled features
+        self._write_transformed(train_columns, train_bounds, train_max, None, scaler, base_names, engineer,
+                                config.transformed_train_path, metadata)
+        self._write_transformed(test_columns, test_bounds, test_max, rul_offset, scaler, base_names, engineer,
+                                config.transformed_test_path, metadata)
+        for name in ('preprocessor_obj_file_path', 'transformed_train_path', 'transformed_test_path'):
+            print(f"✓ {name} saved to {getattr(config, name)}")
+
+        print(f"Peak RSS: {peak_rss_mb():.0f} MB (limit {config.memory_limit_mb:.0f} MB, {chunk_rows} rows per chunk)")
+        logger.info(f"Streaming transformation done, peak RSS {peak_rss_mb():.0f} MB")
+        print("\n=== Data Transformation Completed Successfully ===")
+        return None, None, config.preprocessor_obj_file_path
+
+    def initiate_data_transformation(self, train_path, test_path, rul_path, reuse=True):
+        """
+        Scale the ingested tables and add the RUL targets. With `reuse`, outputs
+        built from the same tables and settings are loaded instead; the stage
+        cache passes False, since its key also covers this module's code.
+        """
         logger.info("Starting data transformation process")
         print("=== Starting Data Transformation ===")
 
@@ -55,60 +214,92 @@ class DataTransformation:
                 raise RuntimeError("Failed to create artifacts directory")
             print(f"✓ Directory verified: {self.data_transformation_config.artifacts_dir}")
 
+            # Skip the stage when the ingested tables and settings are unchanged since the last run
+            inputs = {
+                "train": path_fingerprint(train_path),
+                "test": path_fingerprint(test_path),
+                "rul": path_fingerprint(rul_path),
+                "columns_to_drop": self.data_transformation_config.columns_to_drop,
+                "rul_cap": self.data_transformation_config.rul_cap,
+                "max_regimes": self.data_transformation_config.max_regimes,
+                "regime_tolerance": self.data_transformation_config.regime_tolerance,
+            }
+            if self.data_transformation_config.feature_engineering.enabled:
+                inputs["feature_engineering"] = vars(self.data_transformation_config.feature_engineering)
+            if self.data_transformation_config.streaming:
+                # Sketch-fitted scaling differs slightly from an exact fit
+                inputs["sketch_size"] = self.data_transformation_config.sketch_size
+            reused = self._reuse_outputs(inputs) if reuse else None
+            if reused is not None:
+                print("✓ Inputs unchanged, reusing transformed data and preprocessor")
+                logger.info("Skipped data transformation: inputs unchanged")
+                return reused + (self.data_transformation_config.preprocessor_obj_file_path,)
+
+            if self.data_transformation_config.streaming:
+                print("\n[3/4] Processing data files in chunks...")
+                return self._transform_streaming(train_path, test_path, rul_path, inputs)
+
             # 3. Process data files
             print("\n[3/4] Processing data files...")
             
             # Reading train, test, and rul data
-            train_df = pd.read_csv(train_path)
-            test_df = pd.read_csv(test_path)
-            rul_df = pd.read_csv(rul_path)
+            train_df = self.store.load(train_path)
+            test_df = self.store.load(test_path)
+            rul_df = self.store.load(rul_path)
             logger.info('Read train, test and RUL data completed')
 
-            # Defining Column Names for the dataset
-
-            column_names = ['unit', 'time', 'operational_setting_1', 'operational_setting_2', 'operational_setting_3',
-               'sensor_1', 'sensor_2', 'sensor_3', 'sensor_4', 'sensor_5', 'sensor_6', 'sensor_7', 'sensor_8',
-               'sensor_9', 'sensor_10', 'sensor_11', 'sensor_12', 'sensor_13', 'sensor_14', 'sensor_15', 'sensor_16',
-               'sensor_17', 'sensor_18', 'sensor_19', 'sensor_20', 'sensor_21']
-            rul_names = ['RUL']
-
-            train_df.columns=column_names
-            test_df.columns=column_names
-            rul_df.columns=rul_names
-
             # Dropping columns for better model performance
-            columns_to_drop = ['operational_setting_3','sensor_1','sensor_5','sensor_6',
-                             'sensor_10','sensor_16','sensor_18','sensor_19']
+            columns_to_drop = self.data_transformation_config.columns_to_drop
             train_df = train_df.drop(columns=columns_to_drop, axis=1)
             test_df = test_df.drop(columns=columns_to_drop, axis=1)
 
-            # Calculating RUL for train and test data
-            train_df['RUL'] = train_df.groupby('unit')['time'].transform('max') - train_df['time']
-            test_df['RUL'] = test_df.groupby('unit')['time'].transform('max') - test_df['time']
-            rul_df['unit'] = rul_df.index + 1
-            test_df = pd.merge(test_df, rul_df, on='unit', how='left')
+            # Calculating RUL for train and test data; unit numbers restart in every subset
+            unit_keys = ['subset', 'unit']
+            train_df['RUL'] = train_df.groupby(unit_keys)['time'].transform('max') - train_df['time']
+            test_df['RUL'] = test_df.groupby(unit_keys)['time'].transform('max') - test_df['time']
+            rul_df['unit'] = rul_df.groupby('subset').cumcount() + 1
+            test_df = pd.merge(test_df, rul_df, on=unit_keys, how='left')
             test_df['RUL'] = test_df['RUL_x'] + test_df['RUL_y']
             test_df = test_df.drop(columns=['RUL_x', 'RUL_y'], axis=1)
 
             # Capping RUL at 25th percentile (51)
-            train_df["RUL"][train_df["RUL"] > 51] = 51
-            test_df["RUL"][test_df["RUL"] > 51] = 51
+            rul_cap = self.data_transformation_config.rul_cap
+            train_df["RUL"][train_df["RUL"] > rul_cap] = rul_cap
+            test_df["RUL"][test_df["RUL"] > rul_cap] = rul_cap
 
             logger.info(f'Train Dataframe head: \n{train_df.head().to_string()}')
             logger.info(f'Test Dataframe head: \n{test_df.head().to_string()}')
 
             # Splitting data into input and target features
             target_column = 'RUL'
-            input_feature_train_df = train_df.drop(columns=[target_column], axis=1)
+            input_feature_train_df = train_df.drop(columns=[target_column, 'subset'], axis=1)
             target_feature_train_df = train_df[target_column]
-            input_feature_test_df = test_df.drop(columns=[target_column], axis=1)
+            input_feature_test_df = test_df.drop(columns=[target_column, 'subset'], axis=1)
             target_feature_test_df = test_df[target_column]
 
-            # Transforming using RobustScaler
-            scaler = RobustScaler()
+            # Per-unit trajectory features, computed the same way at serving time
+            engineer = FeatureEngineer.from_config(
+                list(input_feature_train_df.columns), self.data_transformation_config.feature_engineering
+            )
+            if engineer is not None:
+                input_feature_train_df = pd.DataFrame(
+                    engineer.transform(input_feature_train_df.to_numpy(np.float64),
+                                       groups=pd.factorize(train_df['subset'])[0]),
+                    columns=engineer.feature_names
+                )
+                input_feature_test_df = pd.DataFrame(
+                    engineer.transform(input_feature_test_df.to_numpy(np.float64),
+                                       groups=pd.factorize(test_df['subset'])[0]),
+                    columns=engineer.feature_names
+                )
+                logger.info(f"Engineered {len(engineer.feature_names)} features: {engineer.describe()}")
+
+            # Robust scaling per operating regime (a single regime on single-condition data)
+            scaler = self.data_transformation_config.regime_scaler()
             input_feature_train_arr = scaler.fit_transform(input_feature_train_df)
-            input_feature_test_arr = scaler.transform(input_feature_test_df)
-            logger.info("Feature scaling completed")
+            input_feature_test_arr = scaler.transform(input_feature_test_df.to_numpy(np.float64))
+            print(f"✓ {scaler.n_regimes_} operating regime{'s' if scaler.n_regimes_ > 1 else ''} found")
+            logger.info(f"Feature scaling completed with {scaler.n_regimes_} operating regimes")
 
             # Combining features and targets
             train_arr = np.c_[input_feature_train_arr, np.array(target_feature_train_df)]
@@ -123,9 +314,16 @@ class DataTransformation:
                 obj=scaler
             )
             
-            # Save transformed data as CSV
-            pd.DataFrame(train_arr).to_csv(self.data_transformation_config.transformed_train_path, index=False)
-            pd.DataFrame(test_arr).to_csv(self.data_transformation_config.transformed_test_path, index=False)
+            # Save transformed data as columnar tables, recording what they were built from
+            columns = list(input_feature_train_df.columns) + [target_column]
+            metadata = {
+                "inputs": inputs,
+                "preprocessor_sha256": file_sha256(self.data_transformation_config.preprocessor_obj_file_path),
+            }
+            self.store.save(self.data_transformation_config.transformed_train_path,
+                            pd.DataFrame(train_arr, columns=columns), metadata=metadata)
+            self.store.save(self.data_transformation_config.transformed_test_path,
+                            pd.DataFrame(test_arr, columns=columns), metadata=metadata)
             
             # Verify outputs
             outputs = {
@@ -162,9 +360,9 @@ if __name__ == "__main__":
     
     try:
         # Example paths (replace with actual paths from DataIngestion)
-        train_path = "artifacts/train.csv"
-        test_path = "artifacts/test.csv"
-        rul_path = "artifacts/rul.csv"
+        train_path = "artifacts/train"
+        test_path = "artifacts/test"
+        rul_path = "artifacts/rul"
 
         transformer = DataTransformation()
         train_arr, test_arr, preprocessor_path = transformer.initiate_data_transformation(
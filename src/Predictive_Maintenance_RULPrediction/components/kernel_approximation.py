@@ -0,0 +1,71 @@
+import numpy as np
+from scipy.linalg import solve
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.kernel_approximation import Nystroem
+
+
+class NystroemRidgeRegressor(RegressorMixin, BaseEstimator):
+    """
+    RBF kernel regression approximated with a Nystroem feature map of
+    `n_components` landmark rows and a ridge solve on the mapped features.
+
+    The ridge system is accumulated over `batch_size` rows at a time
+    (Z'Z and Z'y), so fitting holds one batch of mapped features plus a
+    `n_components` square matrix however many rows there are, and predicting
+    costs the same per row whatever the training size; an exact SVR keeps
+    every support vector and is quadratic to fit.
+    """
+    def __init__(self, n_components=1000, gamma="scale", alpha=1.0, batch_size=10000, random_state=None):
+        self.n_components = n_components
+        self.gamma = gamma
+        self.alpha = alpha
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+    def _batches(self, n_rows):
+        for start in range(0, n_rows, self.batch_size):
+            yield slice(start, start + self.batch_size)
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        # Same default as SVR: 1 / (n_features * X.var())
+        gamma = 1.0 / (X.shape[1] * X.var()) if self.gamma == "scale" else self.gamma
+        feature_map = Nystroem(kernel="rbf", gamma=gamma, n_components=min(self.n_components, len(X)),
+                               random_state=self.random_state).fit(X)
+
+        k = len(feature_map.component_indices_)
+        gram, moment, z_sum = np.zeros((k, k)), np.zeros(k), np.zeros(k)
+        for rows in self._batches(len(X)):
+            Z = feature_map.transform(X[rows])
+            gram += Z.T @ Z
+            moment += Z.T @ y[rows]
+            z_sum += Z.sum(axis=0)
+
+        # Centre in closed form so the intercept is not penalised
+        n, z_mean, y_mean = len(X), z_sum / len(X), y.mean()
+        gram -= n * np.outer(z_mean, z_mean)
+        moment -= n * z_mean * y_mean
+        gram[np.diag_indices_from(gram)] += self.alpha
+        self.coef_ = solve(gram, moment, assume_a="pos")
+        self.intercept_ = y_mean - z_mean @ self.coef_
+        # Z = K(X, landmarks) @ normalization.T, so the linear model folds into one weight per landmark
+        self.landmarks_ = feature_map.components_
+        self.landmark_sq_norms_ = (self.landmarks_ ** 2).sum(axis=1)
+        self.dual_coef_ = feature_map.normalization_.T @ self.coef_
+        self.gamma_ = gamma
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def _kernel(self, X):
+        """RBF kernel between rows of X and the landmarks"""
+        sq_dist = (X ** 2).sum(axis=1)[:, None] + self.landmark_sq_norms_ - 2 * (X @ self.landmarks_.T)
+        np.maximum(sq_dist, 0, out=sq_dist)
+        return np.exp(-self.gamma_ * sq_dist, out=sq_dist)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        pred = np.empty(len(X))
+        for rows in self._batches(len(X)):
+            pred[rows] = self._kernel(X[rows]) @ self.dual_coef_ + self.intercept_
+        return pred
@@ -0,0 +1,315 @@
+import os
+import sys
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+from src.Predictive_Maintenance_RULPrediction.logger import logging
+from src.Predictive_Maintenance_RULPrediction.exception import CustomException
+from src.Predictive_Maintenance_RULPrediction.utils import load_object
+from src.Predictive_Maintenance_RULPrediction.compiled_predictor import CompiledPredictor
+from src.Predictive_Maintenance_RULPrediction.artifact_store import (
+    ColumnarArtifactStore, file_sha256, artifact_version, path_fingerprint
+)
+
+logger = logging.getLogger()
+
+class ModelExporterConfig:
+    def __init__(self):
+        self.artifacts_dir = os.path.join(os.getcwd(), 'artifacts')
+        self.compiled_model_dir = os.path.join(self.artifacts_dir, 'model_compiled')
+        # Largest |compiled - original| prediction difference accepted, in RUL cycles
+        self.tolerance = 1e-4
+        self.benchmark_batch_sizes = (1, 100, 10000)
+
+
+def _tree_depth(left, right):
+    """Depth of a single tree given its local child arrays (-1 marks a leaf)"""
+    depth = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def _sklearn_tree(estimator):
+    tree = estimator.tree_
+    return {
+        "left": tree.children_left,
+        "right": tree.children_right,
+        "feature": tree.feature,
+        "threshold": tree.threshold,
+        "value": tree.value[:, 0, 0],
+    }
+
+
+def _xgboost_trees(model):
+    booster = model.get_booster()
+    dump = json.loads(booster.save_raw(raw_format='json'))
+    learner = dump['learner']
+    objective = learner['objective']['name']
+    if objective != 'reg:squarederror':
+        raise ValueError(f"XGBoost objective '{objective}' cannot be compiled")
+    if learner['gradient_booster']['name'] != 'gbtree':
+        raise ValueError("Only gbtree XGBoost boosters can be compiled")
+
+    trees = []
+    for tree in learner['gradient_booster']['model']['trees']:
+        left = np.asarray(tree['left_children'], dtype=np.int64)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        # XGBoost goes left on x < t; on float32 that equals x <= nextafter(t, -inf)
+        threshold = np.nextafter(conditions, np.float32(-np.inf)).astype(np.float64)
+        trees.append({
+            "left": left,
+            "right": np.asarray(tree['right_children'], dtype=np.int64),
+            "feature": np.asarray(tree['split_indices'], dtype=np.int64),
+            "threshold": threshold,
+            # Leaf values are stored in split_conditions
+            "value": conditions.astype(np.float64),
+        })
+
+    base_score = learner['learner_model_param']['base_score'].strip('[]')
+    return trees, float(base_score)
+
+
+def _binned_boosting_trees(model):
+    """Trees of a BinnedGradientBoostingRegressor with bin thresholds mapped back to raw values"""
+    hgb = model.model_
+    edges = model.binner_.bin_edges_
+    trees = []
+    for (predictor,) in hgb._predictors:
+        nodes = predictor.nodes
+        is_leaf = nodes['is_leaf'].astype(bool)
+        feature = nodes['feature_idx'].astype(np.int64)
+        # HGB goes left on bin <= floor(num_threshold); bin i holds x <= edges[i]
+        bin_index = np.floor(nodes['num_threshold']).astype(np.int64)
+        threshold = np.array([
+            np.inf if leaf or k >= len(edges[f]) else float(edges[f][k])
+            for leaf, f, k in zip(is_leaf, feature, bin_index)
+        ])
+        trees.append({
+            "left": np.where(is_leaf, -1, nodes['left'].astype(np.int64)),
+            "right": np.where(is_leaf, -1, nodes['right'].astype(np.int64)),
+            "feature": feature,
+            "threshold": threshold,
+            # Leaf values already include the learning rate
+            "value": nodes['value'].astype(np.float64),
+        })
+    return trees, float(np.ravel(hgb._baseline_prediction)[0])
+
+
+def compile_model(preprocessor, model):
+    """Fold a fitted RobustScaler or RegimeScaler and tree ensemble into a CompiledPredictor"""
+    model_name = type(model).__name__
+    if model_name in ('RandomForestRegressor', 'ExtraTreesRegressor'):
+        trees = [_sklearn_tree(estimator) for estimator in model.estimators_]
+        tree_weight, base_score = 1.0 / len(trees), 0.0
+    elif model_name == 'GradientBoostingRegressor':
+        trees = [_sklearn_tree(estimator) for estimator in model.estimators_[:, 0]]
+        tree_weight = model.learning_rate
+        base_score = 0.0 if model.init_ == 'zero' else float(np.ravel(model.init_.constant_)[0])
+    elif model_name == 'DecisionTreeRegressor':
+        trees = [_sklearn_tree(model)]
+        tree_weight, base_score = 1.0, 0.0
+    elif model_name == 'XGBRegressor':
+        trees, base_score = _xgboost_trees(model)
+        tree_weight = 1.0
+    elif model_name == 'BinnedGradientBoostingRegressor':
+        trees, base_score = _binned_boosting_trees(model)
+        tree_weight = 1.0
+    else:
+        raise ValueError(f"{model_name} is not a supported tree ensemble")
+
+    n_features = preprocessor.n_features_in_
+    center = getattr(preprocessor, 'center_', None)
+    scale = getattr(preprocessor, 'scale_', None)
+    center = np.zeros(n_features) if center is None else np.asarray(center, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    # A RegimeScaler has one row per regime; with a single regime it is a plain RobustScaler
+    regimes = {}
+    if center.ndim == 2 and len(center) > 1:
+        regimes = {
+            "regime_features": np.asarray(preprocessor.regime_features_, dtype=np.intp),
+            "regime_weights": np.asarray(preprocessor.regime_weights_, dtype=np.float64),
+            "regime_bias": np.asarray(preprocessor.regime_bias_, dtype=np.float64),
+        }
+    elif center.ndim == 2:
+        center, scale = center[0], scale[0]
+
+    # Concatenate all trees into shared node arrays with global child indices
+    offsets = np.cumsum([0] + [len(tree["left"]) for tree in trees])
+    children, leaves, feature, threshold, value = [], [], [], [], []
+    for offset, tree in zip(offsets[:-1], trees):
+        node_ids = np.arange(len(tree["left"])) + offset
+        is_leaf = tree["left"] == -1
+        # Leaves loop back to themselves; children[2 * node + went_left]
+        left = np.where(is_leaf, node_ids, tree["left"] + offset)
+        right = np.where(is_leaf, node_ids, tree["right"] + offset)
+        children.append(np.stack([right, left], axis=1).ravel())
+        leaves.append(is_leaf)
+        feature.append(np.where(is_leaf, 0, tree["feature"]))
+        threshold.append(np.where(is_leaf, 0.0, tree["threshold"]))
+        value.append(tree["value"])
+
+    feature_names = getattr(preprocessor, 'feature_names_in_', None)
+    return CompiledPredictor(
+        center=center,
+        scale=scale,
+        feature=np.concatenate(feature).astype(np.intp),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        children=np.concatenate(children).astype(np.intp),
+        is_leaf=np.concatenate(leaves),
+        value=np.concatenate(value).astype(np.float64),
+        roots=offsets[:-1].astype(np.intp),
+        max_depth=max(_tree_depth(tree["left"], tree["right"]) for tree in trees),
+        tree_weight=tree_weight,
+        base_score=base_score,
+        metadata={
+            "model": model_name,
+            "feature_names": None if feature_names is None else [str(name) for name in feature_names],
+            "n_features": int(n_features),
+            "n_regimes": len(center) if regimes else 1,
+        },
+        **regimes
+    )
+
+
+def verify_compiled_model(compiled, preprocessor, model, X_raw):
+    """Largest absolute difference between the compiled and the original pipeline"""
+    expected = model.predict(preprocessor.transform(X_raw))
+    return float(np.max(np.abs(compiled.predict(X_raw) - expected)))
+
+
+def regression_metrics(y_true, y_pred):
+    """R2, MAE and RMSE computed with NumPy"""
+    residual = y_true - y_pred
+    total = np.sum((y_true - y_true.mean()) ** 2)
+    return {
+        "r2": float(1 - np.sum(residual ** 2) / total) if total > 0 else 0.0,
+        "mae": float(np.mean(np.abs(residual))),
+        "rmse": float(np.sqrt(np.mean(residual ** 2))),
+    }
+
+
+def benchmark_compiled_model(compiled, preprocessor, model, X_raw, batch_sizes, repeats=5):
+    """Best-of-`repeats` wall time per batch for the original and the compiled pipeline"""
+    def best_time(fn, batch):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn(batch)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    results = []
+    for batch_size in batch_sizes:
+        batch = np.resize(X_raw, (batch_size, X_raw.shape[1]))
+        original = best_time(lambda b: model.predict(preprocessor.transform(b)), batch)
+        fused = best_time(compiled.predict, batch)
+        results.append({
+            "batch_size": batch_size,
+            "original_ms": round(original * 1000, 3),
+            "compiled_ms": round(fused * 1000, 3),
+            "speedup": round(original / fused, 2) if fused > 0 else None,
+        })
+    return results
+
+
+class ModelExporter:
+    def __init__(self):
+        self.model_exporter_config = ModelExporterConfig()
+        logger.info("ModelExporter initialized")
+
+    def initiate_model_export(self, model_path, preprocessor_path, test_path, train_path=None):
+        """
+        Compile the trained model for serving. Returns the compiled artifact
+        directory, or None when the best model is not a supported tree ensemble.
+        """
+        logger.info("Starting model export process")
+        print("=== Starting Model Export ===")
+        compiled_path = self.model_exporter_config.compiled_model_dir
+
+        try:
+            print("\n[1/3] Compiling preprocessor and model...")
+            model = load_object(model_path)
+            preprocessor = load_object(preprocessor_path)
+            try:
+                compiled = compile_model(preprocessor, model)
+            except ValueError as e:
+                # Never leave a compiled artifact from an earlier model next to a new model.pkl
+                if os.path.exists(compiled_path):
+                    shutil.rmtree(compiled_path)
+                print(f"Skipping export: {str(e)}")
+                logger.warning(f"Model export skipped: {str(e)}")
+                return None
+            print(f"✓ Compiled {compiled.n_trees} trees, {compiled.n_nodes} nodes, depth {compiled.max_depth}")
+
+            print("\n[2/3] Verifying compiled model against the original pipeline...")
+            if os.path.isdir(test_path):
+                test_array = ColumnarArtifactStore().load_array(test_path)
+            else:
+                test_array = pd.read_csv(test_path, header=None).values.astype(float)
+            X_raw = preprocessor.inverse_transform(test_array[:, :-1])
+            max_error = verify_compiled_model(compiled, preprocessor, model, X_raw)
+            if max_error > self.model_exporter_config.tolerance:
+                raise RuntimeError(f"Compiled model differs from original by {max_error}")
+            print(f"✓ Max absolute difference: {max_error:.2e}")
+            logger.info(f"Compiled model verified, max abs difference {max_error}")
+
+            print("\n[3/3] Benchmarking and saving compiled model...")
+            for row in benchmark_compiled_model(
+                compiled, preprocessor, model, X_raw, self.model_exporter_config.benchmark_batch_sizes
+            ):
+                print(f"batch {row['batch_size']}: original {row['original_ms']} ms, "
+                      f"compiled {row['compiled_ms']} ms, speedup {row['speedup']}x")
+                logger.info(f"Compiled model benchmark: {row}")
+
+            compiled.metadata["max_abs_error"] = max_error
+            compiled.metadata["metrics"] = regression_metrics(test_array[:, -1], compiled.predict(X_raw))
+            if train_path is not None:
+                compiled.metadata["training_data_sha256"] = path_fingerprint(train_path)
+            # Lets the serving registry detect a compiled model that no longer matches the pickles
+            sources = {}
+            for name, path in (("model", model_path), ("preprocessor", preprocessor_path)):
+                stat = os.stat(path)
+                sources[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(path)}
+            compiled.metadata["sources"] = sources
+            compiled.metadata["version"] = artifact_version(
+                [sources["model"]["sha256"], sources["preprocessor"]["sha256"]]
+            )
+            # Build next to the live artifact and swap it in once complete
+            staging_path = f"{compiled_path}.staging"
+            if os.path.exists(staging_path):
+                shutil.rmtree(staging_path)
+            compiled.save(staging_path)
+            CompiledPredictor.load(staging_path, verify=True)
+            if os.path.exists(compiled_path):
+                shutil.rmtree(compiled_path)
+            os.rename(staging_path, compiled_path)
+            print(f"✓ Compiled model saved to {compiled_path}")
+
+            print("\n=== Model Export Completed Successfully ===")
+            logger.info("Model export completed successfully")
+            return compiled_path
+
+        except Exception as e:
+            error_msg = f"Model export failed: {str(e)}"
+            logger.error(error_msg)
+            print(f"\n!!! ERROR: {error_msg}")
+            raise CustomException(e, sys)
+
+# Example usage
+if __name__ == "__main__":
+    try:
+        exporter = ModelExporter()
+        compiled_path = exporter.initiate_model_export(
+            "artifacts/model.pkl", "artifacts/preprocessor.pkl",
+            "artifacts/transformed_test", "artifacts/transformed_train"
+        )
+        print(f"\nCompiled model path: {compiled_path}")
+
+    except Exception as e:
+        print(f"\nFatal error occurred: {str(e)}")
+        sys.exit(1)
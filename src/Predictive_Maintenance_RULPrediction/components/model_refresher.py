@@ -0,0 +1,337 @@
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+from src.Predictive_Maintenance_RULPrediction.logger import logging
+from src.Predictive_Maintenance_RULPrediction.exception import CustomException
+from src.Predictive_Maintenance_RULPrediction.utils import save_object, load_object
+from src.Predictive_Maintenance_RULPrediction.artifact_store import (
+    ColumnarArtifactStore, file_sha256, artifact_version, path_fingerprint
+)
+from src.Predictive_Maintenance_RULPrediction.streaming_stats import (
+    ReservoirQuantileSketch, robust_scaler_from_sketch
+)
+from src.Predictive_Maintenance_RULPrediction.components.data_ingestion import (
+    CMAPSS_COLUMNS, CMAPSS_DTYPES, DataIngestionConfig, read_cmapss_file
+)
+from src.Predictive_Maintenance_RULPrediction.components.data_transformation import DataTransformationConfig
+from src.Predictive_Maintenance_RULPrediction.components.feature_engineering import FeatureEngineer
+from src.Predictive_Maintenance_RULPrediction.components.model_trainer import ModelTrainer, _replace_dir
+from src.Predictive_Maintenance_RULPrediction.components.model_exporter import ModelExporter, regression_metrics
+
+logger = logging.getLogger()
+
+
+class ModelRefresherConfig:
+    def __init__(self):
+        self.artifacts_dir = os.path.join(os.getcwd(), 'artifacts')
+        # Refresh state, the transformed rows of every unit added since the last full rebuild and their sketch
+        self.refresh_dir = os.path.join(self.artifacts_dir, 'refresh')
+        self.state_path = os.path.join(self.refresh_dir, 'state.json')
+        self.new_rows_path = os.path.join(self.refresh_dir, 'transformed_new')
+        self.scaler_sketch_path = os.path.join(self.refresh_dir, 'scaler_sketch')
+        # Trees (or boosting rounds) added to the model per refresh
+        self.new_trees = int(os.environ.get("RUL_REFRESH_NEW_TREES", "50"))
+        # Largest shift of a feature's median or IQR, relative to its frozen IQR, before a full rebuild is needed
+        self.max_scaler_drift = float(os.environ.get("RUL_REFRESH_MAX_SCALER_DRIFT", "0.1"))
+        # Largest relative increase in test RMSE a refresh may cost
+        self.max_rmse_increase = float(os.environ.get("RUL_REFRESH_MAX_RMSE_INCREASE", "0.02"))
+        # Incremental refreshes in a row before the next one is a full rebuild
+        self.full_rebuild_every = int(os.environ.get("RUL_REFRESH_FULL_EVERY", "10"))
+
+
+def grow_model(model, X, y, n_new):
+    """
+    Add `n_new` trees or boosting rounds fitted on (X, y) to a fitted
+    ensemble, keeping every existing one. ValueError for other models.
+    """
+    model_name = type(model).__name__
+    if model_name in ('RandomForestRegressor', 'ExtraTreesRegressor', 'GradientBoostingRegressor'):
+        n_fitted = len(model.estimators_)
+        model.set_params(warm_start=True, n_estimators=n_fitted + n_new)
+        model.fit(X, y)
+        model.set_params(warm_start=False)
+    elif model_name == 'BinnedGradientBoostingRegressor':
+        # Same bin edges as the original fit, so the new rounds split on the same bins
+        booster = model.model_
+        booster.set_params(warm_start=True, max_iter=booster.n_iter_ + n_new)
+        booster.fit(model.binner_.transform(X), y)
+        booster.set_params(warm_start=False)
+        model.max_iter = booster.max_iter
+    elif model_name == 'XGBRegressor':
+        n_fitted = model.get_booster().num_boosted_rounds()
+        model.set_params(n_estimators=n_new)
+        model.fit(X, y, xgb_model=model.get_booster())
+        model.set_params(n_estimators=n_fitted + n_new)
+    else:
+        raise ValueError(f"{model_name} cannot be grown incrementally")
+    return model
+
+
+class ModelRefresher:
+    """
+    Updates the served model with newly completed run-to-failure units
+    without a full rebuild: only the new units are read and transformed, the
+    fitted scaler stays frozen (so existing trees keep their meaning) while a
+    quantile sketch tracks how far the new data moves its statistics, and
+    the current ensemble is grown with extra trees instead of retrained.
+    """
+    def __init__(self):
+        self.model_refresher_config = ModelRefresherConfig()
+        self.ingestion_config = DataIngestionConfig()
+        self.data_transformation_config = DataTransformationConfig()
+        self.model_trainer = ModelTrainer()
+        self.model_trainer_config = self.model_trainer.model_trainer_config
+        self.model_exporter = ModelExporter()
+        self.store = ColumnarArtifactStore()
+        logger.info("ModelRefresher initialized")
+
+    def load_state(self):
+        """
+        Refresh state for the current transformed training table. A full
+        rebuild replaces that table, so any older state no longer applies.
+        """
+        train_path = self.data_transformation_config.transformed_train_path
+        base = path_fingerprint(train_path) if os.path.exists(train_path) else None
+        state = {}
+        if os.path.exists(self.model_refresher_config.state_path):
+            with open(self.model_refresher_config.state_path) as file_obj:
+                state = json.load(file_obj)
+        if state.get("base") != base:
+            state = {"base": base, "applied": {}, "max_unit": {}, "refreshes": 0,
+                     "full_rebuild_s": state.get("full_rebuild_s")}
+        return state
+
+    def save_state(self, state):
+        os.makedirs(self.model_refresher_config.refresh_dir, exist_ok=True)
+        temp_path = f"{self.model_refresher_config.state_path}.tmp"
+        with open(temp_path, 'w') as file_obj:
+            json.dump(state, file_obj, indent=2)
+        os.replace(temp_path, self.model_refresher_config.state_path)
+
+    def reset(self, full_rebuild_s=None):
+        """Drop the rows added incrementally; called after a full rebuild has taken them in"""
+        for path in (self.model_refresher_config.new_rows_path, self.model_refresher_config.scaler_sketch_path):
+            if os.path.exists(path):
+                shutil.rmtree(path)
+        state = self.load_state()
+        state.update(applied={}, max_unit={}, refreshes=0)
+        if full_rebuild_s is not None:
+            state["full_rebuild_s"] = full_rebuild_s
+        self.save_state(state)
+
+    def _max_units(self, state):
+        """Highest unit number of each subset, in the ingested train table or added by earlier refreshes"""
+        columns = self.store.load_columns(self.ingestion_config.train_data_path)
+        ingested = pd.Series(columns['unit']).groupby(pd.Series(columns['subset'])).max()
+        max_units = {subset: int(unit) for subset, unit in ingested.items()}
+        for subset, unit in state.get("max_unit", {}).items():
+            max_units[subset] = max(max_units.get(subset, 0), unit)
+        return max_units
+
+    def _read_new_units(self, new_unit_files, feature_names, max_units):
+        """
+        Unscaled model input columns and capped RUL of every unit in the new-unit
+        files ({subset: [paths]}). Units are numbered after `max_units`, as
+        ingestion numbers them, since the unit number is a model input.
+        """
+        config = self.data_transformation_config
+        frames = []
+        for subset, paths in new_unit_files.items():
+            for path in paths:
+                frame = read_cmapss_file(path, CMAPSS_COLUMNS, CMAPSS_DTYPES)
+                frame['unit'] += max_units.get(subset, 0)
+                max_units[subset] = int(frame['unit'].max())
+                frame['subset'] = subset
+                frames.append(frame)
+        df = pd.concat(frames, ignore_index=True)
+
+        # Completed trajectories: the last cycle of each unit is its failure
+        rul = df.groupby(['subset', 'unit'])['time'].transform('max') - df['time']
+        rul = np.minimum(rul.to_numpy(np.float64), config.rul_cap)
+
+        base_names = [name for name in CMAPSS_COLUMNS if name not in config.columns_to_drop]
+        features = df[base_names].to_numpy(np.float64)
+        engineer = FeatureEngineer.from_config(base_names, config.feature_engineering)
+        if engineer is not None:
+            features = engineer.transform(features, groups=pd.factorize(df['subset'])[0])
+        names = engineer.feature_names if engineer is not None else base_names
+        if list(names) != list(feature_names):
+            raise ValueError("New units produce different features than the preprocessor was fitted on")
+        n_units = int(df.groupby(['subset', 'unit']).ngroups)
+        return pd.DataFrame(features, columns=names), rul, n_units
+
+    def _scaler_drift(self, preprocessor, X_new, X_base_raw):
+        """
+        Update the refresh sketch with the new rows and return the sketch and
+        the largest shift of any feature's median or IQR from the frozen scaler,
+        in units of that feature's frozen IQR. A regime scaler is compared
+        regime by regime, keeping the regimes it found.
+        """
+        config = self.model_refresher_config
+        if os.path.exists(config.scaler_sketch_path):
+            sketch = ReservoirQuantileSketch.load(config.scaler_sketch_path)
+        elif os.path.exists(self.data_transformation_config.scaler_sketch_path):
+            # Streaming transformation: the scaler was fitted from this sketch
+            sketch = ReservoirQuantileSketch.load(self.data_transformation_config.scaler_sketch_path)
+        else:
+            sketch = ReservoirQuantileSketch(X_new.shape[1], capacity=self.data_transformation_config.sketch_size)
+            sketch.update(X_base_raw())
+        sketch.update(X_new)
+        if hasattr(preprocessor, "fit_statistics"):
+            updated = copy.deepcopy(preprocessor).fit_statistics(sketch.sample[:sketch.n_filled])
+        else:
+            updated = robust_scaler_from_sketch(sketch, list(preprocessor.feature_names_in_))
+        center_shift = np.abs(updated.center_ - preprocessor.center_) / preprocessor.scale_
+        scale_shift = np.abs(updated.scale_ / preprocessor.scale_ - 1)
+        # Unit numbers only grow as units are added, so their shift says nothing about the data
+        checked = np.asarray(preprocessor.feature_names_in_) != 'unit'
+        return sketch, float(max(center_shift[..., checked].max(), scale_shift[..., checked].max()))
+
+    def initiate_model_refresh(self, new_unit_files):
+        """
+        Grow the served model with the units in `new_unit_files` ({subset: [paths]}) and publish it.
+        Returns a report whose status is "published", or "fallback" with the
+        reason a full rebuild is needed instead.
+        """
+        logger.info("Starting model refresh process")
+        print("=== Starting Model Refresh ===")
+        config = self.model_refresher_config
+        transformation_config = self.data_transformation_config
+        model_path = self.model_trainer_config.trained_model_file_path
+        preprocessor_path = transformation_config.preprocessor_obj_file_path
+        timings = {}
+        start = time.perf_counter()
+
+        def fallback(reason):
+            print(f"Full rebuild needed: {reason}")
+            logger.warning(f"Model refresh fell back to a full rebuild: {reason}")
+            return {"status": "fallback", "reason": reason, "timings_s": timings}
+
+        try:
+            state = self.load_state()
+
+            # 1. Only the new units are read and transformed
+            print("\n[1/5] Reading new units...")
+            step = time.perf_counter()
+            preprocessor = load_object(preprocessor_path)
+            try:
+                max_units = self._max_units(state)
+                X_new_raw, y_new, n_units = self._read_new_units(new_unit_files, preprocessor.feature_names_in_,
+                                                                 max_units)
+            except ValueError as e:
+                return fallback(str(e))
+            X_new = preprocessor.transform(X_new_raw)
+            timings["read_new_units"] = time.perf_counter() - step
+            new_unit_paths = [path for paths in new_unit_files.values() for path in paths]
+            print(f"✓ {n_units} units, {len(X_new)} rows from {len(new_unit_paths)} files")
+
+            # 2. The scaler stays frozen; the sketch shows whether it still fits the data
+            print("\n[2/5] Checking scaler drift...")
+            step = time.perf_counter()
+            train_array = self.store.load_array(transformation_config.transformed_train_path)
+            sketch, drift = self._scaler_drift(
+                preprocessor, X_new_raw.to_numpy(), lambda: preprocessor.inverse_transform(train_array[:, :-1])
+            )
+            timings["scaler_drift"] = time.perf_counter() - step
+            print(f"✓ Largest median/IQR shift: {drift:.3f} IQR (limit {config.max_scaler_drift})")
+            if drift > config.max_scaler_drift:
+                return fallback(f"scaler drift {drift:.3f} exceeds {config.max_scaler_drift}")
+
+            # 3. New trees are fitted on all rows, old and new; existing trees are kept
+            print("\n[3/5] Growing the model...")
+            step = time.perf_counter()
+            added = [np.c_[X_new, y_new]]
+            if state["applied"] and os.path.exists(config.new_rows_path):
+                added.insert(0, self.store.load_array(config.new_rows_path))
+            added = np.concatenate(added)
+            combined = np.concatenate([train_array, added])
+            model = load_object(model_path)
+            test_array = self.store.load_array(transformation_config.transformed_test_path)
+            X_test, y_test = test_array[:, :-1], test_array[:, -1]
+            before = regression_metrics(y_test, model.predict(X_test))
+            try:
+                grow_model(model, combined[:, :-1], combined[:, -1], config.new_trees)
+            except ValueError as e:
+                return fallback(str(e))
+            timings["grow_model"] = time.perf_counter() - step
+            print(f"✓ Added {config.new_trees} trees to {type(model).__name__} on {len(combined)} rows")
+
+            # 4. Never publish a model that got worse on the test set
+            print("\n[4/5] Evaluating...")
+            step = time.perf_counter()
+            after = regression_metrics(y_test, model.predict(X_test))
+            timings["evaluate"] = time.perf_counter() - step
+            print(f"✓ Test RMSE {before['rmse']:.3f} -> {after['rmse']:.3f}, R2 {before['r2']:.4f} -> {after['r2']:.4f}")
+            if after["rmse"] > before["rmse"] * (1 + config.max_rmse_increase):
+                return fallback(f"test RMSE rose from {before['rmse']:.3f} to {after['rmse']:.3f}")
+
+            # 5. The rows and sketch the next refresh reads are built first; model.pkl is then
+            # replaced and the units recorded as applied straight after, so a crash cannot make
+            # the next refresh grow the model on the same units twice. Serving picks up the new
+            # version on its next check.
+            print("\n[5/5] Publishing new model version...")
+            step = time.perf_counter()
+            staging_model_path = f"{model_path}.staging"
+            save_object(file_path=staging_model_path, obj=model)
+            version = artifact_version([file_sha256(staging_model_path), file_sha256(preprocessor_path)])
+            feature_names = list(preprocessor.feature_names_in_) + ['RUL']
+            pending_rows_path = f"{config.new_rows_path}.pending"
+            pending_sketch_path = f"{config.scaler_sketch_path}.pending"
+            self.store.save(pending_rows_path, pd.DataFrame(added, columns=feature_names),
+                            metadata={"base": state["base"]})
+            sketch.save(pending_sketch_path, metadata={"feature_names": feature_names[:-1]})
+            state["applied"].update({os.path.basename(path): file_sha256(path) for path in new_unit_paths})
+            state["max_unit"] = max_units
+            state["refreshes"] += 1
+
+            os.replace(staging_model_path, model_path)
+            self.save_state(state)
+            _replace_dir(pending_rows_path, config.new_rows_path)
+            _replace_dir(pending_sketch_path, config.scaler_sketch_path)
+
+            # The candidates and cascade screen are re-stamped only once model.pkl changed, so
+            # the version served until then keeps finding its own (serving adopts a screen
+            # published after it switched versions, see ModelRegistry.refresh)
+            candidates_dir = self.model_trainer.refresh_candidates(model, after["r2"], version)
+            cascade = self.model_trainer.recalibrate_cascade(model, X_test, y_test, version)
+            compiled_path = self.model_exporter.initiate_model_export(
+                model_path, preprocessor_path, transformation_config.transformed_test_path,
+                transformation_config.transformed_train_path
+            )
+            timings["publish"] = time.perf_counter() - step
+            timings["total"] = time.perf_counter() - start
+            print(f"✓ Model version {version} published{' with compiled model' if compiled_path else ''}")
+            if candidates_dir:
+                print(f"✓ Candidates in {candidates_dir} updated with the grown {type(model).__name__}")
+            if cascade:
+                print(f"✓ Cascade recalibrated: {cascade['heavy_fraction']:.1%} of test rows reach the model, "
+                      f"RMSE {cascade['rmse_model']} -> {cascade['rmse_cascade']}")
+
+            report = {
+                "status": "published",
+                "model_version": version,
+                "model": type(model).__name__,
+                "new_units": n_units,
+                "new_rows": int(len(X_new)),
+                "training_rows": int(len(combined)),
+                "scaler_drift": round(drift, 4),
+                "before": before,
+                "after": after,
+                "cascade": cascade,
+                "refreshes_since_full_rebuild": state["refreshes"],
+                "timings_s": {name: round(seconds, 3) for name, seconds in timings.items()},
+            }
+            logger.info(f"Model refresh report: {report}")
+            print("\n=== Model Refresh Completed Successfully ===")
+            return report
+
+        except Exception as e:
+            error_msg = f"Model refresh failed: {str(e)}"
+            logger.error(error_msg)
+            print(f"\n!!! ERROR: {error_msg}")
+            raise CustomException(e, sys)
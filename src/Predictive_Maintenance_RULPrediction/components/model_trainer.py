@@ -1,46 +1,81 @@
 import os
+import re
 import sys
+import json
+import time
+import shutil
 import numpy as np
 import pandas as pd
 from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.svm import SVR
+from sklearn.tree import DecisionTreeRegressor
 from xgboost import XGBRegressor
 from src.Predictive_Maintenance_RULPrediction.logger import logging
 from src.Predictive_Maintenance_RULPrediction.exception import CustomException
-from src.Predictive_Maintenance_RULPrediction.utils import save_object, evaluate_models
-
-# Configure logging
-logging.basicConfig(
-    filename='model_training.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filemode='w'
+from src.Predictive_Maintenance_RULPrediction.utils import save_object, load_object
+from src.Predictive_Maintenance_RULPrediction.training_scheduler import TrainingScheduler, unit_folds
+from src.Predictive_Maintenance_RULPrediction.artifact_store import (
+    ColumnarArtifactStore, MmapArtifactStore, file_sha256, artifact_version, path_fingerprint
 )
+from src.Predictive_Maintenance_RULPrediction.compiled_predictor import CompiledPredictor
+from src.Predictive_Maintenance_RULPrediction.components.data_ingestion import DataIngestionConfig
+from src.Predictive_Maintenance_RULPrediction.components.model_exporter import compile_model
+from src.Predictive_Maintenance_RULPrediction.components.binned_boosting import (
+    QuantileBinner, BinnedGradientBoostingRegressor
+)
+from src.Predictive_Maintenance_RULPrediction.components.kernel_approximation import NystroemRidgeRegressor
+from src.Predictive_Maintenance_RULPrediction.metrics import get_metrics
+
+# Logging is configured once, in logger.py
 logger = logging.getLogger()
 
+
+def _replace_dir(staging_path, path):
+    """Swap a fully built staging directory in for `path`"""
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(staging_path, path)
+
 @dataclass
 class ModelTrainerConfig:
     def __init__(self):
         self.artifacts_dir = os.path.join(os.getcwd(), 'artifacts')
         self.trained_model_file_path = os.path.join(self.artifacts_dir, 'model.pkl') #use model.pkl
+        # Every fitted candidate, not just the best, plus manifest.json with their test metrics
+        self.candidates_dir = os.path.join(self.artifacts_dir, 'candidates')
+        self.preprocessor_path = os.path.join(self.artifacts_dir, 'preprocessor.pkl')
+        # Cascade: a shallow tree screens rows and only those it scores below its
+        # calibrated threshold go to the main model (compiled, like model_compiled)
+        self.cascade_dir = os.path.join(self.artifacts_dir, 'cascade')
+        self.cascade_max_depth = int(os.environ.get("RUL_CASCADE_MAX_DEPTH", "6"))
+        # Largest relative increase in test RMSE the cascade may cost over the main model alone
+        self.cascade_max_rmse_increase = float(os.environ.get("RUL_CASCADE_MAX_RMSE_INCREASE", "0.01"))
+        # Also train the exact kernel SVR (quadratic fit time) to compare against its Nystroem approximation
+        self.exact_svr = os.environ.get("RUL_EXACT_SVR", "0") == "1"
+        # Ingested train table, row-aligned with transformed_train: its (subset, unit) columns group the CV folds
+        self.cv_groups_path = DataIngestionConfig().train_data_path
+        # CV fold of every training row, reused while the tables and fold settings are unchanged
+        self.cv_folds_path = os.path.join(self.artifacts_dir, 'cv_folds')
 
 class ModelTrainer:
     def __init__(self):
         self.model_trainer_config = ModelTrainerConfig()
+        self.scheduler = TrainingScheduler()
+        self.store = ColumnarArtifactStore()
+        self.model_report = {}
         logger.info("ModelTrainer initialized")
 
     def _load_and_validate_data(self, train_path, test_path):
         """Load and validate input data"""
         try:
-            # Load data using pandas to handle CSV formatting
-            train_df = pd.read_csv(train_path)
-            test_df = pd.read_csv(test_path)
-            
-            # Convert to numpy arrays
-            train_array = train_df.values
-            test_array = test_df.values
+            # Columnar tables load as typed arrays; CSV is still accepted for older artifacts
+            train_array, test_array = (
+                self.store.load_array(path) if os.path.isdir(path) else pd.read_csv(path).values
+                for path in (train_path, test_path)
+            )
             
             # Verify data shape and type
             if train_array.shape[1] < 2 or test_array.shape[1] < 2:
@@ -58,14 +93,340 @@ class ModelTrainer:
             logger.error(error_msg)
             raise CustomException(error_msg, sys)
 
-    def initiate_model_training(self, train_path, test_path):
+    def cv_folds(self, train_path, n_rows):
+        """
+        CV fold of every training row with each engine unit in a single fold,
+        so no unit is scored on by a model that saw its other cycles. Built
+        once and cached in cv_folds_path; None, for shuffled row folds, when
+        the ingested table that identifies the units is unavailable.
+        """
+        config = self.model_trainer_config
+        scheduler_config = self.scheduler.config
+        if not (os.path.isdir(train_path) and os.path.isdir(config.cv_groups_path)):
+            logger.warning("No ingested train table to group CV folds by unit")
+            return None
+
+        inputs = {
+            "transformed_train": path_fingerprint(train_path),
+            "groups": path_fingerprint(config.cv_groups_path),
+            "cv": scheduler_config.cv,
+            "random_state": scheduler_config.random_state,
+        }
+        if self.store.matches_inputs(config.cv_folds_path, inputs):
+            folds = self.store.load_columns(config.cv_folds_path)["fold"]
+            if len(folds) == n_rows:
+                return np.asarray(folds)
+
+        columns = self.store.load_columns(config.cv_groups_path)
+        if len(columns["unit"]) != n_rows:
+            logger.warning(f"Ingested train table has {len(columns['unit'])} rows, expected {n_rows}; "
+                           f"CV folds not grouped by unit")
+            return None
+        # Unit numbers restart in every subset
+        subset_codes = pd.factorize(np.asarray(columns["subset"]))[0]
+        units = np.asarray(columns["unit"], dtype=np.int64)
+        groups = subset_codes * (units.max() + 1) + units
+        folds = unit_folds(groups, scheduler_config.cv, scheduler_config.random_state)
+
+        self.store.save(config.cv_folds_path, pd.DataFrame({"fold": folds}), metadata={"inputs": inputs})
+        logger.info(f"CV folds: {len(np.unique(groups))} units in {scheduler_config.cv} folds of "
+                    f"{np.bincount(folds).tolist()} rows")
+        return folds
+
+    def get_model_candidates(self):
+        """Candidate estimators and the CV parameter grid of each"""
+        # Selecting models
+        models = {
+            "Random Forest": RandomForestRegressor(),
+            "Gradient Boosting": GradientBoostingRegressor(),
+            "HistGradientBoosting": BinnedGradientBoostingRegressor(random_state=42),
+            "XGBRegressor": XGBRegressor(),
+            "Nystroem Ridge": NystroemRidgeRegressor(random_state=42),
+        }
+        if self.model_trainer_config.exact_svr:
+            models["SupportVector Regressor"] = SVR()
+
+        # Defining parameters for models
+        params = {
+            'Random Forest': {
+                'n_estimators': [200],
+                'max_depth': [20],
+                'min_samples_split': [5],
+                'min_samples_leaf': [2]
+            },
+            'Gradient Boosting': {
+                'n_estimators': [200],
+                'learning_rate': [0.05],
+                'max_depth': [20],
+                'min_samples_split': [5],
+                'min_samples_leaf': [2]
+            },
+            'HistGradientBoosting': {
+                'max_iter': [200],
+                'learning_rate': [0.05],
+                'max_leaf_nodes': [63],
+                'min_samples_leaf': [20],
+                'l2_regularization': [0.0]
+            },
+            'XGBRegressor': {
+                'n_estimators': [200],
+                'learning_rate': [0.05],
+                'max_depth': [20],
+                'min_child_weight': [5]
+            },
+            'Nystroem Ridge': {
+                'n_components': [1000],
+                'alpha': [1.0]
+            },
+            'SupportVector Regressor': {
+                'C': [5],
+                'kernel': ['rbf'],
+                'degree': [2],
+                'epsilon': [0.01,]
+            },
+        }
+        return models, params
+
+    def compare_candidates(self, results, name, baseline):
+        """Print and record accuracy, fit time and predict latency of candidate `name` against `baseline`"""
+        if name not in results or baseline not in results:
+            return None
+        new, old = results[name], results[baseline]
+        comparison = {
+            "r2": round(new.r2, 4),
+            "baseline_r2": round(old.r2, 4),
+            "fit_time_s": round(new.fit_time_s, 3),
+            "baseline_fit_time_s": round(old.fit_time_s, 3),
+            # Per training row, since successive halving may have fitted them on different shares
+            "fit_speedup": round((old.fit_time_s / old.n_train_samples) / (new.fit_time_s / new.n_train_samples), 2),
+            "latency_ms_per_row": round(new.latency_ms_per_row, 4),
+            "baseline_latency_ms_per_row": round(old.latency_ms_per_row, 4),
+        }
+        self.model_report[f"{name} vs {baseline}"] = comparison
+        print(f"{name} vs {baseline}: R2 {comparison['r2']:.4f} vs {comparison['baseline_r2']:.4f}, "
+              f"fit {comparison['fit_time_s']:.1f}s on {new.n_train_samples} rows vs "
+              f"{comparison['baseline_fit_time_s']:.1f}s on {old.n_train_samples} rows "
+              f"({comparison['fit_speedup']}x faster per row), predict "
+              f"{comparison['latency_ms_per_row']:.3f} vs {comparison['baseline_latency_ms_per_row']:.3f} ms/row")
+        logger.info(f"Candidate comparison {name} vs {baseline}: {comparison}")
+        return comparison
+
+    def ensemble_weights(self, results):
+        """
+        Default ensemble weights: inverse test MSE of every candidate that beats
+        predicting the mean (R2 > 0). All candidates share one test set, so
+        MSE is proportional to 1 - R2.
+        """
+        return self._inverse_mse_weights(
+            {name: result.r2 for name, result in results.items() if result.estimator is not None}
+        )
+
+    @staticmethod
+    def _inverse_mse_weights(r2_by_name):
+        inverse_mse = {name: 1.0 / max(1.0 - r2, 1e-6) for name, r2 in r2_by_name.items() if r2 > 0}
+        total = sum(inverse_mse.values())
+        return {name: round(value / total, 6) for name, value in inverse_mse.items()}
+
+    @staticmethod
+    def calibrate_cascade(screen_pred, model_pred, y_true, max_rmse_increase):
+        """
+        Lowest screening threshold (so the most rows skip the main model) whose
+        cascade keeps test RMSE within max_rmse_increase of the main model's.
+        Rows the screen scores at or above the threshold keep the screen's
+        prediction. Returns inf, sending every row to the main model, if no
+        threshold qualifies.
+        """
+        limit = np.sqrt(np.mean((y_true - model_pred) ** 2)) * (1.0 + max_rmse_increase)
+        threshold = np.inf
+        # A shallow tree only predicts a few distinct values; try them from the top down
+        for candidate in np.unique(screen_pred)[::-1]:
+            cascade_pred = np.where(screen_pred >= candidate, screen_pred, model_pred)
+            if np.sqrt(np.mean((y_true - cascade_pred) ** 2)) > limit:
+                break
+            threshold = float(candidate)
+        return threshold
+
+    def train_cascade(self, model, X_train, y_train, X_test, y_test, model_version=None):
+        """
+        Fit the screening tree, calibrate its threshold on the test split and
+        save it compiled (scaler folded in) under cascade_dir. Returns the
+        report: threshold, share of rows still sent to the main model, measured
+        speedup and the accuracy given up.
+        """
+        config = self.model_trainer_config
+        screen = DecisionTreeRegressor(max_depth=config.cascade_max_depth, min_samples_leaf=50, random_state=42)
+        screen.fit(X_train, y_train)
+        compiled = compile_model(load_object(config.preprocessor_path), screen)
+        return self.publish_cascade(compiled, model, X_test, y_test, model_version)
+
+    def recalibrate_cascade(self, model, X_test, y_test, model_version):
+        """
+        Re-threshold the saved screen for `model` (grown in place by
+        ModelRefresher) and stamp it with its version; None if no cascade was
+        saved. The screen itself is kept: it only routes rows.
+        """
+        config = self.model_trainer_config
+        if not os.path.exists(MmapArtifactStore().manifest_path(config.cascade_dir)):
+            return None
+        return self.publish_cascade(CompiledPredictor.load(config.cascade_dir), model, X_test, y_test, model_version)
+
+    def publish_cascade(self, screen, model, X_test, y_test, model_version=None):
+        """Calibrate the compiled `screen` in front of `model` on the (scaled) test split and save it"""
+        config = self.model_trainer_config
+        start = time.perf_counter()
+        model_pred = model.predict(X_test)
+        model_time = time.perf_counter() - start
+        screen_pred = screen.predict_scaled(X_test)
+        threshold = self.calibrate_cascade(screen_pred, model_pred, y_test, config.cascade_max_rmse_increase)
+
+        # Time the cascade as served: screen every row, main model on the rest
+        start = time.perf_counter()
+        heavy = np.flatnonzero(screen.predict_scaled(X_test) < threshold)
+        cascade_pred = screen_pred.copy()
+        if len(heavy):
+            cascade_pred[heavy] = model.predict(X_test[heavy])
+        cascade_time = time.perf_counter() - start
+
+        def rmse(pred):
+            return float(np.sqrt(np.mean((y_test - pred) ** 2)))
+
+        def r2(pred):
+            return float(1.0 - np.sum((y_test - pred) ** 2) / np.sum((y_test - y_test.mean()) ** 2))
+
+        report = {
+            "threshold": threshold,
+            "heavy_fraction": round(len(heavy) / len(y_test), 4),
+            "speedup": round(model_time / cascade_time, 2),
+            "rmse_model": round(rmse(model_pred), 4),
+            "rmse_cascade": round(rmse(cascade_pred), 4),
+            "rmse_delta": round(rmse(cascade_pred) - rmse(model_pred), 4),
+            "r2_model": round(r2(model_pred), 4),
+            "r2_cascade": round(r2(cascade_pred), 4),
+        }
+
+        screen.metadata.update(cascade_threshold=threshold, model_version=model_version, report=report)
+        staging_path = f"{config.cascade_dir}.staging"
+        if os.path.exists(staging_path):
+            shutil.rmtree(staging_path)
+        screen.save(staging_path)
+        _replace_dir(staging_path, config.cascade_dir)
+
+        metrics = get_metrics()
+        for name, documentation, value in (
+            ("rul_cascade_heavy_fraction", "Share of test rows the cascade sends to the main model", report["heavy_fraction"]),
+            ("rul_cascade_speedup", "Main model time over cascade time on the test split", report["speedup"]),
+            ("rul_cascade_rmse_delta", "Test RMSE of the cascade minus that of the main model", report["rmse_delta"]),
+        ):
+            metrics.gauge(name, documentation).set(value)
+        return report
+
+    def model_version(self, preprocessor_sha256):
+        """Version id of the saved model.pkl with its preprocessor, as the serving registry computes it"""
+        if preprocessor_sha256 is None:
+            return None
+        return artifact_version([file_sha256(self.model_trainer_config.trained_model_file_path), preprocessor_sha256])
+
+    def save_candidates(self, results, best_model_name, preprocessor_sha256=None):
+        """
+        Persist every fitted candidate under candidates_dir with manifest.json
+        holding its test R2, latency and the default ensemble weights. The
+        manifest records the model version (model.pkl + preprocessor.pkl) the
+        candidates were trained with, so serving never mixes them with another
+        run's preprocessor. Built next to the live directory and swapped in whole.
+        """
+        config = self.model_trainer_config
+        staging_path = f"{config.candidates_dir}.staging"
+        if os.path.exists(staging_path):
+            shutil.rmtree(staging_path)
+        os.makedirs(staging_path)
+
+        candidates = {}
+        for name, result in results.items():
+            if result.estimator is None:
+                continue
+            file_name = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_") + ".pkl"
+            save_object(os.path.join(staging_path, file_name), result.estimator)
+            candidates[name] = dict(result.summary(), file=file_name)
+
+        model_version = self.model_version(preprocessor_sha256)
+        manifest = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "best": best_model_name,
+            "model_version": model_version,
+            "preprocessor_sha256": preprocessor_sha256,
+            "ensemble_weights": self.ensemble_weights(results),
+            "candidates": candidates,
+        }
+        with open(os.path.join(staging_path, "manifest.json"), "w") as file_obj:
+            json.dump(manifest, file_obj, indent=2, default=str)
+
+        _replace_dir(staging_path, config.candidates_dir)
+        return config.candidates_dir
+
+    def refresh_candidates(self, model, r2, model_version):
+        """
+        Put `model`, the best candidate grown in place by ModelRefresher, into
+        the saved candidates with its new test R2, re-weight the default
+        ensemble and stamp the manifest with `model_version`. The other
+        candidates are kept as they are. Returns candidates_dir, or None if
+        no candidates were saved.
+        """
+        config = self.model_trainer_config
+        manifest_path = os.path.join(config.candidates_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as file_obj:
+            manifest = json.load(file_obj)
+        best = manifest["best"]
+        if best not in manifest["candidates"]:
+            return None
+
+        staging_path = f"{config.candidates_dir}.staging"
+        if os.path.exists(staging_path):
+            shutil.rmtree(staging_path)
+        os.makedirs(staging_path)
+        for name, entry in manifest["candidates"].items():
+            target = os.path.join(staging_path, entry["file"])
+            if name == best:
+                save_object(target, model)
+                continue
+            # Files are replaced, never edited in place, so the unchanged ones can be shared
+            try:
+                os.link(os.path.join(config.candidates_dir, entry["file"]), target)
+            except OSError:
+                shutil.copy2(os.path.join(config.candidates_dir, entry["file"]), target)
+
+        manifest["candidates"][best]["r2"] = round(r2, 4)
+        manifest.update(
+            refreshed_at=datetime.now().isoformat(timespec="seconds"),
+            model_version=model_version,
+            ensemble_weights=self._inverse_mse_weights(
+                {name: entry["r2"] for name, entry in manifest["candidates"].items()}
+            ),
+        )
+        with open(os.path.join(staging_path, "manifest.json"), "w") as file_obj:
+            json.dump(manifest, file_obj, indent=2, default=str)
+
+        _replace_dir(staging_path, config.candidates_dir)
+        return config.candidates_dir
+
+    def initiate_model_training(self, train_path, test_path, train_array=None, test_array=None):
+        """
+        Train on the transformed tables at train_path/test_path. When the
+        caller already holds the arrays in memory (same-process pipeline run)
+        it passes them in and they are used as-is instead of being re-read.
+        """
         logger.info("Starting model training process")
         print("=== Starting Model Training ===")
 
         try:
             # 1. Load and verify input data
             print("\n[1/4] Loading and validating data...")
-            train_array, test_array = self._load_and_validate_data(train_path, test_path)
+            if train_array is None or test_array is None:
+                train_array, test_array = self._load_and_validate_data(train_path, test_path)
+            else:
+                train_array = np.asarray(train_array, dtype=float)
+                test_array = np.asarray(test_array, dtype=float)
             print("✓ Data loaded and validated")
 
             # 2. Ensure artifacts directory exists
@@ -86,55 +447,38 @@ class ModelTrainer:
                 test_array[:, -1]
             )
             
-            # Selecting models
-            models = {
-                "Random Forest": RandomForestRegressor(),
-                "Gradient Boosting": GradientBoostingRegressor(),
-                "XGBRegressor": XGBRegressor(),
-                "SupportVector Regressor": SVR(),
-            }
-
-            # Defining parameters for models
-            params = {
-                'Random Forest': {
-                    'n_estimators': [200],
-                    'max_depth': [20],
-                    'min_samples_split': [5],
-                    'min_samples_leaf': [2]
-                },
-                'Gradient Boosting': {
-                    'n_estimators': [200],
-                    'learning_rate': [0.05],
-                    'max_depth': [20],
-                    'min_samples_split': [5],
-                    'min_samples_leaf': [2]
-                },
-                'XGBRegressor': {
-                    'n_estimators': [200],
-                    'learning_rate': [0.05],
-                    'max_depth': [20],
-                    'min_child_weight': [5]
-                },
-                'SupportVector Regressor': {
-                    'C': [5],
-                    'kernel': ['rbf'],
-                    'degree': [2],
-                    'epsilon': [0.01,]
-                },
-            }
-            
-            model_report = evaluate_models(
-                X_train=X_train, y_train=y_train,
-                X_test=X_test, y_test=y_test,
-                models=models, params=params
-            )
+            # Selecting models and their parameter grids
+            models, params = self.get_model_candidates()
+
+            # Histogram candidates share one uint8 quantization of the data across folds and rungs
+            binned = None
+            prebinned = [name for name, model in models.items() if isinstance(model, BinnedGradientBoostingRegressor)]
+            if prebinned:
+                binner = QuantileBinner().fit(X_train)
+                for name in prebinned:
+                    models[name].set_params(binner=binner)
+                binned = (binner.transform(X_train), binner.transform(X_test))
+
+            folds = self.cv_folds(train_path, len(y_train))
+
+            # Candidates run in parallel; weak ones are dropped early by successive halving
+            results = self.scheduler.run(X_train, y_train, X_test, y_test, models, params,
+                                         binned=binned, folds=folds)
+            self.model_report = {name: result.summary() for name, result in results.items()}
+            for name, result in results.items():
+                status = "eliminated" if result.eliminated else "finalist"
+                print(f"{name}: R2={result.r2:.4f} (unit CV {result.cv_r2:.4f}) on {result.n_train_samples} rows, "
+                      f"fit {result.fit_time_s:.1f}s, predict {result.latency_ms_per_row:.3f} ms/row, "
+                      f"peak RSS {result.peak_rss_mb:.0f} MB ({status})")
+                logger.info(f"Candidate {name}: {result.summary()}")
+
+            self.compare_candidates(results, "HistGradientBoosting", "Gradient Boosting")
+            self.compare_candidates(results, "Nystroem Ridge", "SupportVector Regressor")
 
             # Get best model name and score
-            best_model_score = max(sorted(model_report.values()))
-            best_model_name = list(model_report.keys())[
-                list(model_report.values()).index(best_model_score)
-            ]
-            best_model = models[best_model_name]
+            best_model_name = self.scheduler.select_best(results)
+            best_model_score = results[best_model_name].r2
+            best_model = results[best_model_name].estimator
 
             print(f'Best Model Found: {best_model_name}, R2 Score: {best_model_score}')
             logger.info(f'Best model: {best_model_name} with score: {best_model_score}')
@@ -157,6 +501,23 @@ class ModelTrainer:
             print(f"✓ Model saved to {self.model_trainer_config.trained_model_file_path}")
             logger.info(f"Model saved successfully at {self.model_trainer_config.trained_model_file_path}")
 
+            # The other candidates stay available for per-request model selection and ensembles
+            preprocessor_sha256 = None
+            if os.path.isdir(train_path):
+                preprocessor_sha256 = self.store.read_metadata(train_path).get("preprocessor_sha256")
+            candidates_dir = self.save_candidates(results, best_model_name, preprocessor_sha256)
+            print(f"✓ {sum(r.estimator is not None for r in results.values())} candidates saved to {candidates_dir}")
+            logger.info(f"Candidate models saved at {candidates_dir}")
+
+            if os.path.exists(self.model_trainer_config.preprocessor_path):
+                report = self.train_cascade(best_model, X_train, y_train, X_test, y_test,
+                                            self.model_version(preprocessor_sha256))
+                self.model_report["cascade"] = report
+                print(f"✓ Cascade screen saved to {self.model_trainer_config.cascade_dir}: "
+                      f"{report['heavy_fraction']:.1%} of test rows reach {best_model_name}, "
+                      f"{report['speedup']}x faster, RMSE {report['rmse_model']} -> {report['rmse_cascade']}")
+                logger.info(f"Cascade report: {report}")
+
 
             print("\n=== Model Training Completed Successfully ===")
             logger.info("Model training completed successfully")
@@ -176,8 +537,8 @@ if __name__ == "__main__":
     
     try:
         # Example paths (replace with actual transformed data paths)
-        train_path = "artifacts/transformed_train.csv"
-        test_path = "artifacts/transformed_test.csv"
+        train_path = "artifacts/transformed_train"
+        test_path = "artifacts/transformed_test"
 
         trainer = ModelTrainer()
         model_path = trainer.initiate_model_training(train_path, test_path)
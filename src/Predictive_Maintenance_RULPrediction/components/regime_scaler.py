@@ -0,0 +1,160 @@
+import numpy as np
+
+
+class RegimeScaler:
+    """
+    RobustScaler fitted per operating regime.
+
+    Regimes are clusters of the operational settings (k-means on settings
+    standardized to unit variance), found at fit time: the fewest clusters,
+    up to `max_regimes`, that leave at most `tolerance` of the settings'
+    variance within clusters. Single-condition data (FD001) has no such
+    clusters and gets one regime, which scales exactly like RobustScaler.
+
+    Sensor (and engineered) columns are centred and scaled with the median
+    and IQR of their row's regime; unit, time and the settings themselves
+    keep the global statistics, so rows can be un-scaled and re-assigned.
+
+    Assigning a regime is one small matrix product: the nearest centroid
+    (in standardized distance) is argmin(X[:, regime_features_] @
+    regime_weights_ + regime_bias_), with the standardization folded into
+    the precomputed (n_settings x n_regimes) weights. Only NumPy is needed
+    to transform; k-means is only imported by fit.
+    """
+    # Columns that always use the global statistics, besides the regime columns
+    global_columns = ("unit", "time")
+
+    def __init__(self, regime_columns, max_regimes=6, tolerance=0.001, quantile_range=(25.0, 75.0),
+                 subsample=100000, random_state=42):
+        self.regime_columns = tuple(regime_columns)
+        self.max_regimes = int(max_regimes)
+        self.tolerance = float(tolerance)
+        self.quantile_range = tuple(quantile_range)
+        self.subsample = int(subsample)
+        self.random_state = random_state
+
+    @property
+    def n_regimes_(self):
+        return len(self.center_)
+
+    def _robust_stats(self, X):
+        """Median and IQR of every column, with RobustScaler's handling of constant columns"""
+        low, median, high = np.percentile(X, [self.quantile_range[0], 50, self.quantile_range[1]], axis=0)
+        scale = high - low
+        scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+        return median, scale
+
+    def _find_regimes(self, settings):
+        """Centroids of the regimes in standardized settings, shape (n_regimes, n_settings)"""
+        total = np.sum((settings - settings.mean(axis=0)) ** 2)
+        if self.max_regimes <= 1 or total == 0:
+            return settings.mean(axis=0, keepdims=True)
+
+        from sklearn.cluster import KMeans
+
+        sample = settings
+        if len(settings) > self.subsample:
+            rows = np.random.RandomState(self.random_state).choice(len(settings), self.subsample, replace=False)
+            sample = settings[rows]
+        sample_total = np.sum((sample - sample.mean(axis=0)) ** 2)
+
+        def fit_regimes(n_regimes):
+            kmeans = KMeans(n_clusters=n_regimes, n_init=10, random_state=self.random_state).fit(sample)
+            return kmeans if kmeans.inertia_ <= self.tolerance * sample_total else None
+
+        # More clusters never leave more variance within them, so if max_regimes clusters are
+        # too loose no fewer will do: one fit settles single-regime data. Otherwise the fewest
+        # clusters that fit are found by bisection, between 1 (never tight) and max_regimes.
+        best = fit_regimes(self.max_regimes)
+        if best is None:
+            return settings.mean(axis=0, keepdims=True)
+        loose, tight = 1, self.max_regimes
+        while tight - loose > 1:
+            middle = (loose + tight) // 2
+            kmeans = fit_regimes(middle)
+            if kmeans is None:
+                loose = middle
+            else:
+                tight, best = middle, kmeans
+        # Ordered by the first setting, so regime ids are stable across refits
+        return best.cluster_centers_[np.lexsort(best.cluster_centers_.T[::-1])]
+
+    def fit(self, X, feature_names=None):
+        """Fit on a DataFrame, or on an array with its `feature_names`"""
+        if hasattr(X, "columns"):
+            feature_names = list(X.columns)
+            X = X.to_numpy(np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        if feature_names is None or len(feature_names) != X.shape[1]:
+            raise ValueError("RegimeScaler needs the name of every column")
+        feature_names = [str(name) for name in feature_names]
+        missing = [name for name in self.regime_columns if name not in feature_names]
+        if missing:
+            raise ValueError(f"Regime columns {missing} are not among the features")
+
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(feature_names)
+        self.regime_features_ = np.asarray([feature_names.index(name) for name in self.regime_columns],
+                                           dtype=np.intp)
+        settings = X[:, self.regime_features_]
+        mean, std = settings.mean(axis=0), settings.std(axis=0)
+        std[std == 0] = 1.0
+        centroids = self._find_regimes((settings - mean) / std)
+
+        # ||(x - mean) / std - c||^2 = sum(w * x^2) - 2 x.(w * r) + sum(w * r^2), with r = mean + std * c
+        # and w = 1 / std^2; the first term is the same for every regime
+        raw_centroids = mean + std * centroids
+        weights = 1.0 / std ** 2
+        self.regime_weights_ = -2.0 * (weights * raw_centroids).T
+        self.regime_bias_ = np.sum(weights * raw_centroids ** 2, axis=1)
+        return self.fit_statistics(X)
+
+    def fit_statistics(self, X):
+        """(Re)compute the per-regime median and IQR on X with the regimes kept as they are"""
+        X = np.asarray(X, dtype=np.float64)
+        center, scale = self._robust_stats(X)
+        n_regimes = len(self.regime_bias_)
+        self.center_ = np.tile(center, (n_regimes, 1))
+        self.scale_ = np.tile(scale, (n_regimes, 1))
+        if n_regimes > 1:
+            fixed = set(self.global_columns) | set(self.regime_columns)
+            per_regime = np.asarray([name not in fixed for name in self.feature_names_in_])
+            regimes = self.assign(X)
+            for regime in range(n_regimes):
+                rows = X[regimes == regime]
+                # A regime too rare to have an IQR keeps the global statistics
+                if len(rows) >= 2:
+                    regime_center, regime_scale = self._robust_stats(rows[:, per_regime])
+                    self.center_[regime, per_regime] = regime_center
+                    self.scale_[regime, per_regime] = regime_scale
+        return self
+
+    def fit_transform(self, X, feature_names=None):
+        return self.fit(X, feature_names).transform(X)
+
+    def assign(self, X):
+        """Regime id of every row of raw features"""
+        X = np.asarray(X, dtype=np.float64)
+        if len(self.regime_bias_) == 1:
+            return np.zeros(len(X), dtype=np.intp)
+        return np.argmin(X[:, self.regime_features_] @ self.regime_weights_ + self.regime_bias_, axis=1)
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if len(self.center_) == 1:
+            return (X - self.center_[0]) / self.scale_[0]
+        regimes = self.assign(X)
+        return (X - self.center_[regimes]) / self.scale_[regimes]
+
+    def inverse_transform(self, X_scaled):
+        X_scaled = np.asarray(X_scaled, dtype=np.float64)
+        if len(self.center_) == 1:
+            return X_scaled * self.scale_[0] + self.center_[0]
+        # The settings are scaled the same in every regime, so they are recovered first
+        X = X_scaled * self.scale_[0] + self.center_[0]
+        regimes = self.assign(X)
+        return X_scaled * self.scale_[regimes] + self.center_[regimes]
+
+    def __repr__(self):
+        fitted = "unfitted" if not hasattr(self, "center_") else f"{self.n_regimes_} regimes"
+        return f"RegimeScaler(regime_columns={list(self.regime_columns)}, {fitted})"
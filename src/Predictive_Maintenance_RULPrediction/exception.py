@@ -1,6 +1,5 @@
 import sys
 import traceback
-import mlflow
 
 def error_message_detail(error, error_detail: sys):
     _, _, exc_tb = error_detail.exc_info()
@@ -24,6 +23,7 @@ class CustomException(Exception):
         """
         Log exceptions to MLflow
         """
+        import mlflow
         mlflow.log_params({"Exception": str(self)})
         mlflow.log_params({"ExceptionStackTrace": traceback.format_exc()})
 
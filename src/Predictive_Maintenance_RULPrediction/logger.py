@@ -1,24 +1,202 @@
 import logging
+import logging.handlers
 import os
-from datetime import datetime
-import mlflow
+import json
+import queue
+import atexit
+import random
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from multiprocessing import util as multiprocessing_util
 
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
-logs_path = os.path.join(os.getcwd(), "logs")
-os.makedirs(logs_path, exist_ok=True)
 
-LOG_FILE_PATH = os.path.join(logs_path, LOG_FILE)
+class LoggingConfig:
+    def __init__(self):
+        self.level = os.environ.get("RUL_LOG_LEVEL", "INFO").upper()
+        # "json" (one object per line) or "text"
+        self.format = os.environ.get("RUL_LOG_FORMAT", "json")
+        # One append-only file shared by every process, instead of a new file per start
+        self.log_dir = os.path.join(os.getcwd(), "logs")
+        self.log_file = os.environ.get("RUL_LOG_FILE", "rul.log")
+        # Also write records to stderr (e.g. in containers)
+        self.stderr = os.environ.get("RUL_LOG_STDERR", "0") == "1"
+        # Fraction of per-request INFO records kept, and at most this many per second (0 = unlimited)
+        self.request_sample_rate = float(os.environ.get("RUL_LOG_REQUEST_SAMPLE_RATE", "0.01"))
+        self.request_rate_limit = float(os.environ.get("RUL_LOG_REQUEST_RATE_LIMIT", "10"))
 
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO
-)
+
+# Attributes every LogRecord has; anything else on a record came from `extra=` and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, source and any `extra=` fields"""
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread. The message is rendered here, in the
+    caller's thread, so mutable arguments cannot change before it is written;
+    everything else (JSON encoding, file I/O) happens on the listener.
+    """
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+
+class SampledLogger:
+    """
+    Logger front for hot paths. INFO/DEBUG calls keep a random `sample_rate`
+    fraction of records, at most `rate_limit` per second (token bucket), and
+    are dropped before a LogRecord is built; warnings and errors always pass.
+    Each kept record carries how many were dropped since the previous one.
+    """
+    def __init__(self, logger, sample_rate=1.0, rate_limit=0.0):
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.rate_limit = rate_limit
+        self._tokens = rate_limit
+        self._last = time.monotonic()
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def _sample(self):
+        """Number of records dropped before this one, or None to drop this one too"""
+        with self._lock:
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                self._dropped += 1
+                return None
+            if self.rate_limit > 0:
+                now = time.monotonic()
+                self._tokens = min(self.rate_limit, self._tokens + (now - self._last) * self.rate_limit)
+                self._last = now
+                if self._tokens < 1.0:
+                    self._dropped += 1
+                    return None
+                self._tokens -= 1.0
+            dropped, self._dropped = self._dropped, 0
+            return dropped
+
+    def _log_sampled(self, level, msg, args, kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        dropped = self._sample()
+        if dropped is None:
+            return
+        if dropped:
+            kwargs["extra"] = dict(kwargs.get("extra") or {}, sampled_out=dropped)
+        self.logger.log(level, msg, *args, stacklevel=3, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self._log_sampled(logging.DEBUG, msg, args, kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self._log_sampled(logging.INFO, msg, args, kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.logger.warning(msg, *args, stacklevel=2, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self.logger.error(msg, *args, stacklevel=2, **kwargs)
+
+
+_state = {}
+
+
+def _start_listener():
+    """(Re)create the queue and its listener thread; threads do not survive fork()"""
+    log_queue = queue.SimpleQueue()
+    _state["queue_handler"].queue = log_queue
+    listener = logging.handlers.QueueListener(log_queue, *_state["handlers"], respect_handler_level=True)
+    listener.start()
+    _state["listener"] = listener
+
+
+def _stop_listener():
+    listener = _state.pop("listener", None)
+    if listener is not None:
+        # Writes out every record still queued
+        listener.stop()
+
+
+def configure_logging(config=None):
+    """
+    Route all logging through one queue: callers only enqueue a record and a
+    background listener formats and writes it. Safe to call more than once.
+    """
+    if _state:
+        return
+    config = config or LoggingConfig()
+    formatter = JsonFormatter() if config.format == "json" else logging.Formatter(
+        "[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s"
+    )
+    os.makedirs(config.log_dir, exist_ok=True)
+    handlers = [logging.FileHandler(os.path.join(config.log_dir, config.log_file), delay=True)]
+    if config.stderr:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = _QueueHandler(queue.SimpleQueue())
+    root = logging.getLogger()
+    root.setLevel(config.level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    request_logger = SampledLogger(logging.getLogger("rul.requests"),
+                                   config.request_sample_rate, config.request_rate_limit)
+
+    _state.update(queue_handler=queue_handler, handlers=handlers, request_logger=request_logger,
+                  log_file_path=os.path.join(config.log_dir, config.log_file))
+    _start_listener()
+    atexit.register(_stop_listener)
+    # multiprocessing children skip atexit; finalizers with a priority still run on their exit
+    multiprocessing_util.Finalize(None, _stop_listener, exitpriority=0)
+    # A forked child (e.g. a gunicorn worker) gets a fresh queue and its own listener
+    os.register_at_fork(after_in_child=_start_listener)
+
+
+def get_request_logger():
+    """Logger for per-request records, sampled and rate-limited (RUL_LOG_REQUEST_*)"""
+    return _state["request_logger"]
+
+
+configure_logging()
+LOG_FILE_PATH = _state["log_file_path"]
 
 def log_exception_to_mlflow(exception):
     """
     Log exceptions to MLflow
     """
+    # Imported here: mlflow is only needed by training runs and is slow to import
+    import mlflow
     mlflow.log_params({"Exception": str(exception)})
     mlflow.log_params({"ExceptionStackTrace": traceback.format_exc()})
     mlflow.log_artifact(LOG_FILE_PATH)
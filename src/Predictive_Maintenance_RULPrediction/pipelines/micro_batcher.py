@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future
+from src.Predictive_Maintenance_RULPrediction.logger import logging
+from src.Predictive_Maintenance_RULPrediction.exception import CustomException
+from src.Predictive_Maintenance_RULPrediction.metrics import SIZE_BUCKETS, get_metrics
+
+_batch_rows = get_metrics().histogram(
+    "rul_batch_rows", "Rows per scored batch", ("path",), buckets=SIZE_BUCKETS
+)
+
+
+class MicroBatcherConfig:
+    def __init__(self):
+        self.enabled = os.environ.get("RUL_MICRO_BATCH", "0") == "1"
+        # Longest time the first request of a batch waits for company
+        self.max_wait_ms = float(os.environ.get("RUL_MICRO_BATCH_MAX_WAIT_MS", "5"))
+        # Largest number of rows scored in one model call
+        self.max_batch_size = int(os.environ.get("RUL_MICRO_BATCH_MAX_SIZE", "64"))
+
+
+class _PendingRequest:
+    __slots__ = ("features", "future")
+
+    def __init__(self, features):
+        self.features = features
+        self.future = Future()
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent small prediction requests into one model call.
+
+    Requests are queued; a single dispatcher thread collects them for up to
+    `max_wait_ms` or until `max_batch_size` rows are pending, runs one
+    preprocessor.transform + model.predict on the stacked rows and hands each
+    caller back its own slice of the result.
+    """
+    def __init__(self, registry, max_wait_ms=5.0, max_batch_size=64):
+        self.registry = registry
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._batches = 0
+        self._rows = 0
+        self._largest_batch = 0
+        self._size_histogram = {}
+
+    def predict(self, features, timeout=None):
+        """Score `features` as part of a coalesced batch and return (predictions, model_version)"""
+        return self.submit(features).result(timeout=timeout)
+
+    def submit(self, features):
+        """Queue `features` for the next batch and return a Future of (predictions, model_version)"""
+        self._ensure_dispatcher()
+        pending = _PendingRequest(features)
+        self._queue.put(pending)
+        return pending.future
+
+    def stats(self):
+        """Counters describing the batch sizes achieved so far"""
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "rows": self._rows,
+                "mean_batch_size": round(self._rows / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                # Batch counts bucketed by the next power of two of their row count
+                "batch_size_histogram": dict(sorted(self._size_histogram.items())),
+            }
+
+    def _ensure_dispatcher(self):
+        # Threads do not survive fork(), so a pre-forked worker starts its own dispatcher
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="rul-micro-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        n_rows = len(batch[0].features)
+        deadline = time.monotonic() + self.max_wait
+        while n_rows < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            n_rows += len(pending.features)
+        return batch, n_rows
+
+    def _run(self):
+        while True:
+            batch, n_rows = self._collect()
+            try:
+                model_version = self.registry.get()
+                if len(batch) == 1:
+                    stacked, groups = batch[0].features, None
+                else:
+                    stacked = np.concatenate([pending.features for pending in batch])
+                    # Requests never share trajectory features, even for the same unit number
+                    groups = np.repeat(np.arange(len(batch)), [len(pending.features) for pending in batch])
+                preds = model_version.predict(stacked, groups)
+            except Exception as e:
+                logging.error(f"Micro-batch of {n_rows} rows failed: {str(e)}")
+                error = CustomException(e, sys)
+                for pending in batch:
+                    pending.future.set_exception(error)
+                continue
+
+            start = 0
+            for pending in batch:
+                stop = start + len(pending.features)
+                pending.future.set_result((preds[start:stop], model_version.version))
+                start = stop
+            self._record(n_rows)
+
+    def _record(self, n_rows):
+        _batch_rows.observe(n_rows, path="micro_batch")
+        bucket = 1
+        while bucket < n_rows:
+            bucket *= 2
+        with self._lock:
+            self._batches += 1
+            self._rows += n_rows
+            self._largest_batch = max(self._largest_batch, n_rows)
+            self._size_histogram[bucket] = self._size_histogram.get(bucket, 0) + 1
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_micro_batcher(registry, config=None):
+    """Return the process-wide micro-batcher in front of `registry`"""
+    config = config or MicroBatcherConfig()
+    with _batchers_lock:
+        batcher = _batchers.get(id(registry))
+        if batcher is None:
+            batcher = MicroBatcher(registry, config.max_wait_ms, config.max_batch_size)
+            _batchers[id(registry)] = batcher
+            logging.info(
+                f"Micro-batching enabled (max_wait_ms={config.max_wait_ms}, "
+                f"max_batch_size={config.max_batch_size})"
+            )
+        return batcher
@@ -0,0 +1,448 @@
+import os
+import sys
+import json
+import time
+import pickle
+import hashlib
+import threading
+import warnings
+from datetime import datetime
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from src.Predictive_Maintenance_RULPrediction.logger import logging
+from src.Predictive_Maintenance_RULPrediction.exception import CustomException
+from src.Predictive_Maintenance_RULPrediction.compiled_predictor import CompiledPredictor
+from src.Predictive_Maintenance_RULPrediction.components.feature_engineering import FeatureEngineer
+from src.Predictive_Maintenance_RULPrediction.artifact_store import MmapArtifactStore, file_sha256, artifact_version
+from src.Predictive_Maintenance_RULPrediction.metrics import get_metrics
+
+_metrics = get_metrics()
+_stage_seconds = _metrics.histogram(
+    "rul_request_stage_seconds", "Time spent in each stage of a prediction request", ("stage",)
+)
+_rows_scored = _metrics.counter("rul_rows_scored_total", "Rows scored, by model version", ("model_version",))
+_cascade_rows = _metrics.counter(
+    "rul_cascade_rows_total", "Rows scored in cascade mode, by the model whose prediction was served", ("path",)
+)
+
+
+class ModelRegistryConfig:
+    def __init__(self):
+        self.model_path = os.path.join("artifacts", "model.pkl")
+        self.preprocessor_path = os.path.join("artifacts", "preprocessor.pkl")
+        self.compiled_model_path = os.path.join("artifacts", "model_compiled")
+        # Serve the NumPy-only compiled model when it matches model.pkl/preprocessor.pkl
+        self.use_compiled_model = os.environ.get("RUL_USE_COMPILED_MODEL", "1") != "0"
+        # Seconds between artifact stat() checks; 0 checks on every request
+        self.check_interval = float(os.environ.get("RUL_MODEL_CHECK_INTERVAL", "2.0"))
+        # Every trained candidate, for requests that pick a model or an ensemble
+        self.candidates_path = os.path.join("artifacts", "candidates")
+        # Threads evaluating ensemble members side by side
+        self.ensemble_threads = int(os.environ.get("RUL_ENSEMBLE_THREADS", "4"))
+        # Cascade mode: a shallow screening tree answers for rows far from failure and only
+        # the rest reach the main model (see ModelTrainer.train_cascade)
+        self.cascade_path = os.path.join("artifacts", "cascade")
+        self.use_cascade = os.environ.get("RUL_CASCADE", "0") == "1"
+
+
+def _scale(preprocessor, features):
+    """
+    preprocessor.transform on a FEATURE_COLUMNS-ordered array. The order is checked
+    against feature_names_in_ once per version (see validate_feature_order), so
+    sklearn's per-call "no feature names" warning is silenced, for this call only.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+        return preprocessor.transform(features)
+
+
+_ensemble_state = {}
+_ensemble_lock = threading.Lock()
+
+
+def _get_ensemble_executor():
+    """Process-wide pool for ensemble members; created lazily so pre-forked workers get their own"""
+    with _ensemble_lock:
+        if _ensemble_state.get("pid") != os.getpid():
+            threads = ModelRegistryConfig().ensemble_threads
+            _ensemble_state.update(pid=os.getpid(), executor=ThreadPoolExecutor(threads, thread_name_prefix="rul-ensemble"))
+        return _ensemble_state["executor"]
+
+
+class CandidateModels:
+    """
+    Every model from one training run (see ModelTrainer.save_candidates) with
+    the preprocessor they were trained on. A request selects one by name, a
+    weighted ensemble as {name: weight}, or "ensemble" for the weights chosen
+    at training time. Ensemble members are scored concurrently on one scaled
+    input, so the preprocessor runs once per batch.
+    """
+    manifest_file = "manifest.json"
+
+    def __init__(self, manifest, models, preprocessor):
+        self.manifest = manifest
+        self.models = models
+        self.preprocessor = preprocessor
+
+    @classmethod
+    def load(cls, path, preprocessor_path, version):
+        """Load the candidates saved for model `version`; ValueError if there are none"""
+        manifest_path = os.path.join(path, cls.manifest_file)
+        if not os.path.exists(manifest_path):
+            raise ValueError("No candidate models were saved with this model; retrain to enable model selection")
+        with open(manifest_path) as file_obj:
+            manifest = json.load(file_obj)
+        if manifest.get("model_version") not in (None, version):
+            raise ValueError(f"Candidate models belong to model version {manifest['model_version']}, "
+                             f"not the served version {version}")
+        with open(preprocessor_path, 'rb') as file_obj:
+            payload = file_obj.read()
+        expected = manifest.get("preprocessor_sha256")
+        if expected is not None and hashlib.sha256(payload).hexdigest() != expected:
+            raise ValueError("Candidate models were trained with a different preprocessor")
+        models = {}
+        for name, entry in manifest["candidates"].items():
+            with open(os.path.join(path, entry["file"]), 'rb') as file_obj:
+                models[name] = pickle.load(file_obj)
+        logging.info(f"Loaded {len(models)} candidate models for version {version}")
+        return cls(manifest, models, pickle.loads(payload))
+
+    def weights(self, selection):
+        """Normalized {name: weight} for a model name, "ensemble" or a {name: weight} mapping"""
+        if isinstance(selection, str):
+            if selection == "ensemble":
+                selection = self.manifest["ensemble_weights"]
+            else:
+                selection = {selection: 1.0}
+        if not isinstance(selection, dict) or not selection:
+            raise ValueError('Model must be a candidate name, "ensemble" or a {name: weight} mapping')
+        unknown = [name for name in selection if name not in self.models]
+        if unknown:
+            raise ValueError(f"Unknown model {', '.join(map(str, unknown))}; available: {', '.join(self.models)}")
+        try:
+            weights = {name: float(weight) for name, weight in selection.items() if float(weight) != 0}
+        except (TypeError, ValueError):
+            raise ValueError("Ensemble weights must be numbers")
+        total = sum(weights.values())
+        if not weights or any(weight < 0 for weight in weights.values()) or total <= 0:
+            raise ValueError("Ensemble weights must be non-negative with a positive sum")
+        return {name: weight / total for name, weight in weights.items()}
+
+    def predict_scaled(self, X_scaled, weights):
+        """Weighted sum of the members' predictions on already-scaled features"""
+        if len(weights) == 1:
+            (name, _), = weights.items()
+            return self.models[name].predict(X_scaled)
+        executor = _get_ensemble_executor()
+        futures = {name: executor.submit(self.models[name].predict, X_scaled) for name in weights}
+        return sum(weight * futures[name].result() for name, weight in weights.items())
+
+    def describe(self):
+        return {
+            "best": self.manifest["best"],
+            "created_at": self.manifest.get("created_at"),
+            "ensemble_weights": self.manifest["ensemble_weights"],
+            "candidates": {
+                name: {key: value for key, value in entry.items() if key != "file"}
+                for name, entry in self.manifest["candidates"].items()
+            },
+        }
+
+
+class HistoryRequired(ValueError):
+    """Raised when rows sent for a model with trajectory features lack their units' earlier cycles"""
+
+
+class ModelVersion:
+    """
+    Immutable snapshot of a loaded model and its preprocessor. A compiled model
+    folds the preprocessor in, in which case `preprocessor` is None. If the
+    model was trained on engineered trajectory features, the FeatureEngineer
+    is rebuilt from the fitted feature names and applied before scaling.
+    The other candidates of the training run are loaded on first use. With a
+    `cascade` screen, rows it scores at or above its calibrated threshold keep
+    its prediction and only the others are scored by the model.
+    """
+    def __init__(self, version, model, preprocessor, loaded_at, candidates_path=None, preprocessor_path=None,
+                 cascade=None):
+        self.version = version
+        self.model = model
+        self.preprocessor = preprocessor
+        self.loaded_at = loaded_at
+        self.cascade = cascade
+        self.candidates_path = candidates_path
+        self.preprocessor_path = preprocessor_path
+        names = self.feature_names_in_
+        self.feature_engineer = None if names is None else FeatureEngineer.from_feature_names(names)
+        self._candidates = None
+        self._candidates_lock = threading.Lock()
+
+    @property
+    def compiled(self):
+        return self.preprocessor is None
+
+    @property
+    def feature_names_in_(self):
+        source = self.model if self.compiled else self.preprocessor
+        return getattr(source, "feature_names_in_", None)
+
+    def with_cascade(self, cascade):
+        """The same model version served through `cascade`"""
+        model_version = ModelVersion(self.version, self.model, self.preprocessor, self.loaded_at,
+                                     self.candidates_path, self.preprocessor_path, cascade)
+        model_version._candidates = self._candidates
+        return model_version
+
+    def candidates(self):
+        """CandidateModels trained together with this version, loaded once"""
+        if self._candidates is None:
+            with self._candidates_lock:
+                if self._candidates is None:
+                    if self.candidates_path is None:
+                        raise ValueError("Model selection is not configured for this registry")
+                    self._candidates = CandidateModels.load(self.candidates_path, self.preprocessor_path, self.version)
+        return self._candidates
+
+    def check_history(self, features, groups=None):
+        """
+        Raise HistoryRequired if this model uses trajectory features and a unit
+        in `features` is not sent with every cycle from 1 onwards: its rolling
+        and EWMA features would be computed over the rows sent alone.
+        """
+        if self.feature_engineer is None:
+            return
+        units = self.feature_engineer.units_missing_history(features, groups)
+        if units:
+            shown = ", ".join(f"{unit:g}" for unit in units[:10]) + (", ..." if len(units) > 10 else "")
+            raise HistoryRequired(
+                f"Model version {self.version} uses trajectory features computed over each unit's history, "
+                f"but unit(s) {shown} were not sent with every cycle from 1 onwards. Send whole trajectories "
+                f"to /predict/batch, or stream cycles to /predict/stream, which keeps each unit's history."
+            )
+
+    def prepare(self, features, groups=None):
+        """Add engineered features to raw FEATURE_COLUMNS rows, if this model uses any"""
+        if self.feature_engineer is None:
+            return features
+        with _metrics.timer(_stage_seconds, stage="feature_engineering"):
+            return self.feature_engineer.transform(features, groups)
+
+    def predict(self, features, groups=None, model=None):
+        """Engineer and scale the features and run the model, or the candidates `model` selects"""
+        return self.predict_prepared(self.prepare(features, groups), model)
+
+    def predict_prepared(self, features, model=None):
+        """Scale already-prepared features and run the model, or the candidates `model` selects"""
+        _rows_scored.inc(len(features), model_version=self.version)
+        if model is not None:
+            candidates = self.candidates()
+            weights = candidates.weights(model)
+            with _metrics.timer(_stage_seconds, stage="preprocess"):
+                data_scaled = _scale(candidates.preprocessor, features)
+            with _metrics.timer(_stage_seconds, stage="predict"):
+                return candidates.predict_scaled(data_scaled, weights)
+        if self.cascade is not None:
+            return self._predict_cascade(features)
+        return self._predict_model(features)
+
+    def _predict_cascade(self, features):
+        with _metrics.timer(_stage_seconds, stage="screen"):
+            preds = self.cascade.predict(features)
+        heavy = np.flatnonzero(preds < self.cascade.metadata["cascade_threshold"])
+        _cascade_rows.inc(len(preds) - len(heavy), path="screen")
+        if len(heavy):
+            _cascade_rows.inc(len(heavy), path="model")
+            preds[heavy] = self._predict_model(features[heavy])
+        return preds
+
+    def _predict_model(self, features):
+        if self.compiled:
+            # Scaling is folded into the compiled model
+            with _metrics.timer(_stage_seconds, stage="predict"):
+                return self.model.predict(features)
+        with _metrics.timer(_stage_seconds, stage="preprocess"):
+            data_scaled = _scale(self.preprocessor, features)
+        with _metrics.timer(_stage_seconds, stage="predict"):
+            return self.model.predict(data_scaled)
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at.isoformat(timespec="seconds"),
+            "model": self.model.metadata["model"] if self.compiled else type(self.model).__name__,
+            "backend": "compiled" if self.compiled else "pickle",
+            "features": None if self.feature_engineer is None else self.feature_engineer.describe(),
+            "cascade": None if self.cascade is None else self.cascade.metadata["report"],
+        }
+
+
+class ModelRegistry:
+    """
+    Process-wide holder of the active ModelVersion.
+
+    Artifacts are loaded once and re-checked at most every `check_interval`
+    seconds. A reload only happens when a file's mtime/size changed *and* its
+    content hash differs from the active version. A compiled model whose
+    manifest matches model.pkl/preprocessor.pkl is preferred: it is
+    memory-mapped, so it loads without unpickling or importing sklearn. Callers keep a reference to
+    the ModelVersion they were handed, so in-flight requests finish on the old
+    version while new requests pick up the new one. A cascade screen published
+    for the active version after it was activated is adopted on a later check.
+    """
+    def __init__(self, model_path, preprocessor_path, check_interval=2.0, compiled_model_path=None,
+                 candidates_path=None, cascade_path=None):
+        self.model_path = model_path
+        self.preprocessor_path = preprocessor_path
+        self.compiled_model_path = compiled_model_path
+        self.candidates_path = candidates_path
+        self.cascade_path = cascade_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._active = None
+        self._file_stats = None
+        self._last_check = 0.0
+
+    @property
+    def active_version(self):
+        """Version string of the model currently served, or None before the first load"""
+        active = self._active
+        return active.version if active is not None else None
+
+    def get(self):
+        """Return the active ModelVersion, reloading it if the artifacts changed"""
+        active = self._active
+        if active is None or time.monotonic() - self._last_check >= self.check_interval:
+            self.refresh()
+            active = self._active
+        return active
+
+    def refresh(self, force=False):
+        """Check the artifacts on disk and hot-swap the active version if they changed"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            paths = (self.model_path, self.preprocessor_path)
+            manifest_path = None
+            if self.compiled_model_path is not None:
+                manifest_path = MmapArtifactStore().manifest_path(self.compiled_model_path)
+                if os.path.exists(manifest_path):
+                    paths += (manifest_path,)
+                else:
+                    manifest_path = None
+            # Watched too, so a screen published after its model version was activated is adopted
+            cascade_manifest_path = None
+            if self.cascade_path is not None:
+                cascade_manifest_path = MmapArtifactStore().manifest_path(self.cascade_path)
+                if os.path.exists(cascade_manifest_path):
+                    paths += (cascade_manifest_path,)
+                else:
+                    cascade_manifest_path = None
+            try:
+                file_stats = tuple(self._stat(path) for path in paths)
+                if not force and self._active is not None and file_stats == self._file_stats:
+                    return self._active
+
+                compiled = self._load_compiled() if manifest_path else None
+                if compiled is not None:
+                    version = compiled.metadata["version"]
+                    model, preprocessor = compiled, None
+                else:
+                    # Read each file once so the hash always matches what gets unpickled
+                    payloads = []
+                    for path in paths[:2]:
+                        with open(path, 'rb') as file_obj:
+                            payloads.append(file_obj.read())
+                    version = artifact_version([hashlib.sha256(payload).hexdigest() for payload in payloads])
+
+                if (self._active is not None and self._active.version == version
+                        and self._active.compiled == (compiled is not None)):
+                    self._file_stats = file_stats
+                    if self._active.cascade is None and cascade_manifest_path is not None:
+                        # A refresh publishes the screen for a version after its model.pkl
+                        cascade = self._load_cascade(version)
+                        if cascade is not None:
+                            self._active = self._active.with_cascade(cascade)
+                            logging.info(f"Model registry added the cascade screen to version {version}")
+                    return self._active
+
+                if compiled is None:
+                    model = pickle.loads(payloads[0])
+                    preprocessor = pickle.loads(payloads[1])
+            except Exception as e:
+                if self._active is None:
+                    logging.error(f"Model registry failed to load artifacts: {str(e)}")
+                    raise CustomException(e, sys)
+                # Keep serving the current version, e.g. while a file is being rewritten
+                logging.warning(f"Model reload failed, keeping version {self._active.version}: {str(e)}")
+                return self._active
+
+            previous = self.active_version
+            self._active = ModelVersion(version, model, preprocessor, datetime.now(),
+                                        self.candidates_path, self.preprocessor_path, self._load_cascade(version))
+            self._file_stats = file_stats
+            logging.info(f"Model registry activated version {version} (previous: {previous})")
+            return self._active
+
+    def _load_compiled(self):
+        """Memory-map the compiled model, or return None if it was built from other pickles"""
+        compiled = CompiledPredictor.load(self.compiled_model_path)
+        sources = compiled.metadata.get("sources", {})
+        for name, path in (("model", self.model_path), ("preprocessor", self.preprocessor_path)):
+            source = sources.get(name)
+            if source is None:
+                return None
+            # Same size and mtime as at export time is taken as unchanged; otherwise compare content
+            stat = os.stat(path)
+            if (stat.st_size, stat.st_mtime_ns) == (source["size"], source["mtime_ns"]):
+                continue
+            if stat.st_size != source["size"] or file_sha256(path) != source["sha256"]:
+                logging.warning(f"Ignoring stale compiled model {self.compiled_model_path}; serving the pickled model")
+                return None
+        return compiled
+
+    def _load_cascade(self, version):
+        """Memory-map the cascade screen built for `version`; None if there is none (serve without it)"""
+        if self.cascade_path is None or not os.path.exists(MmapArtifactStore().manifest_path(self.cascade_path)):
+            return None
+        try:
+            screen = CompiledPredictor.load(self.cascade_path)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable cascade screen {self.cascade_path}: {str(e)}")
+            return None
+        if screen.metadata.get("model_version") != version:
+            logging.warning(f"Ignoring cascade screen built for model version {screen.metadata.get('model_version')}")
+            return None
+        return screen
+
+    @staticmethod
+    def _stat(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_model_registry(model_path=None, preprocessor_path=None):
+    """Return the process-wide registry for the given artifact paths"""
+    config = ModelRegistryConfig()
+    model_path = model_path or config.model_path
+    preprocessor_path = preprocessor_path or config.preprocessor_path
+    key = (os.path.abspath(model_path), os.path.abspath(preprocessor_path))
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            compiled_model_path = None
+            if config.use_compiled_model:
+                # The compiled model always sits next to the model it was built from
+                compiled_name = os.path.basename(config.compiled_model_path)
+                compiled_model_path = os.path.join(os.path.dirname(model_path), compiled_name)
+            # Candidates, like the compiled model, sit next to the model they were trained with
+            candidates_path = os.path.join(os.path.dirname(model_path), os.path.basename(config.candidates_path))
+            cascade_path = None
+            if config.use_cascade:
+                cascade_path = os.path.join(os.path.dirname(model_path), os.path.basename(config.cascade_path))
+            registry = ModelRegistry(model_path, preprocessor_path, config.check_interval, compiled_model_path,
+                                     candidates_path, cascade_path)
+            _registries[key] = registry
+        return registry
@@ -1,36 +1,225 @@
 import os
 import sys
-import pandas as pd
-from src.Predictive_Maintenance_RULPrediction.logger import logging
+import time
+import numpy as np
+from src.Predictive_Maintenance_RULPrediction.logger import logging, get_request_logger
 from src.Predictive_Maintenance_RULPrediction.exception import CustomException
-from src.Predictive_Maintenance_RULPrediction.utils import load_object
+from src.Predictive_Maintenance_RULPrediction.pipelines.model_registry import HistoryRequired, get_model_registry
+from src.Predictive_Maintenance_RULPrediction.pipelines.micro_batcher import MicroBatcherConfig, get_micro_batcher
+from src.Predictive_Maintenance_RULPrediction.pipelines.unit_state import get_streaming_predictor
+
+# Input columns in the order the preprocessor was fitted on
+FEATURE_COLUMNS = (
+    "unit", "time", "operational_setting_1", "operational_setting_2",
+    "sensor_2", "sensor_3", "sensor_4", "sensor_7", "sensor_8", "sensor_9",
+    "sensor_11", "sensor_12", "sensor_13", "sensor_14", "sensor_15",
+    "sensor_17", "sensor_20", "sensor_21",
+)
+_COLUMN_INDEX = {name: index for index, name in enumerate(FEATURE_COLUMNS)}
+
+# Per-request records are sampled; %-style arguments are only formatted for records that are kept
+request_logger = get_request_logger()
+
+def _is_frame(obj):
+    """True for a pandas DataFrame. pandas is slow to import and serving does not
+    need it, so it is never imported here; a caller holding a DataFrame already has."""
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(obj, pd.DataFrame)
+
+def validate_feature_order(preprocessor):
+    """
+    Raise if the preprocessor was fitted on a different column order than
+    FEATURE_COLUMNS. Engineered features, if any, follow these columns.
+    """
+    fitted = getattr(preprocessor, "feature_names_in_", None)
+    if fitted is not None and tuple(fitted[:len(FEATURE_COLUMNS)]) != FEATURE_COLUMNS:
+        raise ValueError(
+            f"Preprocessor was fitted on columns {list(fitted)}, expected {list(FEATURE_COLUMNS)}"
+        )
+
+def prepare_batch_features(rows):
+    """
+    Validate a batch of input rows and return them as a contiguous float64 matrix
+    in FEATURE_COLUMNS order. Accepts a DataFrame, a list of row mappings or a
+    list of row sequences already in column order.
+    """
+    if _is_frame(rows):
+        missing = [col for col in FEATURE_COLUMNS if col not in rows.columns]
+        if missing:
+            raise ValueError(f"Missing input columns: {', '.join(missing)}")
+        try:
+            features = CustomData.array_from_frame(rows)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Input columns must be numeric: {str(e)}")
+    elif rows and isinstance(rows[0], dict):
+        try:
+            features = CustomData.array_from_records(rows)
+        except KeyError as e:
+            raise ValueError(f"Missing input column {str(e)}")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Input values must be numeric: {str(e)}")
+    else:
+        try:
+            features = np.array(rows, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Each row must hold {len(FEATURE_COLUMNS)} numeric values: {str(e)}")
+
+    bad_rows = np.flatnonzero(~np.isfinite(features).all(axis=1))
+    if len(bad_rows):
+        raise ValueError(f"Missing or non-finite values in rows: {bad_rows[:10].tolist()}")
+
+    return features
 
 class PredictPipeline:
-    def __init__(self):
+    def __init__(self, micro_batching=None):
         # Separate paths for model and preprocessor
         self.model_path = os.path.join("artifacts", "model.pkl")
-        self.preprocessor_path = os.path.join("artifacts", "preprocessor.pkl")  
-        
-    def predict(self, features):
+        self.preprocessor_path = os.path.join("artifacts", "preprocessor.pkl")
+        # Shared by every PredictPipeline in the process, so artifacts load once
+        self.registry = get_model_registry(self.model_path, self.preprocessor_path)
+
+        # Optionally coalesce concurrent single-row requests into one model call
+        batcher_config = MicroBatcherConfig()
+        if micro_batching is None:
+            micro_batching = batcher_config.enabled
+        self.micro_batcher = get_micro_batcher(self.registry, batcher_config) if micro_batching else None
+        self._validated_version = None
+
+    @property
+    def model_version(self):
+        """Version of the model currently served by this process"""
+        return self.registry.get().version
+
+    def predict(self, features, model=None):
         """Make predictions on new data"""
+        preds, _ = self.predict_with_version(features, model)
+        return preds
+
+    def predict_with_version(self, features, model=None):
+        """
+        Make predictions and return them together with the model version used.
+        `model` optionally selects one of the trained candidates by name, or an
+        ensemble ("ensemble" or {name: weight}); by default the best model scores.
+        A model with trajectory features needs every cycle of each unit from 1
+        onwards, else HistoryRequired is raised (see ModelVersion.check_history).
+        """
         try:
-            logging.info("Loading model and preprocessor")
-            model = load_object(self.model_path)
-            preprocessor = load_object(self.preprocessor_path)
-            
-            # scale the features
-            data_scaled = preprocessor.transform(features)
+            features = self._as_array(features)
+            model_version = self._get_model_version()
+            model_version.check_history(features)
+            if self.micro_batcher is not None and model is None:
+                return self.micro_batcher.predict(features)
             
-            logging.info("Making predictions")
-            preds = model.predict(data_scaled)
+            request_logger.info("Scoring %d rows with model version %s", len(features), model_version.version)
+            preds = model_version.predict(features, model=model)
             
-            return preds
+            return preds, model_version.version
             
+        except HistoryRequired:
+            raise
         except Exception as e:
             logging.error(f"Prediction failed: {str(e)}")
             raise CustomException(e, sys)
 
+    def predict_stream(self, features, groups=None):
+        """
+        Score the newest cycle of each row's unit using the history kept for it
+        (see StreamingPredictor). `groups` optionally names the fleet of each
+        row, so unit numbers only need to be unique within a fleet.
+        Returns (predictions, model_version).
+        """
+        features = self._as_array(features)
+        self._get_model_version()
+        groups = [""] * len(features) if groups is None else [str(group) for group in groups]
+        keys = [(group, float(unit)) for group, unit in zip(groups, features[:, _COLUMN_INDEX["unit"]])]
+        return get_streaming_predictor(self.registry).predict(keys, features)
+
+    def predict_batch(self, features, chunk_size=None, model=None):
+        """
+        Score a validated batch (see prepare_batch_features) in vectorized chunks,
+        with the best model or the candidates `model` selects (see predict_with_version).
+
+        Returns (model_version, generator of (start_row, predictions)). The model
+        version is pinned once up front so a hot-swap mid-stream cannot mix
+        versions within one response. An invalid `model` raises ValueError here,
+        before any chunk is scored, as does a batch without the unit histories a
+        model with trajectory features needs (HistoryRequired).
+        """
+        model_version = self._get_model_version()
+        model_version.check_history(features)
+        if model is not None:
+            model_version.candidates().weights(model)
+        return model_version.version, self._iter_batch(model_version, features, chunk_size, model)
+
+    def resolve_model(self, model):
+        """
+        Normalized {candidate name: weight} for a model selection, loading the
+        candidates if needed. Raises ValueError if the selection is invalid.
+        """
+        return self._get_model_version().candidates().weights(model)
+
+    def candidates(self):
+        """Description of the trained candidates available for model selection"""
+        return self._get_model_version().candidates().describe()
+
+    def warm_up(self, n_rows=1000):
+        """
+        Score synthetic rows once, singly and as a batch, so the model is loaded,
+        its memory-mapped pages are resident and every lazily imported module on
+        the scoring path is in place before the first real request.
+        Returns the model version that was warmed up.
+        """
+        start = time.perf_counter()
+        model_version = self._get_model_version()
+        if model_version.compiled:
+            model_version.model.touch()
+        features = np.zeros((max(n_rows, 1), len(FEATURE_COLUMNS)))
+        features[:, _COLUMN_INDEX["unit"]] = 1.0
+        features[:, _COLUMN_INDEX["time"]] = np.arange(1, len(features) + 1)
+        self.predict_with_version(features[:1])
+        for _ in self.predict_batch(features)[1]:
+            pass
+        logging.info(f"Warmed up model version {model_version.version} in {time.perf_counter() - start:.3f}s")
+        return model_version.version
+
+    def _iter_batch(self, model_version, features, chunk_size, model=None):
+        n_rows = len(features)
+        chunk_size = chunk_size or n_rows or 1
+        request_logger.info("Scoring batch of %d rows with model version %s", n_rows, model_version.version)
+        try:
+            # Trajectory features see the whole batch, so a unit is never cut at a chunk boundary
+            features = model_version.prepare(features)
+            for start in range(0, n_rows, chunk_size):
+                yield start, model_version.predict_prepared(features[start:start + chunk_size], model)
+        except Exception as e:
+            logging.error(f"Batch prediction failed: {str(e)}")
+            raise CustomException(e, sys)
+
+    def _get_model_version(self):
+        model_version = self.registry.get()
+        if model_version.version != self._validated_version:
+            validate_feature_order(model_version)
+            self._validated_version = model_version.version
+        return model_version
+
+    @staticmethod
+    def _as_array(features):
+        if _is_frame(features):
+            return CustomData.array_from_frame(features)
+        if isinstance(features, CustomData):
+            return features.to_array()
+        return np.asarray(features, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+
 class CustomData:
+    """
+    One engine cycle of input features, held as a single float64 row in
+    FEATURE_COLUMNS order. Fields are readable as attributes (data.unit,
+    data.sensor_2, ...).
+    """
+    __slots__ = ("_values",)
+
+    columns = FEATURE_COLUMNS
+
     def __init__(self,
                  unit: float,
                  time: float,
@@ -51,61 +240,63 @@ class CustomData:
                  sensor_20: float,
                  sensor_21: float):
         
-        self.unit = unit
-        self.time = time
-        self.operational_setting_1 = operational_setting_1
-        self.operational_setting_2 = operational_setting_2
-        self.sensor_2 = sensor_2
-        self.sensor_3 = sensor_3
-        self.sensor_4 = sensor_4
-        self.sensor_7 = sensor_7
-        self.sensor_8 = sensor_8
-        self.sensor_9 = sensor_9
-        self.sensor_11 = sensor_11
-        self.sensor_12 = sensor_12
-        self.sensor_13 = sensor_13
-        self.sensor_14 = sensor_14
-        self.sensor_15 = sensor_15
-        self.sensor_17 = sensor_17
-        self.sensor_20 = sensor_20
-        self.sensor_21 = sensor_21
-    
+        self._values = np.array([
+            unit, time, operational_setting_1, operational_setting_2,
+            sensor_2, sensor_3, sensor_4, sensor_7, sensor_8, sensor_9,
+            sensor_11, sensor_12, sensor_13, sensor_14, sensor_15,
+            sensor_17, sensor_20, sensor_21,
+        ], dtype=np.float64)
+
+    def __getattr__(self, name):
+        # Only reached for names not found normally; _values is unset before __init__ (copy, unpickling)
+        if name == "_values":
+            raise AttributeError(name)
+        try:
+            return float(self._values[_COLUMN_INDEX[name]])
+        except KeyError:
+            raise AttributeError(f"'CustomData' object has no attribute '{name}'")
+
+    def __reduce__(self):
+        # Slots and no __dict__: rebuild from the values, in constructor argument order
+        return type(self), tuple(self._values.tolist())
+
+    def to_array(self):
+        """Return the record as a (1, n_features) float64 matrix ready for the preprocessor"""
+        return self._values.reshape(1, -1)
+
     def get_data_as_dataframe(self):
         """Convert input data to DataFrame with correct column structure"""
+        import pandas as pd
         try:
-            custom_data_dict = {
-                "unit": [self.unit],
-                "time": [self.time],
-                "operational_setting_1": [self.operational_setting_1],
-                "operational_setting_2": [self.operational_setting_2],
-                "sensor_2": [self.sensor_2],
-                "sensor_3": [self.sensor_3],
-                "sensor_4": [self.sensor_4],
-                "sensor_7": [self.sensor_7],
-                "sensor_8": [self.sensor_8],
-                "sensor_9": [self.sensor_9],
-                "sensor_11": [self.sensor_11],
-                "sensor_12": [self.sensor_12],
-                "sensor_13": [self.sensor_13],
-                "sensor_14": [self.sensor_14],
-                "sensor_15": [self.sensor_15],
-                "sensor_17": [self.sensor_17],
-                "sensor_20": [self.sensor_20],
-                "sensor_21": [self.sensor_21]
-            }
-            
-            print("\n" + "="*50)
-            print("Prediction Pipeline Completed Successfully!")
-            print("="*50 + "\n")
-            logging.info("Prediction pipeline completed successfully")
-            
-            return pd.DataFrame(custom_data_dict)
-        
+            return pd.DataFrame(self.to_array(), columns=list(FEATURE_COLUMNS))
             
         except Exception as e:
             logging.error(f"Data conversion failed: {str(e)}")
             raise CustomException(e, sys)
 
+    @staticmethod
+    def array_from_records(records):
+        """Build one contiguous float64 matrix from a list of row mappings keyed by column name"""
+        n_rows = len(records)
+        values = np.fromiter(
+            (record[column] for record in records for column in FEATURE_COLUMNS),
+            dtype=np.float64,
+            count=n_rows * len(FEATURE_COLUMNS),
+        )
+        return values.reshape(n_rows, len(FEATURE_COLUMNS))
+
+    @staticmethod
+    def array_from_frame(df):
+        """Select FEATURE_COLUMNS from a DataFrame as one contiguous float64 matrix"""
+        return np.ascontiguousarray(df[list(FEATURE_COLUMNS)].to_numpy(dtype=np.float64))
+
+    @staticmethod
+    def stack(records):
+        """Stack many CustomData records into one contiguous float64 matrix"""
+        if not records:
+            return np.empty((0, len(FEATURE_COLUMNS)), dtype=np.float64)
+        return np.concatenate([record._values for record in records]).reshape(len(records), -1)
+
 if __name__ == "__main__":
     try:
         # Sample input data
@@ -130,8 +321,8 @@ if __name__ == "__main__":
             sensor_21=23.4190
         )
         
-        # Convert to DataFrame
-        features = input_data.get_data_as_dataframe()
+        # Convert to a feature matrix in model column order
+        features = input_data.to_array()
         
         # Make prediction
         pipeline = PredictPipeline()
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import time
+import argparse
+from src.Predictive_Maintenance_RULPrediction.components.data_ingestion import DataIngestion
+from src.Predictive_Maintenance_RULPrediction.components.model_refresher import ModelRefresher
+from src.Predictive_Maintenance_RULPrediction.pipelines.training_pipeline import TrainingPipeline
+from src.Predictive_Maintenance_RULPrediction.artifact_store import ColumnarArtifactStore, file_sha256
+from src.Predictive_Maintenance_RULPrediction.metrics import MetricsConfig, get_metrics
+from src.Predictive_Maintenance_RULPrediction.logger import logging
+from src.Predictive_Maintenance_RULPrediction.exception import CustomException
+
+
+class RefreshPipeline:
+    """
+    Brings the served model up to date with the new-unit files in
+    RUL_NEW_UNITS_DIR: incrementally when it can (ModelRefresher), with a
+    full TrainingPipeline rebuild every RUL_REFRESH_FULL_EVERY refreshes or
+    whenever the refresher reports that it cannot. The full rebuild ingests
+    the new-unit files along with the raw data.
+    """
+    def __init__(self):
+        self.data_ingestion = DataIngestion()
+        self.model_refresher = ModelRefresher()
+        self.store = ColumnarArtifactStore()
+
+    def pending_files(self):
+        """{subset: [paths]} of new-unit files in neither the ingested train table nor an earlier refresh"""
+        input_paths = self.data_ingestion.discover_input_paths()
+        ingested = self.store.read_metadata(self.data_ingestion.ingestion_config.train_data_path).get("inputs", {})
+        applied = self.model_refresher.load_state()["applied"]
+        pending = {}
+        for subset, paths in self.data_ingestion.discover_new_unit_files(input_paths).items():
+            for path in paths:
+                name, sha256 = os.path.basename(path), file_sha256(path)
+                if ingested.get(f"{subset}/{name}") != sha256 and applied.get(name) != sha256:
+                    pending.setdefault(subset, []).append(path)
+        return pending
+
+    def run_full(self, reason, force=False):
+        """Full rebuild through the stage cache; returns its wall time"""
+        print(f"\nRunning full rebuild ({reason})...")
+        start = time.perf_counter()
+        report = TrainingPipeline().run_pipeline(force=force)
+        elapsed = time.perf_counter() - start
+        # What rebuilding every stage costs, counting the time cache hits saved
+        full_rebuild_s = sum(row["saved_s"] if row["status"] == "hit" else row["time_s"] for row in report)
+        self.model_refresher.reset(full_rebuild_s)
+        return elapsed
+
+    def run_pipeline(self, full=False):
+        """Refresh the model; returns a report with the mode used and how long it took"""
+        try:
+            logging.info("Starting refresh pipeline")
+            print("\n" + "="*50)
+            print("Starting Predictive Maintenance Model Refresh")
+            print("="*50 + "\n")
+            config = self.model_refresher.model_refresher_config
+            state = self.model_refresher.load_state()
+
+            pending = {} if full else self.pending_files()
+            if full:
+                report = {"mode": "full", "reason": "requested"}
+                report["time_s"] = self.run_full("requested", force=True)
+            elif not pending:
+                print("No new units to add")
+                return {"mode": "none", "time_s": 0.0}
+            elif state["refreshes"] >= config.full_rebuild_every:
+                reason = f"{state['refreshes']} incremental refreshes since the last full rebuild"
+                report = {"mode": "full", "reason": reason, "time_s": self.run_full(reason)}
+            else:
+                names = [os.path.basename(path) for paths in pending.values() for path in paths]
+                print(f"{len(names)} new-unit files: {', '.join(names)}")
+                refresh = self.model_refresher.initiate_model_refresh(pending)
+                if refresh["status"] == "published":
+                    report = dict(refresh, mode="incremental", time_s=refresh["timings_s"]["total"])
+                else:
+                    report = {"mode": "full", "reason": refresh["reason"], "time_s": self.run_full(refresh["reason"])}
+
+            # Incremental time against the last measured full rebuild
+            full_rebuild_s = self.model_refresher.load_state().get("full_rebuild_s")
+            report["full_rebuild_s"] = full_rebuild_s
+            if report["mode"] == "incremental" and full_rebuild_s:
+                report["speedup"] = round(full_rebuild_s / report["time_s"], 2)
+                print(f"\nIncremental refresh took {report['time_s']:.2f}s vs {full_rebuild_s:.2f}s "
+                      f"for the last full rebuild ({report['speedup']}x faster)")
+            else:
+                print(f"\n{report['mode'].capitalize()} refresh took {report['time_s']:.2f}s")
+
+            metrics = get_metrics()
+            metrics.gauge("rul_refresh_seconds", "Wall time of the last model refresh", ("mode",)).set(
+                report["time_s"], mode=report["mode"])
+            if "scaler_drift" in report:
+                metrics.gauge("rul_refresh_scaler_drift",
+                              "Largest median/IQR shift of a feature since the scaler was fitted, in IQRs").set(
+                    report["scaler_drift"])
+            if metrics.enabled:
+                metrics.write(MetricsConfig().refresh_metrics_path)
+
+            logging.info(f"Refresh pipeline report: {json.dumps(report, default=str)}")
+            print("\n" + "="*50)
+            print("Model Refresh Completed Successfully!")
+            print("="*50 + "\n")
+            return report
+
+        except Exception as e:
+            error_msg = f"Refresh pipeline failed: {str(e)}"
+            logging.error(error_msg)
+            print(f"\n!!! ERROR: {error_msg}")
+            raise CustomException(error_msg, sys)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add newly completed units to the RUL model")
+    parser.add_argument("--full", action="store_true", help="rebuild everything instead of refreshing incrementally")
+    args = parser.parse_args()
+    try:
+        RefreshPipeline().run_pipeline(full=args.full)
+    except Exception as e:
+        print(f"\nRefresh failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,130 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from src.Predictive_Maintenance_RULPrediction.logger import logging
+
+
+class ServingConfig:
+    def __init__(self):
+        # Threads running model calls in each worker process
+        self.scoring_threads = int(os.environ.get("RUL_SCORING_THREADS", "4"))
+        # Requests allowed to wait for a scoring thread before new ones get a 503
+        self.queue_size = int(os.environ.get("RUL_SCORING_QUEUE_SIZE", "64"))
+        # Longest time a request waits for its result
+        self.timeout_s = float(os.environ.get("RUL_SCORING_TIMEOUT_S", "30"))
+        # Seconds to wait for in-flight requests when shutting down
+        self.drain_timeout_s = float(os.environ.get("RUL_DRAIN_TIMEOUT_S", "30"))
+        # Score synthetic rows before /readyz reports ready, and how many (0 disables)
+        self.warmup_rows = int(os.environ.get("RUL_WARMUP_ROWS", "1000"))
+
+
+class ServerBusy(Exception):
+    """Raised when the scoring queue is full; the app answers 503 so callers retry elsewhere"""
+
+
+class ScoringTimeout(ServerBusy):
+    """Raised when a result is not ready within timeout_s; answered like ServerBusy"""
+
+
+class ScoringPool:
+    """
+    Bounded pool the request threads hand CPU-bound scoring to.
+
+    At most `scoring_threads` model calls run at once and at most `queue_size`
+    more wait for a thread; beyond that `run` raises ServerBusy immediately
+    instead of queueing without limit. A call holds its slot until it finishes,
+    even if its request gave up waiting, so the bound and `drain` count work
+    that is still running. `drain` stops admitting work and waits for what is
+    already admitted. The executor is created lazily per process,
+    since threads started before a pre-fork do not exist in the workers.
+    """
+    def __init__(self, config=None):
+        self.config = config or ServingConfig()
+        self._slots = threading.BoundedSemaphore(self.config.scoring_threads + self.config.queue_size)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._executor = None
+        self._pid = None
+        self._in_flight = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self.draining = False
+
+    def _get_executor(self):
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(self.config.scoring_threads, thread_name_prefix="rul-scoring")
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args, block=False):
+        """
+        Run fn(*args) on a scoring thread and return its result. Raises ServerBusy
+        when saturated or draining; `block` waits for a slot instead (used once a
+        streamed response has already started).
+        """
+        if self.draining:
+            raise ServerBusy("Server is shutting down")
+        if not self._slots.acquire(blocking=block, timeout=self.config.timeout_s if block else None):
+            with self._lock:
+                self._rejected += 1
+            raise ServerBusy("Scoring queue is full")
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.config.timeout_s)
+        except FutureTimeoutError:
+            with self._lock:
+                self._timed_out += 1
+            raise ScoringTimeout(f"Scoring did not finish within {self.config.timeout_s:g}s")
+
+    def _release(self, future=None):
+        """Free the slot of a finished (or never submitted) call"""
+        self._slots.release()
+        with self._lock:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._idle.notify_all()
+
+    def drain(self, timeout=None):
+        """Stop admitting requests and wait until the admitted ones have finished; True if they did"""
+        self.draining = True
+        timeout = self.config.drain_timeout_s if timeout is None else timeout
+        with self._lock:
+            logging.info(f"Draining {self._in_flight} in-flight scoring requests")
+            finished = self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+        if not finished:
+            logging.warning(f"Drain timed out after {timeout:.0f}s with {self._in_flight} requests in flight")
+        return finished
+
+    def stats(self):
+        with self._lock:
+            return {
+                "scoring_threads": self.config.scoring_threads,
+                "queue_size": self.config.queue_size,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "draining": self.draining,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_scoring_pool():
+    """Return the process-wide scoring pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ScoringPool()
+        return _pool
@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import inspect
+from src.Predictive_Maintenance_RULPrediction.logger import logging
+from src.Predictive_Maintenance_RULPrediction.exception import CustomException
+from src.Predictive_Maintenance_RULPrediction.artifact_store import path_fingerprint, file_sha256
+from src.Predictive_Maintenance_RULPrediction.streaming_stats import peak_rss_mb
+from src.Predictive_Maintenance_RULPrediction.metrics import get_metrics
+
+
+class StageCacheConfig:
+    def __init__(self):
+        self.cache_dir = os.path.join(os.getcwd(), 'artifacts', 'cache')
+        # Least recently used entries are evicted once the cache grows past this size
+        self.max_size_mb = float(os.environ.get("RUL_STAGE_CACHE_MAX_MB", "2048"))
+
+
+class Stage:
+    """
+    One cacheable pipeline step: the files it reads, the settings that shape
+    its result, the files it writes and the callable that produces them.
+    `rows`, if given, returns the number of rows the stage processed.
+    """
+    def __init__(self, name, inputs, config, outputs, run, rows=None):
+        self.name = name
+        self.inputs = inputs
+        self.config = config
+        self.outputs = outputs
+        self.run = run
+        self.rows = rows
+
+    def cache_key(self):
+        """Hash of the stage name, the content of every input and the config"""
+        payload = {
+            "stage": self.name,
+            "inputs": {name: path_fingerprint(path) for name, path in sorted(self.inputs.items())},
+            "config": self.config,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+
+def code_fingerprint(component):
+    """Hash of the source file defining a component's class, so code edits invalidate its stage"""
+    return file_sha256(inspect.getsourcefile(type(component)))
+
+
+def _link_or_copy(src, dst):
+    # Artifacts are always replaced by rename, never edited in place, so hard links are safe
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _copy_path(src, dst):
+    """Replace dst with a linked copy of src; a None src just removes dst"""
+    if os.path.isdir(dst):
+        shutil.rmtree(dst)
+    elif os.path.exists(dst):
+        os.remove(dst)
+    if src is None:
+        return
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, copy_function=_link_or_copy)
+    else:
+        _link_or_copy(src, dst)
+
+
+def _path_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+class StageCache:
+    """
+    Content-addressed store of stage outputs under artifacts/cache/<stage>-<key>/.
+
+    Each entry holds the stage's output files plus entry.json with the time the
+    stage took to run, so a hit can report how much time it saved.
+    """
+    entry_file = "entry.json"
+
+    def __init__(self, config=None):
+        self.config = config or StageCacheConfig()
+
+    def _entry_dir(self, stage, key):
+        return os.path.join(self.config.cache_dir, f"{stage.name}-{key[:16]}")
+
+    def lookup(self, stage, key):
+        """Entry metadata for a complete cached result, or None"""
+        entry_path = os.path.join(self._entry_dir(stage, key), self.entry_file)
+        if not os.path.exists(entry_path):
+            return None
+        with open(entry_path) as file_obj:
+            entry = json.load(file_obj)
+        if entry.get("key") != key:
+            return None
+        return entry
+
+    def restore(self, stage, key, entry):
+        """Put a cached stage's outputs back at their artifact paths"""
+        entry_dir = self._entry_dir(stage, key)
+        for name, path in stage.outputs.items():
+            cached = os.path.join(entry_dir, name)
+            if name not in entry["outputs"]:
+                # The cached run did not produce it; don't leave a stale one from another run
+                _copy_path(None, path)
+                continue
+            # Skip outputs that are already the cached file (same inode)
+            if os.path.exists(path) and not os.path.isdir(path) and os.path.samefile(cached, path):
+                continue
+            _copy_path(cached, path)
+        # Mark as recently used for LRU eviction
+        os.utime(os.path.join(entry_dir, self.entry_file))
+
+    def store(self, stage, key, duration_s):
+        """Record the outputs a stage just produced under its cache key"""
+        entry_dir = self._entry_dir(stage, key)
+        staging_dir = f"{entry_dir}.staging"
+        if os.path.exists(staging_dir):
+            shutil.rmtree(staging_dir)
+        os.makedirs(staging_dir)
+        # A stage may legitimately skip an output (e.g. no compiled model for an SVR)
+        produced = [name for name, path in stage.outputs.items() if os.path.exists(path)]
+        for name in produced:
+            _copy_path(stage.outputs[name], os.path.join(staging_dir, name))
+        entry = {
+            "key": key,
+            "stage": stage.name,
+            "outputs": produced,
+            "duration_s": duration_s,
+            "size_bytes": _path_size(staging_dir),
+        }
+        with open(os.path.join(staging_dir, self.entry_file), 'w') as file_obj:
+            json.dump(entry, file_obj, indent=2)
+        if os.path.exists(entry_dir):
+            shutil.rmtree(entry_dir)
+        os.rename(staging_dir, entry_dir)
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_size_mb"""
+        if not os.path.isdir(self.config.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.config.cache_dir):
+            entry_path = os.path.join(self.config.cache_dir, name, self.entry_file)
+            if os.path.exists(entry_path):
+                with open(entry_path) as file_obj:
+                    size = json.load(file_obj)["size_bytes"]
+                entries.append((os.path.getmtime(entry_path), size, os.path.join(self.config.cache_dir, name)))
+
+        limit = self.config.max_size_mb * 1024 * 1024
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total <= limit:
+                break
+            shutil.rmtree(entry_dir)
+            total -= size
+            logging.info(f"Evicted stage cache entry {entry_dir}")
+
+
+def run_stages(stages, cache, force=False, from_stage=None):
+    """
+    Run `stages` in order, reusing cached outputs where a stage's key is unchanged.
+
+    Keys are computed just before each stage runs, from the current content of
+    its inputs, so a changed stage invalidates everything downstream of it.
+    `force` reruns every stage; `from_stage` reruns that stage and the ones
+    after it. Returns one report row per stage, with its wall time, rows/sec
+    and the peak RSS so far (this process or any finished child).
+    """
+    metrics = get_metrics()
+    stage_seconds = metrics.gauge("rul_training_stage_seconds", "Wall time of the last run of each stage",
+                                  ("stage", "status"))
+    stage_rows_per_s = metrics.gauge("rul_training_stage_rows_per_second", "Rows processed per second by each stage",
+                                     ("stage",))
+    stage_peak_rss = metrics.gauge("rul_training_peak_rss_megabytes", "Peak RSS after each stage", ("stage",))
+    try:
+        names = [stage.name for stage in stages]
+        if from_stage is not None and from_stage not in names:
+            raise ValueError(f"Unknown stage '{from_stage}', expected one of {names}")
+
+        report = []
+        forced = force
+        for stage in stages:
+            forced = forced or stage.name == from_stage
+            key = stage.cache_key()
+            entry = None if forced else cache.lookup(stage, key)
+
+            start = time.perf_counter()
+            if entry is not None:
+                cache.restore(stage, key, entry)
+                status, saved = "hit", entry["duration_s"]
+            else:
+                stage.run()
+                status, saved = "forced" if forced else "miss", 0.0
+            elapsed = time.perf_counter() - start
+            if entry is None:
+                cache.store(stage, key, elapsed)
+
+            rows = stage.rows() if stage.rows is not None else None
+            # A cache hit processes nothing, so it has no throughput
+            rows_per_s = rows / elapsed if rows and entry is None and elapsed > 0 else None
+            peak_mb = peak_rss_mb(include_children=True)
+            report.append({
+                "stage": stage.name, "status": status, "time_s": elapsed, "saved_s": saved,
+                "rows": rows, "rows_per_s": rows_per_s, "peak_rss_mb": peak_mb,
+            })
+            stage_seconds.set(elapsed, stage=stage.name, status=status)
+            if rows_per_s is not None:
+                stage_rows_per_s.set(rows_per_s, stage=stage.name)
+            stage_peak_rss.set(peak_mb, stage=stage.name)
+            logging.info(f"Stage {stage.name}: {status} in {elapsed:.2f}s (saved {saved:.2f}s), peak RSS {peak_mb:.0f} MB")
+        return report
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -1,66 +1,208 @@
 import os
 import sys
-import numpy as np
-import pandas as pd
+import argparse
 from src.Predictive_Maintenance_RULPrediction.components.data_ingestion import DataIngestion
 from src.Predictive_Maintenance_RULPrediction.components.data_transformation import DataTransformation
 from src.Predictive_Maintenance_RULPrediction.components.model_trainer import ModelTrainer
+from src.Predictive_Maintenance_RULPrediction.components.model_exporter import ModelExporter
+from src.Predictive_Maintenance_RULPrediction.pipelines.stage_cache import Stage, StageCache, run_stages, code_fingerprint
+from src.Predictive_Maintenance_RULPrediction.artifact_store import ColumnarArtifactStore
+from src.Predictive_Maintenance_RULPrediction.metrics import MetricsConfig, get_metrics
 from src.Predictive_Maintenance_RULPrediction.logger import logging
 from src.Predictive_Maintenance_RULPrediction.exception import CustomException
 
+STAGE_NAMES = ("ingestion", "transformation", "training", "export")
+
+
+def _table_rows(*paths):
+    """Callable counting the rows of columnar tables, for per-stage throughput"""
+    store = ColumnarArtifactStore()
+    return lambda: sum(store.read_manifest(path)["n_rows"] for path in paths)
+
+
 class TrainingPipeline:
     def __init__(self):
         self.data_ingestion = DataIngestion()
         self.data_transformation = DataTransformation()
         self.model_trainer = ModelTrainer()
-        
-    def run_pipeline(self):
-        """Execute the complete training pipeline"""
+        self.model_exporter = ModelExporter()
+        self.stage_cache = StageCache()
+        # Arrays handed from transformation to training when both run in this process
+        self._train_arr = None
+        self._test_arr = None
+
+    def _build_stages(self):
+        """Declare each stage's inputs, config and outputs for the stage cache"""
+        ingestion_config = self.data_ingestion.ingestion_config
+        transformation_config = self.data_transformation.data_transformation_config
+        trainer_config = self.model_trainer.model_trainer_config
+        scheduler_config = self.model_trainer.scheduler.config
+        ingested = {
+            "train": ingestion_config.train_data_path,
+            "test": ingestion_config.test_data_path,
+            "rul": ingestion_config.rul_data_path,
+        }
+        transformed = {
+            "transformed_train": transformation_config.transformed_train_path,
+            "transformed_test": transformation_config.transformed_test_path,
+        }
+        models, params = self.model_trainer.get_model_candidates()
+
+        return [
+            Stage(
+                "ingestion",
+                inputs=self.data_ingestion.flat_input_paths(),
+                config={"code": code_fingerprint(self.data_ingestion)},
+                outputs=ingested,
+                run=self._run_ingestion,
+                rows=_table_rows(ingested["train"], ingested["test"]),
+            ),
+            Stage(
+                "transformation",
+                inputs=ingested,
+                config={
+                    "code": code_fingerprint(self.data_transformation),
+                    "columns_to_drop": transformation_config.columns_to_drop,
+                    "rul_cap": transformation_config.rul_cap,
+                    "streaming": transformation_config.streaming,
+                    "sketch_size": transformation_config.sketch_size if transformation_config.streaming else None,
+                    "feature_engineering": vars(transformation_config.feature_engineering),
+                    "regime_columns": transformation_config.regime_columns,
+                    "max_regimes": transformation_config.max_regimes,
+                    "regime_tolerance": transformation_config.regime_tolerance,
+                },
+                outputs=dict(
+                    transformed,
+                    preprocessor=transformation_config.preprocessor_obj_file_path,
+                    scaler_sketch=transformation_config.scaler_sketch_path,
+                ),
+                run=self._run_transformation,
+                rows=_table_rows(*transformed.values()),
+            ),
+            Stage(
+                "training",
+                # The preprocessor is folded into the compiled cascade screen; the
+                # ingested train table's units group the CV folds
+                inputs=dict(transformed, preprocessor=transformation_config.preprocessor_obj_file_path,
+                            groups=ingested["train"]),
+                config={
+                    "code": code_fingerprint(self.model_trainer),
+                    "models": {name: model.get_params() for name, model in models.items()},
+                    "params": params,
+                    "cv": scheduler_config.cv,
+                    "successive_halving": scheduler_config.successive_halving,
+                    "halving_factor": scheduler_config.halving_factor,
+                    "min_resource_fraction": scheduler_config.min_resource_fraction,
+                    "latency_budget_ms": scheduler_config.latency_budget_ms,
+                    "random_state": scheduler_config.random_state,
+                    "cascade_max_depth": trainer_config.cascade_max_depth,
+                    "cascade_max_rmse_increase": trainer_config.cascade_max_rmse_increase,
+                },
+                outputs={
+                    "model": trainer_config.trained_model_file_path,
+                    "candidates": trainer_config.candidates_dir,
+                    "cascade": trainer_config.cascade_dir,
+                },
+                run=self._run_training,
+                rows=_table_rows(transformed["transformed_train"]),
+            ),
+            Stage(
+                "export",
+                inputs=dict(
+                    transformed,
+                    model=trainer_config.trained_model_file_path,
+                    preprocessor=transformation_config.preprocessor_obj_file_path,
+                ),
+                config={
+                    "code": code_fingerprint(self.model_exporter),
+                    "tolerance": self.model_exporter.model_exporter_config.tolerance,
+                },
+                outputs={"model_compiled": self.model_exporter.model_exporter_config.compiled_model_dir},
+                run=self._run_export,
+                rows=_table_rows(transformed["transformed_test"]),
+            ),
+        ]
+
+    def _run_ingestion(self):
+        print("\n[1/4] Running Data Ingestion...")
+        train_path, test_path, rul_path = self.data_ingestion.initiate_data_ingestion(reuse=False)
+        print("✓ Data Ingestion Completed")
+        print(f"Train data: {train_path}")
+        print(f"Test data: {test_path}")
+        print(f"RUL data: {rul_path}")
+
+    def _run_transformation(self):
+        print("\n[2/4] Running Data Transformation...")
+        ingestion_config = self.data_ingestion.ingestion_config
+        train_arr, test_arr, preprocessor_path = self.data_transformation.initiate_data_transformation(
+            ingestion_config.train_data_path, ingestion_config.test_data_path, ingestion_config.rul_data_path,
+            reuse=False,
+        )
+        # Streaming mode leaves the arrays on disk only
+        self._train_arr, self._test_arr = train_arr, test_arr
+        print("✓ Data Transformation Completed")
+        if train_arr is not None:
+            print(f"Train array shape: {train_arr.shape}")
+            print(f"Test array shape: {test_arr.shape}")
+        print(f"Preprocessor path: {preprocessor_path}")
+
+    def _run_training(self):
+        print("\n[3/4] Running Model Training...")
+        transformation_config = self.data_transformation.data_transformation_config
+        # Arrays from a transformation run in this process are handed on in memory
+        model_path = self.model_trainer.initiate_model_training(
+            transformation_config.transformed_train_path, transformation_config.transformed_test_path,
+            train_array=self._train_arr, test_array=self._test_arr
+        )
+        print("✓ Model Training Completed")
+        print(f"Model saved at: {model_path}")
+
+    def _run_export(self):
+        # Compiled NumPy-only predictor for serving
+        print("\n[4/4] Running Model Export...")
+        transformation_config = self.data_transformation.data_transformation_config
+        compiled_model_path = self.model_exporter.initiate_model_export(
+            self.model_trainer.model_trainer_config.trained_model_file_path,
+            transformation_config.preprocessor_obj_file_path,
+            transformation_config.transformed_test_path,
+            transformation_config.transformed_train_path,
+        )
+        print("✓ Model Export Completed")
+        print(f"Compiled model: {compiled_model_path or 'not supported for this model'}")
+
+    def run_pipeline(self, force=False, from_stage=None):
+        """
+        Execute the complete training pipeline. Stages whose inputs and config
+        are unchanged are restored from the stage cache instead of re-run;
+        `force` reruns everything and `from_stage` reruns that stage onwards.
+        """
         try:
             logging.info("Starting training pipeline")
             print("\n" + "="*50)
             print("Starting Predictive Maintenance Training Pipeline")
             print("="*50 + "\n")
-            
-            # 1. Data Ingestion
-            print("\n[1/3] Running Data Ingestion...")
-            train_path, test_path, rul_path = self.data_ingestion.initiate_data_ingestion()
-            print("✓ Data Ingestion Completed")
-            print(f"Train data: {train_path}")
-            print(f"Test data: {test_path}")
-            print(f"RUL data: {rul_path}")
-            
-            # 2. Data Transformation
-            print("\n[2/3] Running Data Transformation...")
-            train_arr, test_arr, preprocessor_path = self.data_transformation.initiate_data_transformation(
-                train_path, test_path, rul_path
-            )
-            print("✓ Data Transformation Completed")
-            print(f"Train array shape: {train_arr.shape}")
-            print(f"Test array shape: {test_arr.shape}")
-            print(f"Preprocessor path: {preprocessor_path}")
-            
-            # Save transformed arrays as CSV files for ModelTrainer
-            train_arr_path = os.path.join("artifacts", "transformed_train.csv")
-            test_arr_path = os.path.join("artifacts", "transformed_test.csv")
-            
-            # Save with header for better readability
-            pd.DataFrame(train_arr).to_csv(train_arr_path, index=False, header=False)
-            pd.DataFrame(test_arr).to_csv(test_arr_path, index=False, header=False)
-            print(f"Saved transformed train data to: {train_arr_path}")
-            print(f"Saved transformed test data to: {test_arr_path}")
-            
-            # 3. Model Training (using file paths)
-            print("\n[3/3] Running Model Training...")
-            model_path = self.model_trainer.initiate_model_training(train_arr_path, test_arr_path)
-            print("✓ Model Training Completed")
-            print(f"Model saved at: {model_path}")
-            
+
+            report = run_stages(self._build_stages(), self.stage_cache, force=force, from_stage=from_stage)
+
+            print("\nStage report:")
+            for row in report:
+                throughput = f", {row['rows_per_s']:,.0f} rows/s" if row['rows_per_s'] else ""
+                print(f"{row['stage']}: {row['status']} in {row['time_s']:.2f}s (saved {row['saved_s']:.2f}s)"
+                      f"{throughput}, peak RSS {row['peak_rss_mb']:.0f} MB")
+            print(f"Total time saved: {sum(row['saved_s'] for row in report):.2f}s")
+
+            metrics = get_metrics()
+            if metrics.enabled:
+                metrics_path = MetricsConfig().training_metrics_path
+                metrics.write(metrics_path)
+                print(f"Metrics written to {metrics_path}")
+
             print("\n" + "="*50)
             print("Training Pipeline Completed Successfully!")
             print("="*50 + "\n")
             logging.info("Training pipeline completed successfully")
-            
+            return report
+
         except Exception as e:
             error_msg = f"Training pipeline failed: {str(e)}"
             logging.error(error_msg)
@@ -68,11 +210,13 @@ class TrainingPipeline:
             raise CustomException(error_msg, sys)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the RUL training pipeline")
+    parser.add_argument("--force", action="store_true", help="rerun every stage, ignoring the stage cache")
+    parser.add_argument("--from-stage", choices=STAGE_NAMES, help="rerun this stage and every stage after it")
+    args = parser.parse_args()
     try:
         pipeline = TrainingPipeline()
-        pipeline.run_pipeline()
+        pipeline.run_pipeline(force=args.force, from_stage=args.from_stage)
     except Exception as e:
         print(f"\nPipeline execution failed: {str(e)}")
         sys.exit(1)
-
-        
\ No newline at end of file
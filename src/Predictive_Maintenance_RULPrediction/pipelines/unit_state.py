@@ -0,0 +1,429 @@
+import os
+import sys
+import time
+import shutil
+import atexit
+import threading
+import numpy as np
+from collections import OrderedDict
+from src.Predictive_Maintenance_RULPrediction.logger import logging
+from src.Predictive_Maintenance_RULPrediction.exception import CustomException
+from src.Predictive_Maintenance_RULPrediction.artifact_store import MmapArtifactStore
+
+
+class UnitStateConfig:
+    def __init__(self):
+        # Units tracked at once; the least recently updated unit is evicted beyond this
+        self.max_units = int(os.environ.get("RUL_STREAM_MAX_UNITS", "50000"))
+        # Units not updated for this many seconds are dropped
+        self.ttl_s = float(os.environ.get("RUL_STREAM_TTL_S", "86400"))
+        # Each web worker process snapshots to its own <snapshot_path>_worker<id> (see worker_snapshot_path)
+        self.snapshot_path = os.path.join("artifacts", "stream_state")
+        # Seconds between background snapshots of the unit buffers; 0 disables snapshots
+        self.snapshot_interval_s = float(os.environ.get("RUL_STREAM_SNAPSHOT_INTERVAL_S", "60"))
+        # Web worker processes behind the service (set by gunicorn.conf.py); each keeps its own unit history
+        self.serving_processes = int(os.environ.get("RUL_SERVING_PROCESSES", "1"))
+        # Set when the load balancer sends every request for a unit to the same worker process
+        self.sticky_routing = os.environ.get("RUL_STREAM_STICKY_ROUTING", "0") == "1"
+
+    def worker_snapshot_path(self):
+        """Snapshot path of this process. Read at call time: gunicorn numbers a worker
+        (RUL_WORKER_ID) after the app was imported in the pre-forking master."""
+        worker_id = os.environ.get("RUL_WORKER_ID")
+        return self.snapshot_path if worker_id is None else f"{self.snapshot_path}_worker{worker_id}"
+
+
+class StreamingUnavailable(Exception):
+    """Raised when unit history would be split across worker processes; the app answers 503"""
+
+
+class UnitStateStore:
+    """
+    Per-unit history for streaming inference, where each request carries only
+    a unit's newest cycle.
+
+    Every tracked unit owns one slot in a set of preallocated NumPy arrays: a
+    ring buffer of its last max(windows) cycles, the running window sums
+    behind the rolling mean/std/slope, the EWMA states and its first cycle
+    (the reference for the rate features). An update touches one slot and
+    adds the new cycle to / drops the expiring cycle from each running sum,
+    so it costs O(1) per cycle regardless of window length or unit count.
+    The derived features equal FeatureEngineer.transform over the unit's
+    whole history, up to floating-point rounding.
+
+    Slots are kept in least-recently-updated order: units idle for longer
+    than `ttl_s` are dropped and the oldest unit makes room once `max_units`
+    are tracked. Arrays grow by doubling up to `max_units` slots.
+    """
+    # Running sums per window: y, y^2, t*y, t, t^2 with y and t relative to the unit's first cycle
+    _n_sums = 5
+
+    def __init__(self, engineer, max_units=50000, ttl_s=86400.0, initial_capacity=1024):
+        self.engineer = engineer
+        self.max_units = int(max_units)
+        self.ttl_s = float(ttl_s)
+        if engineer is None:
+            self._sources, self.windows, self.ewm_alphas, self.rate = [], (), (), False
+        else:
+            self._sources = [engineer.base_columns.index(c) for c in engineer.source_columns]
+            self.windows, self.ewm_alphas, self.rate = engineer.windows, engineer.ewm_alphas, engineer.rate
+        self._time = None if engineer is None else engineer.base_columns.index("time")
+        self._history = max(self.windows, default=0)
+        self._slots = OrderedDict()
+        self._free = []
+        self._capacity = 0
+        self._allocate(min(int(initial_capacity), self.max_units))
+        self.evictions = 0
+
+    @property
+    def feature_names(self):
+        return None if self.engineer is None else self.engineer.feature_names
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _allocate(self, capacity):
+        """Grow every per-slot array to `capacity` slots, keeping the existing ones"""
+        n_sources = len(self._sources)
+        shapes = {
+            "ring_y": (self._history, n_sources),
+            "ring_t": (self._history,),
+            "sums": (len(self.windows), self._n_sums, n_sources),
+            "ewm": (len(self.ewm_alphas), n_sources),
+            "first": (n_sources,),
+            "first_time": (),
+            "last_time": (),
+            "last_seen": (),
+            "count": (),
+        }
+        for name, shape in shapes.items():
+            dtype = np.int64 if name == "count" else np.float64
+            grown = np.zeros((capacity,) + shape, dtype=dtype)
+            if self._capacity:
+                grown[:self._capacity] = getattr(self, f"_{name}")
+            setattr(self, f"_{name}", grown)
+        self._free.extend(range(capacity - 1, self._capacity - 1, -1))
+        self._capacity = capacity
+
+    def _acquire(self, key):
+        """Slot of `key`, allocating a fresh one (and evicting if full) for a new unit"""
+        slot = self._slots.get(key)
+        if slot is not None:
+            self._slots.move_to_end(key)
+            return slot, False
+        if not self._free:
+            if self._capacity < self.max_units:
+                self._allocate(min(2 * self._capacity, self.max_units))
+            else:
+                # Least recently updated unit makes room
+                _, oldest = self._slots.popitem(last=False)
+                self._free.append(oldest)
+                self.evictions += 1
+        slot = self._free.pop()
+        self._slots[key] = slot
+        return slot, True
+
+    def evict_expired(self, now=None):
+        """Drop units not updated within ttl_s; returns how many were dropped"""
+        now = time.time() if now is None else now
+        expired = 0
+        while self._slots:
+            key, slot = next(iter(self._slots.items()))
+            if now - self._last_seen[slot] <= self.ttl_s:
+                break
+            del self._slots[key]
+            self._free.append(slot)
+            expired += 1
+        self.evictions += expired
+        return expired
+
+    def forget(self, key):
+        """Stop tracking a unit, e.g. after an engine was replaced; True if it was tracked"""
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return False
+        self._free.append(slot)
+        return True
+
+    def validate(self, keys, rows, now=None):
+        """
+        Raise ValueError, before any unit's history changes, if update() would
+        reject one of these rows: a cycle not after the unit's last tracked
+        cycle or after an earlier row of the same unit in the batch.
+        """
+        if self.engineer is None:
+            return
+        # Units past their TTL start over in update(), so they take any cycle
+        self.evict_expired(now)
+        last_time = {}
+        for key, row in zip(keys, rows):
+            cycle = float(row[self._time])
+            previous = last_time.get(key)
+            if previous is None and key in self._slots:
+                previous = self._last_time[self._slots[key]]
+            if previous is not None and cycle <= previous:
+                raise ValueError(f"Cycle {cycle:g} of unit {key} is not after its last cycle {previous:g}")
+            last_time[key] = cycle
+
+    def update(self, key, row, now=None):
+        """
+        Append one cycle (a FEATURE_COLUMNS row) to the history of unit `key`
+        and return the model input row (base columns plus engineered features).
+        """
+        row = np.asarray(row, dtype=np.float64).reshape(-1)
+        now = time.time() if now is None else now
+        self.evict_expired(now)
+        if self.engineer is None:
+            return row
+        slot, is_new = self._acquire(key)
+
+        cycle = row[self._time]
+        values = row[self._sources]
+        if is_new:
+            self._first[slot] = values
+            self._first_time[slot] = cycle
+            self._sums[slot] = 0.0
+            self._ewm[slot] = 0.0
+            self._count[slot] = 0
+        elif cycle <= self._last_time[slot]:
+            raise ValueError(
+                f"Cycle {cycle:g} of unit {key} is not after its last cycle {self._last_time[slot]:g}"
+            )
+        self._last_time[slot] = cycle
+        self._last_seen[slot] = now
+
+        y = values - self._first[slot]
+        t = cycle - self._first_time[slot]
+        n = int(self._count[slot])
+        sums = self._sums[slot]
+        derived = []
+        if self.windows:
+            added = np.stack([y, y * y, t * y, np.full_like(y, t), np.full_like(y, t * t)])
+            for i, window in enumerate(self.windows):
+                if n >= window:
+                    # The cycle that just left this window
+                    position = (n - window) % self._history
+                    old_y, old_t = self._ring_y[slot, position], self._ring_t[slot, position]
+                    sums[i] -= np.stack([old_y, old_y * old_y, old_t * old_y,
+                                         np.full_like(old_y, old_t), np.full_like(old_y, old_t * old_t)])
+                sums[i] += added
+            self._ring_y[slot, n % self._history] = y
+            self._ring_t[slot, n % self._history] = t
+            if (n + 1) % self._history == 0:
+                # Rebuild the sums from the ring once per lap (amortized O(1)) so rounding cannot accumulate
+                self._resum(slot, n + 1)
+
+            for i, window in enumerate(self.windows):
+                count = min(n + 1, window)
+                s_y, s_yy, s_ty, s_t, s_tt = sums[i]
+                mean = s_y / count
+                var = np.maximum(s_yy / count - mean * mean, 0.0)
+                denom = count * s_tt - s_t * s_t
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    slope = np.where(denom > 0, (count * s_ty - s_t * s_y) / denom, 0.0)
+                derived += [mean + self._first[slot], np.sqrt(var), slope]
+
+        for i, alpha in enumerate(self.ewm_alphas):
+            self._ewm[slot, i] = alpha * y + (1.0 - alpha) * self._ewm[slot, i]
+            derived.append(self._ewm[slot, i] + self._first[slot])
+        if self.rate:
+            derived.append(y / t if t > 0 else np.zeros_like(y))
+        self._count[slot] = n + 1
+        return np.concatenate([row] + derived)
+
+    def _resum(self, slot, n_seen):
+        """Exact window sums of a unit whose ring buffer has just been filled up to n_seen cycles"""
+        for i, window in enumerate(self.windows):
+            # Ring positions of the last `window` cycles
+            positions = np.arange(n_seen - min(n_seen, window), n_seen) % self._history
+            y, t = self._ring_y[slot, positions], self._ring_t[slot, positions][:, None]
+            self._sums[slot, i] = [y.sum(axis=0), (y * y).sum(axis=0), (t * y).sum(axis=0),
+                                   np.broadcast_to(t.sum(), y.shape[1:]),
+                                   np.broadcast_to((t * t).sum(), y.shape[1:])]
+
+    def stats(self):
+        return {
+            "tracked_units": len(self._slots),
+            "capacity": self._capacity,
+            "max_units": self.max_units,
+            "evictions": self.evictions,
+            "history_cycles": self._history,
+        }
+
+    def to_snapshot(self):
+        """(arrays, manifest) copy of the tracked units, in least-recently-updated order"""
+        keys = list(self._slots)
+        slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(keys))
+        arrays = {name: getattr(self, f"_{name}")[slots] for name in
+                  ("ring_y", "ring_t", "sums", "ewm", "first", "first_time", "last_time", "last_seen", "count")}
+        manifest = {
+            "kind": "unit_state",
+            "feature_names": self.feature_names,
+            # JSON has no tuples; keys are (group, unit) pairs
+            "keys": [list(key) for key in keys],
+            "evictions": self.evictions,
+        }
+        return arrays, manifest
+
+    def save(self, path):
+        """Snapshot the tracked units to `path` (an MmapArtifactStore directory)"""
+        write_snapshot(path, self.to_snapshot())
+
+    def load(self, path):
+        """
+        Restore units from a snapshot taken with the same feature spec; returns
+        how many were restored (0 if the snapshot belongs to another spec).
+        """
+        arrays, manifest = MmapArtifactStore().load(path)
+        if manifest.get("feature_names") != self.feature_names:
+            logging.warning(f"Ignoring unit state snapshot {path}: it was taken for other features")
+            return 0
+        keys = [tuple(key) for key in manifest["keys"]][-self.max_units:]
+        offset = len(manifest["keys"]) - len(keys)
+        self._slots.clear()
+        self._free = []
+        self._capacity = 0
+        self._allocate(max(min(len(keys), self.max_units), 1))
+        for name, array in arrays.items():
+            getattr(self, f"_{name}")[:len(keys)] = array[offset:]
+        self._slots.update((key, slot) for slot, key in enumerate(keys))
+        self.evictions = manifest.get("evictions", 0)
+        return len(keys)
+
+
+def write_snapshot(path, snapshot):
+    """Write an (arrays, manifest) unit state snapshot, replacing the previous one atomically"""
+    staging_path = f"{path}.staging"
+    if os.path.exists(staging_path):
+        shutil.rmtree(staging_path)
+    MmapArtifactStore().save(staging_path, snapshot)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(staging_path, path)
+
+
+class StreamingPredictor:
+    """
+    Scores the newest cycle of each unit using the unit's tracked history.
+
+    History lives in this process, so with several web workers every unit
+    must always reach the same one: predict raises StreamingUnavailable when
+    serving_processes > 1 unless sticky_routing says the load balancer
+    guarantees that. A request is all or nothing: every row is validated
+    before any unit's history is updated.
+
+    The state store follows the model registry: if a hot-swapped model uses a
+    different feature spec, the history kept for the old spec cannot feed it,
+    so tracking restarts. Snapshots are written by a background thread at
+    most every `snapshot_interval_s` seconds and when the process exits, and
+    are restored on start-up.
+    """
+    def __init__(self, registry, config=None):
+        self.registry = registry
+        self.config = config or UnitStateConfig()
+        self._lock = threading.Lock()
+        self._store = None
+        self._last_snapshot = time.monotonic()
+        self._snapshot_thread = None
+        if self.config.snapshot_interval_s > 0:
+            atexit.register(self.snapshot)
+
+    def _get_store(self, model_version):
+        engineer = model_version.feature_engineer
+        feature_names = None if engineer is None else engineer.feature_names
+        if self._store is not None and self._store.feature_names == feature_names:
+            return self._store
+        if self._store is not None:
+            logging.warning(f"Model version {model_version.version} uses other features; resetting unit state")
+        store = UnitStateStore(engineer, self.config.max_units, self.config.ttl_s)
+        snapshot_path = self.config.worker_snapshot_path()
+        if self._store is None and os.path.exists(MmapArtifactStore().manifest_path(snapshot_path)):
+            try:
+                restored = store.load(snapshot_path)
+                logging.info(f"Restored {restored} streaming units from {snapshot_path}")
+            except Exception as e:
+                logging.warning(f"Could not restore unit state from {snapshot_path}: {str(e)}")
+        self._store = store
+        return store
+
+    def predict(self, keys, features):
+        """
+        Append each row of `features` to the history of the matching (group, unit)
+        key and score it. Returns (predictions, model_version).
+        """
+        if self.config.serving_processes > 1 and not self.config.sticky_routing:
+            raise StreamingUnavailable(
+                f"Streaming predictions need every cycle of a unit on one process, but "
+                f"{self.config.serving_processes} worker processes serve requests; run one worker "
+                f"or route units to workers consistently (RUL_STREAM_STICKY_ROUTING=1)"
+            )
+        try:
+            model_version = self.registry.get()
+            with self._lock:
+                store = self._get_store(model_version)
+                now = time.time()
+                store.validate(keys, features, now)
+                prepared = np.stack([store.update(key, row, now) for key, row in zip(keys, features)])
+            preds = model_version.predict_prepared(prepared)
+            self._maybe_snapshot()
+            return preds, model_version.version
+        except ValueError:
+            raise
+        except Exception as e:
+            logging.error(f"Streaming prediction failed: {str(e)}")
+            raise CustomException(e, sys)
+
+    def forget(self, key):
+        with self._lock:
+            return self._store is not None and self._store.forget(key)
+
+    def stats(self):
+        with self._lock:
+            if self._store is None:
+                return {"tracked_units": 0}
+            return self._store.stats()
+
+    def snapshot(self):
+        """Write the unit state to this process's snapshot path now"""
+        with self._lock:
+            if self._store is None:
+                return
+            # Copy under the lock (fast), write outside it so scoring is not blocked on disk
+            snapshot = self._store.to_snapshot()
+        start = time.perf_counter()
+        write_snapshot(self.config.worker_snapshot_path(), snapshot)
+        logging.info(
+            f"Snapshot of {len(snapshot[1]['keys'])} streaming units written in {time.perf_counter() - start:.2f}s"
+        )
+
+    def _maybe_snapshot(self):
+        if self.config.snapshot_interval_s <= 0:
+            return
+        if time.monotonic() - self._last_snapshot < self.config.snapshot_interval_s:
+            return
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            return
+        self._last_snapshot = time.monotonic()
+        self._snapshot_thread = threading.Thread(target=self._snapshot_quietly, name="rul-unit-state-snapshot",
+                                                 daemon=True)
+        self._snapshot_thread.start()
+
+    def _snapshot_quietly(self):
+        try:
+            self.snapshot()
+        except Exception as e:
+            logging.warning(f"Unit state snapshot failed: {str(e)}")
+
+
+_predictors = {}
+_predictors_lock = threading.Lock()
+
+
+def get_streaming_predictor(registry, config=None):
+    """Return the process-wide streaming predictor in front of `registry`"""
+    with _predictors_lock:
+        predictor = _predictors.get(id(registry))
+        if predictor is None:
+            predictor = StreamingPredictor(registry, config)
+            _predictors[id(registry)] = predictor
+        return predictor
@@ -0,0 +1,103 @@
+import resource
+import numpy as np
+from src.Predictive_Maintenance_RULPrediction.artifact_store import MmapArtifactStore
+
+
+def peak_rss_mb(include_children=False):
+    """
+    Peak resident set size of this process so far (ru_maxrss is KiB on Linux).
+    With include_children, the larger of it and the largest waited-for child
+    (e.g. training scheduler workers).
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / 1024
+
+
+def chunk_rows_for_budget(memory_limit_mb, n_columns, bytes_per_value=8, overhead=8, min_rows=1000):
+    """
+    Rows per chunk so one chunk and its pandas/NumPy temporaries stay well within
+    the memory budget. `overhead` covers the copies made while parsing and scaling.
+    """
+    row_bytes = max(1, n_columns) * bytes_per_value * overhead
+    return max(min_rows, int(memory_limit_mb * 1024 * 1024 // row_bytes))
+
+
+def count_data_lines(path):
+    """Number of non-blank lines in a text file, read line by line"""
+    with open(path, 'rb') as file_obj:
+        return sum(1 for line in file_obj if line.strip())
+
+
+class ReservoirQuantileSketch:
+    """
+    Uniform random sample (Algorithm R) of at most `capacity` rows seen so far.
+
+    Quantiles of the sample approximate the quantiles of the whole stream with
+    a rank error of about 1/sqrt(capacity), independent of the stream length.
+    Memory is capacity * n_features floats.
+    """
+    def __init__(self, n_features, capacity=100000, seed=42):
+        self.capacity = int(capacity)
+        self.sample = np.empty((self.capacity, n_features), dtype=np.float64)
+        self.n_seen = 0
+        self._rng = np.random.RandomState(seed)
+
+    @property
+    def n_filled(self):
+        return min(self.n_seen, self.capacity)
+
+    def update(self, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        # Fill the reservoir first
+        take = max(0, min(len(rows), self.capacity - self.n_seen))
+        self.sample[self.n_seen:self.n_seen + take] = rows[:take]
+        rest = rows[take:]
+        if len(rest):
+            # Row t (0-based over the whole stream) replaces a random slot with probability capacity / (t + 1)
+            seen = self.n_seen + take + np.arange(len(rest))
+            slots = (self._rng.random_sample(len(rest)) * (seen + 1)).astype(np.int64)
+            accepted = slots < self.capacity
+            # With repeated slots the later row wins, as in the sequential algorithm
+            self.sample[slots[accepted]] = rest[accepted]
+        self.n_seen += len(rows)
+
+    def quantiles(self, q):
+        """Per-feature quantiles of the sample; q in [0, 1]"""
+        return np.quantile(self.sample[:self.n_filled], q, axis=0)
+
+    def save(self, path, metadata=None):
+        manifest = {
+            "kind": "reservoir_quantile_sketch",
+            "capacity": self.capacity,
+            "n_seen": self.n_seen,
+            "metadata": metadata or {},
+        }
+        MmapArtifactStore().save(path, ({"sample": self.sample[:self.n_filled]}, manifest))
+
+    @classmethod
+    def load(cls, path):
+        arrays, manifest = MmapArtifactStore().load(path)
+        sample = np.asarray(arrays["sample"])
+        sketch = cls(sample.shape[1], capacity=manifest["capacity"])
+        sketch.sample[:len(sample)] = sample
+        sketch.n_seen = manifest["n_seen"]
+        return sketch
+
+
+def robust_scaler_from_sketch(sketch, feature_names, quantile_range=(25.0, 75.0)):
+    """A fitted sklearn RobustScaler whose center_/scale_ come from the sketch instead of a full fit"""
+    from sklearn.preprocessing import RobustScaler
+
+    low, median, high = sketch.quantiles([quantile_range[0] / 100, 0.5, quantile_range[1] / 100])
+    scale = high - low
+    # Same handling of constant features as RobustScaler.fit
+    scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+
+    scaler = RobustScaler(quantile_range=quantile_range)
+    scaler.center_ = median
+    scaler.scale_ = scale
+    scaler.n_features_in_ = len(feature_names)
+    scaler.feature_names_in_ = np.asarray(feature_names, dtype=object)
+    return scaler
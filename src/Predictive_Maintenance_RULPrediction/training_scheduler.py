@@ -0,0 +1,348 @@
+import os
+import sys
+import math
+import time
+import resource
+import numpy as np
+import multiprocessing
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from src.Predictive_Maintenance_RULPrediction.logger import logging
+from src.Predictive_Maintenance_RULPrediction.exception import CustomException
+
+
+class TrainingSchedulerConfig:
+    def __init__(self):
+        # Cores shared by all candidates running at the same time
+        self.max_cores = int(os.environ.get("RUL_TRAINING_CORES", os.cpu_count() or 1))
+        # Folds never split an engine unit (see unit_folds)
+        self.cv = 3
+        # Successive halving: each rung keeps the best 1/halving_factor of the candidates
+        self.successive_halving = True
+        self.halving_factor = 2
+        # Smallest share of the training rows a candidate is ever fitted on
+        self.min_resource_fraction = 0.25
+        # Optional per-row predict latency limit used when picking the winner
+        budget = os.environ.get("RUL_LATENCY_BUDGET_MS")
+        self.latency_budget_ms = float(budget) if budget else None
+        self.random_state = 42
+
+
+@dataclass
+class CandidateResult:
+    name: str
+    estimator: object = None
+    best_params: dict = field(default_factory=dict)
+    r2: float = float("-inf")
+    n_train_samples: int = 0
+    fit_time_s: float = 0.0
+    predict_time_s: float = 0.0
+    latency_ms_per_row: float = 0.0
+    peak_rss_mb: float = 0.0
+    rung: int = 0
+    eliminated: bool = False
+    # Mean R2 of the chosen parameters over the unit-grouped validation folds
+    cv_r2: float = float("nan")
+
+    def summary(self):
+        return {
+            "r2": round(self.r2, 4),
+            "cv_r2": round(self.cv_r2, 4),
+            "n_train_samples": self.n_train_samples,
+            "fit_time_s": round(self.fit_time_s, 3),
+            "predict_time_s": round(self.predict_time_s, 4),
+            "latency_ms_per_row": round(self.latency_ms_per_row, 4),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "rung": self.rung,
+            "eliminated": self.eliminated,
+            "best_params": self.best_params,
+        }
+
+
+class _SharedArrays:
+    """Copies arrays into shared memory once; workers attach by name instead of unpickling them"""
+    def __init__(self, **arrays):
+        self.blocks = []
+        self.specs = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+
+def _attach(specs):
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in specs.items():
+        # Spawned workers share the parent's resource tracker, which unlinks the block once
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+def _r2(y_true, y_pred):
+    total = np.sum((y_true - y_true.mean()) ** 2)
+    return float(1 - np.sum((y_true - y_pred) ** 2) / total) if total > 0 else 0.0
+
+
+def unit_folds(groups, n_splits, random_state=0):
+    """
+    Fold number (0..n_splits-1) of every row, keeping all rows of a group
+    (an engine unit) in one fold. Like GroupKFold, groups go largest first
+    to the fold with the fewest rows; equal-sized groups in seeded random order.
+    """
+    _, inverse, counts = np.unique(groups, return_inverse=True, return_counts=True)
+    if len(counts) < n_splits:
+        raise ValueError(f"Cannot make {n_splits} folds from {len(counts)} units")
+    order = np.random.RandomState(random_state).permutation(len(counts))
+    order = order[np.argsort(-counts[order], kind="stable")]
+    fold_of_group = np.empty(len(counts), dtype=np.int8)
+    fold_rows = np.zeros(n_splits, dtype=np.int64)
+    for group in order:
+        fold = int(np.argmin(fold_rows))
+        fold_of_group[group] = fold
+        fold_rows[fold] += counts[group]
+    return fold_of_group[inverse.ravel()]
+
+
+# Shared arrays of this worker process, attached once when the worker starts
+_worker = {}
+
+
+def _init_worker(specs):
+    _worker["blocks"], _worker["arrays"] = _attach(specs)
+
+
+def _rung_data(model, n_rows):
+    """Training rows of a rung, fold ids and test data, as the candidate takes them (raw or pre-binned)"""
+    arrays = _worker["arrays"]
+    X_train, y_train, folds = arrays["X_train"], arrays["y_train"], arrays["folds"]
+    X_test, y_test = arrays["X_test"], arrays["y_test"]
+    # Histogram models take the uint8 matrices binned once by the trainer
+    if getattr(model, "prebinned", False) and "X_train_binned" in arrays:
+        X_train, X_test = arrays["X_train_binned"], arrays["X_test_binned"]
+    if n_rows < len(y_train):
+        rows = np.sort(arrays["order"][:n_rows])
+        X_train, y_train, folds = X_train[rows], y_train[rows], folds[rows]
+    return X_train, y_train, folds, X_test, y_test
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux; workers are reused, so this is the worker's peak so far
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _fit_fold(model, params, n_rows, fold):
+    """Worker task: fit one parameter point on all folds but `fold`, return its R2 on `fold`"""
+    from sklearn.base import clone
+    from threadpoolctl import threadpool_limits
+
+    X_train, y_train, folds, _, _ = _rung_data(model, n_rows)
+    validation = folds == fold
+    estimator = clone(model).set_params(**params)
+    start = time.perf_counter()
+    # One core per task; the pool keeps every core busy
+    with threadpool_limits(limits=1):
+        estimator.fit(X_train[~validation], y_train[~validation])
+        score = _r2(y_train[validation], estimator.predict(X_train[validation]))
+    return score, time.perf_counter() - start, _peak_rss_mb()
+
+
+def _refit_candidate(name, model, params, n_rows, rung, n_threads=1):
+    """
+    Worker task: fit the chosen parameters on all rows of the rung and
+    measure it on the test split. `n_threads` OpenMP threads are allowed
+    (histogram boosting splits its fit over them); BLAS stays single-threaded.
+    """
+    from sklearn.base import clone
+    from threadpoolctl import threadpool_limits
+
+    X_train, y_train, _, X_test, y_test = _rung_data(model, n_rows)
+    # Raw rows for the latency probe, so a binned model pays for binning as it would when served
+    single_row = _worker["arrays"]["X_test"][:1]
+    estimator = clone(model).set_params(**params)
+    with threadpool_limits(limits=1), threadpool_limits(limits=n_threads, user_api="openmp"):
+        start = time.perf_counter()
+        estimator.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        y_pred = estimator.predict(X_test)
+        predict_time = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(20):
+            start = time.perf_counter()
+            estimator.predict(single_row)
+            latencies.append(time.perf_counter() - start)
+
+    return CandidateResult(
+        name=name,
+        estimator=estimator,
+        best_params=params,
+        r2=_r2(y_test, y_pred),
+        n_train_samples=len(y_train),
+        fit_time_s=fit_time,
+        predict_time_s=predict_time,
+        latency_ms_per_row=float(np.median(latencies)) * 1000,
+        peak_rss_mb=_peak_rss_mb(),
+        rung=rung,
+    )
+
+
+class TrainingScheduler:
+    """
+    Runs model candidates in parallel worker processes under a core budget.
+
+    Training/test arrays and the fold ids are placed in shared memory once
+    and every worker of one long-lived pool attaches them when it starts.
+    Each (candidate, parameter point, fold) fit is its own single-threaded
+    task, so all cores stay busy until the last fit instead of waiting on the
+    slowest candidate's grid search. With successive halving, every candidate
+    is first fitted on a small share of the rows and only the best
+    1/halving_factor advance to the next, larger rung, so hopeless candidates
+    never pay for a full-size fit.
+    """
+    def __init__(self, config=None):
+        self.config = config or TrainingSchedulerConfig()
+
+    def _rung_fractions(self, n_candidates):
+        if not self.config.successive_halving or n_candidates <= 1:
+            return [1.0]
+        eta = self.config.halving_factor
+        # Enough rungs to cut the field down to a single candidate
+        n_rungs = 1
+        while eta ** (n_rungs - 1) < n_candidates:
+            n_rungs += 1
+        return [max(self.config.min_resource_fraction, eta ** (rung - n_rungs + 1)) for rung in range(n_rungs)]
+
+    def _rank_key(self, result):
+        budget = self.config.latency_budget_ms
+        within_budget = budget is None or result.latency_ms_per_row <= budget
+        return (within_budget, result.r2)
+
+    def run(self, X_train, y_train, X_test, y_test, models, params, binned=None, folds=None):
+        """
+        Fit all candidates and return {name: CandidateResult}. `binned`, if
+        given, is (X_train, X_test) quantized to uint8 once, shared with the
+        candidates that fit on pre-binned features. `folds` is the CV fold
+        of every training row (see unit_folds); without it rows are dealt to
+        folds at random, which lets rows of one unit sit on both sides.
+        """
+        try:
+            results = {}
+            remaining = list(models)
+            fractions = self._rung_fractions(len(remaining))
+            order = np.random.RandomState(self.config.random_state).permutation(len(y_train))
+            if folds is None:
+                logging.warning("No unit folds given; cross-validating on shuffled rows")
+                folds = (np.argsort(order) % self.config.cv).astype(np.int8)
+            arrays = dict(X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test,
+                          order=order, folds=np.asarray(folds, dtype=np.int8))
+            if binned is not None:
+                arrays.update(X_train_binned=binned[0], X_test_binned=binned[1])
+            shared = _SharedArrays(**arrays)
+            context = multiprocessing.get_context("spawn")
+            try:
+                with ProcessPoolExecutor(max_workers=max(1, self.config.max_cores), mp_context=context,
+                                         initializer=_init_worker, initargs=(shared.specs,)) as pool:
+                    for rung, fraction in enumerate(fractions):
+                        is_last = rung == len(fractions) - 1 or len(remaining) == 1
+                        fraction = 1.0 if is_last else fraction
+                        n_rows = len(y_train) if fraction >= 1.0 else int(len(y_train) * fraction)
+
+                        # Longest candidates first, so the short ones fill the gaps at the end
+                        remaining.sort(key=lambda name: results[name].fit_time_s if name in results else 0,
+                                       reverse=True)
+                        rung_results = self._run_rung(pool, rung, remaining, models, params, n_rows)
+                        results.update(rung_results)
+                        logging.info(f"Rung {rung} ({fraction:.0%} of rows): " +
+                                     ", ".join(f"{name}={res.r2:.4f} (cv {res.cv_r2:.4f})"
+                                               for name, res in rung_results.items()))
+                        if is_last:
+                            break
+
+                        ranked = sorted(remaining, key=lambda name: self._rank_key(results[name]), reverse=True)
+                        keep = max(1, math.ceil(len(ranked) / self.config.halving_factor))
+                        for name in ranked[keep:]:
+                            # Kept, fitted on this rung's rows, so it can still be served on request
+                            results[name].eliminated = True
+                        remaining = ranked[:keep]
+            finally:
+                shared.close()
+            return results
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _run_rung(self, pool, rung, names, models, params, n_rows):
+        """
+        Cross-validate every parameter point of every candidate as one task
+        per fold, then refit each candidate's best point on all the rung's
+        rows as soon as its last fold is in. A pre-binned histogram model's
+        refit gets the cores no queued task is waiting for as OpenMP threads
+        (all of them once it is the last task, as in the final rung).
+
+        fit_time_s is the CPU time of all the candidate's fits (folds and
+        refit); peak_rss_mb is the largest high-water mark of the workers
+        that ran them, an upper bound since workers are reused.
+        """
+        from sklearn.model_selection import ParameterGrid
+
+        grids = {name: list(ParameterGrid(params[name])) for name in names}
+        scores = {name: np.zeros((len(grids[name]), self.config.cv)) for name in names}
+        pending = {name: len(grids[name]) * self.config.cv for name in names}
+        task_time = dict.fromkeys(names, 0.0)
+        task_rss = dict.fromkeys(names, 0.0)
+
+        futures = {}
+        for name in names:
+            for point, point_params in enumerate(grids[name]):
+                for fold in range(self.config.cv):
+                    future = pool.submit(_fit_fold, models[name], point_params, n_rows, fold)
+                    futures[future] = (name, point, fold)
+
+        results = {}
+        while futures:
+            for future in as_completed(list(futures)):
+                name, point, fold = futures.pop(future)
+                if point is None:
+                    result = future.result()
+                    result.cv_r2 = float(scores[name].mean(axis=1).max())
+                    result.fit_time_s += task_time[name]
+                    result.peak_rss_mb = max(result.peak_rss_mb, task_rss[name])
+                    results[name] = result
+                    continue
+
+                score, elapsed, rss = future.result()
+                scores[name][point, fold] = score
+                task_time[name] += elapsed
+                task_rss[name] = max(task_rss[name], rss)
+                pending[name] -= 1
+                if pending[name] == 0:
+                    best = int(np.argmax(scores[name].mean(axis=1)))
+                    n_threads = 1
+                    if getattr(models[name], "prebinned", False):
+                        n_threads = max(1, self.config.max_cores - len(futures))
+                    refit = pool.submit(_refit_candidate, name, models[name], grids[name][best], n_rows, rung,
+                                        n_threads)
+                    futures[refit] = (name, None, None)
+                    # as_completed only watches the futures it was given
+                    break
+        return {name: results[name] for name in names}
+
+    def select_best(self, results):
+        """Name of the winner: best R2 among fully trained candidates within the latency budget"""
+        finalists = [result for result in results.values() if not result.eliminated]
+        budget = self.config.latency_budget_ms
+        if budget is not None and not any(r.latency_ms_per_row <= budget for r in finalists):
+            logging.warning(f"No candidate meets the {budget} ms/row latency budget; picking by R2")
+        return max(finalists, key=self._rank_key).name
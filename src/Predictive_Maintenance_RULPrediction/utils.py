@@ -1,28 +1,23 @@
 import os
 import sys
-import pickle
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import GridSearchCV
-from sklearn.metrics import r2_score,mean_absolute_error
 from src.Predictive_Maintenance_RULPrediction.logger import logging
 from src.Predictive_Maintenance_RULPrediction.exception import CustomException
+from src.Predictive_Maintenance_RULPrediction.artifact_store import PickleArtifactStore
 
 
-def save_object(file_path, obj):
+def save_object(file_path, obj, store=None):
     try:
-        dir_path = os.path.dirname(file_path)
-        os.makedirs(dir_path, exist_ok=True)
-        with open(file_path, 'wb') as file_obj:
-            pickle.dump(obj, file_obj)
+        # Written atomically, so a serving process never reads a half-written model
+        (store or PickleArtifactStore()).save(file_path, obj)
     except Exception as e:
         logging.info('Exception occurred in save_object function utils')
         raise CustomException(e, sys)
 
-def load_object(file_path):
+def load_object(file_path, store=None):
     try:
-        with open(file_path, 'rb') as file_obj:
-            return pickle.load(file_obj)
+        return (store or PickleArtifactStore()).load(file_path)
     except Exception as e:
         logging.info('Exception occurred in load_object function utils')
         raise CustomException(e, sys)
@@ -30,26 +25,24 @@ def load_object(file_path):
     
 # evaluating models performance
 
-def evaluate_models(X_train, y_train,X_test,y_test,models,params):
+def evaluate_models(X_train, y_train,X_test,y_test,models,params,scheduler=None):
+    """
+    Grid-search every candidate through the TrainingScheduler and return
+    {name: test R2}. Each entry of `models` is replaced by its fitted best
+    estimator (fitted on fewer rows for candidates eliminated early by
+    successive halving).
+    """
+    from src.Predictive_Maintenance_RULPrediction.training_scheduler import TrainingScheduler
     try:
-        report = {}
-
-        for i in range(len(list(models))):
-            model = list(models.values())[i]
-            para=params[list(models.keys())[i]]
-
-            gscv = GridSearchCV(model,para,cv=3,n_jobs=-1)
-            gscv.fit(X_train,y_train)
-
-            model.set_params(**gscv.best_params_)
-            model.fit(X_train,y_train)
+        scheduler = scheduler or TrainingScheduler()
+        results = scheduler.run(X_train, y_train, X_test, y_test, models, params)
 
-            y_pred = model.predict(X_test)
-
-            model_score = r2_score(y_test, y_pred)
-            report[list(models.keys())[i]] = model_score
+        report = {}
+        for name, result in results.items():
+            models[name] = result.estimator
+            report[name] = result.r2
 
         return report
 
     except Exception as e:
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)
@@ -0,0 +1,57 @@
+import os
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAW_DATA_DIR = os.path.join(REPO_ROOT, 'notebooks', 'data')
+
+
+def _write_units(source, target, n_units):
+    """Copy the rows of the first n_units engines of a C-MAPSS file"""
+    with open(source) as src, open(target, 'w') as dst:
+        dst.writelines(line for line in src if line.strip() and int(line.split()[0]) <= n_units)
+
+
+@pytest.fixture
+def raw_data_dir(tmp_path):
+    """A small FD001: the first 12 train and 20 test units of notebooks/data"""
+    raw_dir = tmp_path / 'raw'
+    raw_dir.mkdir()
+    _write_units(os.path.join(RAW_DATA_DIR, 'train_FD001.txt'), raw_dir / 'train_FD001.txt', 12)
+    # Units 17, 18 and 20 are the first whose test RUL is under the cap, so the test R2 is defined
+    _write_units(os.path.join(RAW_DATA_DIR, 'test_FD001.txt'), raw_dir / 'test_FD001.txt', 20)
+    with open(os.path.join(RAW_DATA_DIR, 'RUL_FD001.txt')) as src:
+        (raw_dir / 'RUL_FD001.txt').write_text("".join(src.readlines()[:20]))
+    return raw_dir
+
+
+@pytest.fixture
+def workdir(tmp_path, raw_data_dir, monkeypatch):
+    """Run in a scratch directory: artifacts/ and new_units/ are resolved against the cwd"""
+    run_dir = tmp_path / 'run'
+    run_dir.mkdir()
+    monkeypatch.chdir(run_dir)
+    monkeypatch.setenv('RUL_RAW_DATA_DIR', str(raw_data_dir))
+    return run_dir
+
+
+@pytest.fixture
+def small_candidates(monkeypatch):
+    """Two small growable candidates, so a full training run takes seconds"""
+    from src.Predictive_Maintenance_RULPrediction.components.model_trainer import ModelTrainer
+    get_model_candidates = ModelTrainer.get_model_candidates
+
+    def small(self):
+        models, params = get_model_candidates(self)
+        params = {"Random Forest": dict(params["Random Forest"], n_estimators=[20], max_depth=[8]),
+                  "HistGradientBoosting": dict(params["HistGradientBoosting"], max_iter=[30])}
+        return {name: models[name] for name in params}, params
+
+    monkeypatch.setattr(ModelTrainer, "get_model_candidates", small)
+
+
+@pytest.fixture
+def trained_workdir(workdir, small_candidates):
+    """workdir with artifacts/ from a full training run of the small candidates"""
+    from src.Predictive_Maintenance_RULPrediction.pipelines.training_pipeline import TrainingPipeline
+    TrainingPipeline().run_pipeline()
+    return workdir
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from src.Predictive_Maintenance_RULPrediction.artifact_store import (
+    ArtifactStore, ColumnarArtifactStore, MmapArtifactStore, PickleArtifactStore
+)
+
+
+def test_incomplete_store_fails_at_construction():
+    class SaveOnly(ArtifactStore):
+        def save(self, path, obj):
+            pass
+
+    with pytest.raises(TypeError):
+        ArtifactStore()
+    with pytest.raises(TypeError):
+        SaveOnly()
+
+
+def test_round_trips(tmp_path):
+    store = PickleArtifactStore()
+    store.save(str(tmp_path / "obj.pkl"), {"a": [1, 2]})
+    assert store.load(str(tmp_path / "obj.pkl")) == {"a": [1, 2]}
+
+    arrays = {"x": np.arange(6.0).reshape(2, 3)}
+    MmapArtifactStore().save(str(tmp_path / "mmap"), (arrays, {"kind": "test"}))
+    loaded, manifest = MmapArtifactStore().load(str(tmp_path / "mmap"), verify=True)
+    np.testing.assert_array_equal(loaded["x"], arrays["x"])
+    assert manifest["kind"] == "test"
+
+    table = ColumnarArtifactStore()
+    table.save(str(tmp_path / "table"), {"unit": [1, 2], "sensor_2": [0.1, 0.2]}, metadata={"inputs": {"a": "1"}})
+    assert table.matches_inputs(str(tmp_path / "table"), {"a": "1"})
+    np.testing.assert_array_equal(table.load_array(str(tmp_path / "table")), [[1, 0.1], [2, 0.2]])
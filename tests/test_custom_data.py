@@ -0,0 +1,30 @@
+import copy
+import pickle
+import numpy as np
+import pytest
+from src.Predictive_Maintenance_RULPrediction.pipelines.prediction_pipeline import CustomData, FEATURE_COLUMNS
+
+
+@pytest.fixture
+def record():
+    return CustomData(*range(1, len(FEATURE_COLUMNS) + 1))
+
+
+def test_fields_are_attributes(record):
+    assert record.unit == 1.0
+    assert record.sensor_21 == float(len(FEATURE_COLUMNS))
+    with pytest.raises(AttributeError):
+        record.sensor_1
+
+
+@pytest.mark.parametrize("clone", [copy.copy, copy.deepcopy, lambda obj: pickle.loads(pickle.dumps(obj))])
+def test_copies_and_pickles(record, clone):
+    cloned = clone(record)
+    assert isinstance(cloned, CustomData)
+    np.testing.assert_array_equal(cloned.to_array(), record.to_array())
+
+
+def test_stack(record):
+    stacked = CustomData.stack([record, record])
+    assert stacked.shape == (2, len(FEATURE_COLUMNS))
+    assert stacked.flags["C_CONTIGUOUS"]
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from src.Predictive_Maintenance_RULPrediction.components.feature_engineering import FeatureEngineer
+from src.Predictive_Maintenance_RULPrediction.pipelines.model_registry import HistoryRequired, ModelVersion
+
+BASE_COLUMNS = ("unit", "time", "sensor_2", "sensor_3")
+
+
+@pytest.fixture
+def engineer():
+    return FeatureEngineer(BASE_COLUMNS, ("sensor_2", "sensor_3"), windows=(3,), ewm_alphas=(0.3,), rate=True)
+
+
+def _rows(unit, cycles):
+    return np.array([[unit, cycle, 600.0 + cycle, 1500.0 - cycle] for cycle in cycles])
+
+
+def test_units_missing_history(engineer):
+    whole = np.concatenate([_rows(1, range(1, 6)), _rows(2, [1])])
+    assert engineer.units_missing_history(whole) == []
+    # A single late cycle, a trajectory with a gap and one starting after cycle 1
+    partial = np.concatenate([_rows(1, [150]), _rows(2, [1, 2, 4]), _rows(3, range(2, 5)), _rows(4, [1, 2])])
+    assert engineer.units_missing_history(partial) == [1.0, 2.0, 3.0]
+    # Groups keep requests apart even for the same unit number
+    assert engineer.units_missing_history(np.concatenate([_rows(1, [1]), _rows(1, [1])]), groups=[0, 1]) == []
+
+
+class _Model:
+    def __init__(self, feature_names):
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+
+def test_check_history(engineer):
+    model_version = ModelVersion("v1", None, _Model(engineer.feature_names), None)
+    model_version.check_history(_rows(7, [1]))
+    with pytest.raises(HistoryRequired, match="/predict/stream"):
+        model_version.check_history(_rows(7, [150]))
+
+    # Without trajectory features any row can be scored on its own
+    ModelVersion("v2", None, _Model(BASE_COLUMNS), None).check_history(_rows(7, [150]))
@@ -0,0 +1,20 @@
+import os
+import sys
+import subprocess
+from tests.conftest import REPO_ROOT
+
+
+def test_serving_imports_stay_within_budget(trained_workdir):
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.import_budget", "--workdir", str(trained_workdir), "--repeats", "3"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+        env=dict(os.environ, RUL_WARMUP_ROWS="1000"),
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    phases = {line.split()[0]: line for line in result.stdout.splitlines() if line.startswith(("pipeline", "app"))}
+    assert set(phases) == {"pipeline", "app"}
+    # The app phase must serve the compiled model, so the module check applied to it too
+    assert "backend=compiled" in phases["app"]
+    for line in phases.values():
+        assert "loaded=- " in line, line
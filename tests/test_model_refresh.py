@@ -0,0 +1,78 @@
+import os
+import json
+import pytest
+from tests.conftest import RAW_DATA_DIR
+from src.Predictive_Maintenance_RULPrediction.components.model_trainer import ModelTrainer
+from src.Predictive_Maintenance_RULPrediction.pipelines.refresh_pipeline import RefreshPipeline
+
+
+def _write_new_units(path, first_unit, last_unit):
+    """Units first_unit..last_unit of the full FD001 train file, numbered from 1 as a new-unit file is"""
+    with open(os.path.join(RAW_DATA_DIR, 'train_FD001.txt')) as src, open(path, 'w') as dst:
+        for line in src:
+            fields = line.split()
+            if fields and first_unit <= int(fields[0]) <= last_unit:
+                dst.write(" ".join([str(int(fields[0]) - first_unit + 1)] + fields[1:]) + "\n")
+
+
+@pytest.fixture
+def client(trained_workdir, monkeypatch):
+    """Test client of the app, serving a freshly trained model with its cascade screen"""
+    monkeypatch.setenv("RUL_CASCADE", "1")
+    monkeypatch.setenv("RUL_MODEL_CHECK_INTERVAL", "0")
+    monkeypatch.setenv("RUL_WARMUP_ROWS", "0")
+    # A dozen units move the scaler a lot; these tests are about publishing, not the drift guard
+    monkeypatch.setenv("RUL_REFRESH_MAX_SCALER_DRIFT", "100")
+    monkeypatch.setenv("RUL_REFRESH_MAX_RMSE_INCREASE", "1")
+    os.makedirs('new_units')
+    _write_new_units(os.path.join('new_units', 'train_FD001_batch1.txt'), 13, 16)
+
+    import app
+    return app.app.test_client()
+
+
+def _applied():
+    with open(os.path.join('artifacts', 'refresh', 'state.json')) as file_obj:
+        return list(json.load(file_obj)["applied"])
+
+
+def test_refresh_keeps_candidates_and_cascade_served(client):
+    assert client.get('/model/candidates').status_code == 200
+    first_version = client.get('/model/version').get_json()["version"]
+
+    report = RefreshPipeline().run_pipeline()
+    assert report["mode"] == "incremental"
+    assert report["model_version"] != first_version
+
+    served = client.get('/model/version').get_json()
+    assert served["version"] == report["model_version"]
+    assert served["cascade"] is not None
+    response = client.get('/model/candidates')
+    assert response.status_code == 200
+    assert response.get_json()["best"] in response.get_json()["candidates"]
+
+    rows = [[1, cycle, 0.0, 0.0, 642.0, 1590.0, 1400.0, 554.0, 2388.0, 9050.0, 47.4, 522.0, 2388.0, 8140.0,
+             8.42, 392.0, 39.0, 23.4] for cycle in range(1, 6)]
+    response = client.post('/predict/batch?model=ensemble', json={"rows": rows})
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    assert _applied() == ['train_FD001_batch1.txt']
+    # Nothing left to apply: a second refresh must not grow the model on the same units again
+    assert RefreshPipeline().run_pipeline()["mode"] == "none"
+
+
+def test_refresh_failing_after_the_swap_leaves_a_consistent_model(client, monkeypatch):
+    first_version = client.get('/model/version').get_json()["version"]
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("recalibration failed")
+
+    monkeypatch.setattr(ModelTrainer, "recalibrate_cascade", fail)
+    with pytest.raises(Exception, match="recalibration failed"):
+        RefreshPipeline().run_pipeline()
+
+    # The grown model is served with the candidates re-stamped for it, and its units count as applied
+    assert client.get('/model/version').get_json()["version"] != first_version
+    assert client.get('/model/candidates').status_code == 200
+    assert _applied() == ['train_FD001_batch1.txt']
+    assert RefreshPipeline().run_pipeline()["mode"] == "none"
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import RobustScaler
+from src.Predictive_Maintenance_RULPrediction.components.regime_scaler import RegimeScaler
+
+COLUMNS = ["unit", "time", "operational_setting_1", "operational_setting_2", "sensor_2"]
+REGIME_COLUMNS = COLUMNS[2:4]
+
+
+def _data(n_regimes, n_rows=5000, seed=0):
+    rng = np.random.RandomState(seed)
+    points = rng.uniform(0, 40, (n_regimes, 2))
+    regime = rng.randint(0, n_regimes, n_rows)
+    settings = points[regime] + rng.normal(0, 0.002 if n_regimes > 1 else 1.0, (n_rows, 2))
+    sensor = 100.0 * regime + rng.normal(0, 1, n_rows)
+    return np.c_[rng.randint(1, 100, n_rows), rng.randint(1, 300, n_rows), settings, sensor]
+
+
+def test_single_regime_scales_like_robust_scaler():
+    X = _data(1)
+    scaler = RegimeScaler(REGIME_COLUMNS).fit(X, COLUMNS)
+    assert scaler.n_regimes_ == 1
+    np.testing.assert_allclose(scaler.transform(X), RobustScaler().fit_transform(X))
+
+
+@pytest.mark.parametrize("n_regimes", [2, 3, 6])
+def test_finds_the_fewest_tight_regimes(n_regimes):
+    X = _data(n_regimes)
+    scaler = RegimeScaler(REGIME_COLUMNS).fit(X, COLUMNS)
+    assert scaler.n_regimes_ == n_regimes
+    # Per-regime scaling removes the regime offset of the sensor
+    assert np.abs(np.median(scaler.transform(X)[:, -1])) < 1
+    np.testing.assert_allclose(scaler.inverse_transform(scaler.transform(X)), X)
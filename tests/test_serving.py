@@ -0,0 +1,35 @@
+import threading
+import pytest
+from src.Predictive_Maintenance_RULPrediction.pipelines.serving import (
+    ScoringPool, ServingConfig, ServerBusy, ScoringTimeout
+)
+
+
+@pytest.fixture
+def pool():
+    config = ServingConfig()
+    config.scoring_threads, config.queue_size, config.timeout_s = 1, 0, 0.05
+    return ScoringPool(config)
+
+
+def test_runs_and_releases(pool):
+    assert pool.run(sum, [1, 2, 3]) == 6
+    assert pool.stats()["in_flight"] == 0
+    assert pool.drain(timeout=0)
+
+
+def test_timed_out_call_keeps_its_slot(pool):
+    release = threading.Event()
+    with pytest.raises(ScoringTimeout):
+        pool.run(release.wait)
+
+    # The call still runs: it holds the only slot and drain does not see the pool idle
+    with pytest.raises(ServerBusy):
+        pool.run(sum, [1])
+    assert pool.stats()["in_flight"] == 1
+    assert pool.stats()["timed_out"] == 1
+    assert not pool.drain(timeout=0.01)
+
+    release.set()
+    assert pool.drain(timeout=5)
+    assert pool.stats()["in_flight"] == 0
@@ -0,0 +1,99 @@
+import os
+import pytest
+from src.Predictive_Maintenance_RULPrediction.pipelines.stage_cache import Stage, StageCache, run_stages
+
+
+def _manifest_inode(path):
+    return os.stat(os.path.join(path, 'manifest.json')).st_ino
+
+
+class CountingStage:
+    """A stage copying its input file to its output, counting how often it really ran"""
+    def __init__(self, name, input_path, output_path, config=None):
+        self.runs = 0
+        self.input_path, self.output_path = input_path, output_path
+        self.stage = Stage(name, inputs={"source": input_path}, config=config or {}, outputs={"out": output_path},
+                           run=self.run)
+
+    def run(self):
+        self.runs += 1
+        with open(self.input_path) as src, open(self.output_path, 'w') as dst:
+            dst.write(src.read().upper())
+
+
+@pytest.fixture
+def chain(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'raw.txt').write_text("cycle")
+    first = CountingStage("first", str(tmp_path / 'raw.txt'), str(tmp_path / 'first.txt'))
+    second = CountingStage("second", str(tmp_path / 'first.txt'), str(tmp_path / 'second.txt'))
+    return first, second
+
+
+def _statuses(report):
+    return [row["status"] for row in report]
+
+
+def test_second_run_is_all_hits(chain):
+    first, second = chain
+    stages = [first.stage, second.stage]
+    assert _statuses(run_stages(stages, StageCache())) == ["miss", "miss"]
+    os.remove(second.output_path)
+
+    report = run_stages(stages, StageCache())
+    assert _statuses(report) == ["hit", "hit"]
+    assert (first.runs, second.runs) == (1, 1)
+    # The hit put the cached output back
+    assert open(second.output_path).read() == "CYCLE"
+    assert report[1]["saved_s"] >= 0
+
+
+def test_changed_input_invalidates_downstream(chain, tmp_path):
+    first, second = chain
+    stages = [first.stage, second.stage]
+    run_stages(stages, StageCache())
+    (tmp_path / 'raw.txt').write_text("flight")
+
+    assert _statuses(run_stages(stages, StageCache())) == ["miss", "miss"]
+    assert open(second.output_path).read() == "FLIGHT"
+
+
+def test_changed_config_is_a_miss(chain):
+    first, second = chain
+    run_stages([first.stage, second.stage], StageCache())
+    first.stage.config = {"code": "edited"}
+
+    # The first stage reruns; its output is unchanged, so the second still hits
+    assert _statuses(run_stages([first.stage, second.stage], StageCache())) == ["miss", "hit"]
+    assert (first.runs, second.runs) == (2, 1)
+
+
+def test_force_and_from_stage_rerun(chain):
+    first, second = chain
+    stages = [first.stage, second.stage]
+    run_stages(stages, StageCache())
+
+    assert _statuses(run_stages(stages, StageCache(), force=True)) == ["forced", "forced"]
+    assert (first.runs, second.runs) == (2, 2)
+    assert _statuses(run_stages(stages, StageCache(), from_stage="second")) == ["hit", "forced"]
+    assert (first.runs, second.runs) == (2, 3)
+    with pytest.raises(Exception, match="Unknown stage"):
+        run_stages(stages, StageCache(), from_stage="missing")
+
+
+def test_forced_data_stages_rebuild_their_tables(workdir):
+    from src.Predictive_Maintenance_RULPrediction.pipelines.training_pipeline import TrainingPipeline
+
+    pipeline = TrainingPipeline()
+    stages = pipeline._build_stages()[:2]
+    run_stages(stages, pipeline.stage_cache)
+    train_path = pipeline.data_ingestion.ingestion_config.train_data_path
+    transformed_path = pipeline.data_transformation.data_transformation_config.transformed_train_path
+    before = _manifest_inode(train_path), _manifest_inode(transformed_path)
+
+    # The inputs are unchanged, but a forced (or code-changed) stage must not reuse its old tables
+    report = run_stages(stages, pipeline.stage_cache, force=True)
+    assert _statuses(report) == ["forced", "forced"]
+    assert _manifest_inode(train_path) != before[0]
+    assert _manifest_inode(transformed_path) != before[1]
+
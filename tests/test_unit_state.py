@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.Predictive_Maintenance_RULPrediction.components.feature_engineering import FeatureEngineer
+from src.Predictive_Maintenance_RULPrediction.pipelines.unit_state import UnitStateStore
+
+BASE_COLUMNS = ("unit", "time", "sensor_2", "sensor_3")
+SOURCES = ("sensor_2", "sensor_3")
+WINDOWS = (3, 7)
+ALPHAS = (0.3,)
+
+
+@pytest.fixture
+def engineer():
+    return FeatureEngineer(BASE_COLUMNS, SOURCES, windows=WINDOWS, ewm_alphas=ALPHAS, rate=True)
+
+
+def _trajectories(n_units=3, n_cycles=40, seed=0):
+    """Interleaved cycles of a few units, as a stream delivers them; cycles are 1..n with gaps"""
+    rng = np.random.RandomState(seed)
+    frames = []
+    for unit in range(1, n_units + 1):
+        time = np.cumsum(rng.randint(1, 3, n_cycles)).astype(float)
+        time -= time[0] - 1
+        frames.append(pd.DataFrame({
+            "unit": float(unit), "time": time,
+            "sensor_2": 642.0 + 0.01 * time + rng.normal(0, 0.5, n_cycles),
+            "sensor_3": 1590.0 - 0.05 * time + rng.normal(0, 5.0, n_cycles),
+        }))
+    return pd.concat(frames).sort_values(["time", "unit"], kind="stable").reset_index(drop=True)
+
+
+def _pandas_reference(df):
+    """The engineered features, column by column, from pandas rolling/ewm per unit"""
+    columns = {}
+    by_unit = df.groupby("unit")
+    for window in WINDOWS:
+        for column in SOURCES:
+            columns[f"{column}_mean_{window}"] = by_unit[column].transform(
+                lambda x: x.rolling(window, min_periods=1).mean())
+        for column in SOURCES:
+            columns[f"{column}_std_{window}"] = by_unit[column].transform(
+                lambda x: x.rolling(window, min_periods=1).std(ddof=0))
+        for column in SOURCES:
+            slopes = pd.Series(0.0, index=df.index)
+            for _, unit_df in by_unit:
+                t, y = unit_df["time"].to_numpy(), unit_df[column].to_numpy()
+                for i in range(1, len(unit_df)):
+                    lo = max(0, i - window + 1)
+                    slopes[unit_df.index[i]] = np.polyfit(t[lo:i + 1], y[lo:i + 1], 1)[0] if i > lo else 0.0
+            columns[f"{column}_slope_{window}"] = slopes
+    for alpha in ALPHAS:
+        for column in SOURCES:
+            columns[f"{column}_ewm_{alpha:g}"] = by_unit[column].transform(
+                lambda x: x.ewm(alpha=alpha, adjust=False).mean())
+    for column in SOURCES:
+        first_y = by_unit[column].transform("first")
+        first_t = by_unit["time"].transform("first")
+        elapsed = df["time"] - first_t
+        columns[f"{column}_rate"] = ((df[column] - first_y) / elapsed.where(elapsed > 0)).fillna(0.0)
+    return pd.DataFrame(columns)
+
+
+def _stream(store, df, now=0.0):
+    return np.stack([store.update(("", row[0]), row, now) for row in df[list(BASE_COLUMNS)].to_numpy()])
+
+
+def test_streamed_features_match_pandas_rolling(engineer):
+    df = _trajectories()
+    streamed = pd.DataFrame(_stream(UnitStateStore(engineer), df), columns=engineer.feature_names)
+
+    reference = _pandas_reference(df)
+    assert list(streamed.columns[len(BASE_COLUMNS):]) == list(reference.columns)
+    np.testing.assert_allclose(streamed[reference.columns].to_numpy(), reference.to_numpy(), rtol=1e-9, atol=1e-8)
+    # The same features as the batch transform over whole trajectories
+    np.testing.assert_allclose(streamed.to_numpy(), engineer.transform(df[list(BASE_COLUMNS)].to_numpy()),
+                               rtol=1e-9, atol=1e-8)
+
+
+def test_running_sums_match_a_resum(engineer):
+    store = UnitStateStore(engineer)
+    # 40 cycles run the ring buffer (7 cycles) round several times, between and at resums
+    for n_cycles in (40, 43):
+        df = _trajectories(n_units=1, n_cycles=n_cycles, seed=n_cycles)
+        key = ("fleet", float(n_cycles))
+        for row in df[list(BASE_COLUMNS)].to_numpy():
+            store.update(key, row, now=0.0)
+        slot = store._slots[key]
+        running = store._sums[slot].copy()
+        store._resum(slot, int(store._count[slot]))
+        np.testing.assert_allclose(running, store._sums[slot], rtol=1e-9, atol=1e-6)
+
+
+def test_validate_rejects_before_any_update(engineer):
+    store = UnitStateStore(engineer)
+    rows = _trajectories(n_units=2, n_cycles=3)[list(BASE_COLUMNS)].to_numpy()
+    keys = [("", row[0]) for row in rows]
+    for key, row in zip(keys, rows):
+        store.update(key, row, now=0.0)
+    before = store.to_snapshot()[0]
+
+    later = rows.copy()
+    later[:, 1] += 100
+    # Unit 1 moves on, unit 2 repeats its cycle in the same batch: nothing may change
+    batch = np.stack([later[0], later[1], later[1]])
+    with pytest.raises(ValueError, match="is not after its last cycle"):
+        store.validate([("", 1.0), ("", 2.0), ("", 2.0)], batch, now=0.0)
+    with pytest.raises(ValueError):
+        store.validate([("", 1.0)], rows[:1], now=0.0)
+    for name, array in store.to_snapshot()[0].items():
+        np.testing.assert_array_equal(array, before[name])
+    store.validate([("", 1.0), ("", 2.0)], later[:2], now=0.0)
+
+
+def test_ttl_and_capacity_eviction(engineer):
+    store = UnitStateStore(engineer, max_units=2, ttl_s=10.0, initial_capacity=1)
+    row = np.array([1.0, 1.0, 642.0, 1590.0])
+    store.update(("", 1.0), row, now=0.0)
+    store.update(("", 2.0), row, now=5.0)
+    store.update(("", 3.0), row, now=6.0)
+    # The least recently updated unit made room
+    assert len(store) == 2 and ("", 1.0) not in store._slots
+    # Unit 2 expires; unit 3 is still within its TTL
+    assert store.evict_expired(now=15.5) == 1
+    assert list(store._slots) == [("", 3.0)]
+
+
+def test_snapshot_round_trip(engineer, tmp_path):
+    df = _trajectories(n_units=2, n_cycles=20)
+    head, tail = df.iloc[:25], df.iloc[25:]
+    store = UnitStateStore(engineer)
+    _stream(store, head)
+    store.save(str(tmp_path / "state"))
+
+    restored = UnitStateStore(engineer)
+    assert restored.load(str(tmp_path / "state")) == 2
+    np.testing.assert_allclose(_stream(restored, tail), _stream(store, tail))
+
+
+def test_worker_processes_need_sticky_routing(monkeypatch):
+    from src.Predictive_Maintenance_RULPrediction.pipelines.unit_state import (
+        StreamingPredictor, StreamingUnavailable, UnitStateConfig
+    )
+    monkeypatch.setenv("RUL_SERVING_PROCESSES", "2")
+    monkeypatch.setenv("RUL_STREAM_SNAPSHOT_INTERVAL_S", "0")
+    monkeypatch.setenv("RUL_WORKER_ID", "1")
+    config = UnitStateConfig()
+    assert config.worker_snapshot_path().endswith("stream_state_worker1")
+    with pytest.raises(StreamingUnavailable):
+        StreamingPredictor(registry=None, config=config).predict([("", 1.0)], np.zeros((1, 18)))